@@ -3,24 +3,80 @@ from flask import Flask
 from flask_pymongo import PyMongo
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from app.services.scan_cache import ScanCache
+from app.services.website_cache import WebsiteCache
+from app.services.permission_dictionary import PermissionDictionary
+from app.services.scan_documents import ScanDocumentCache
+from app.services.scan_jobs import ScanJobQueue
+from app.services.dex_analysis import dex_analyzer
+from app.services.scan_log_writer import scan_log_writer
+from app.services.reports import report_store
+from app.utils.blob_store import BlobStore
+from app.utils.domain_blocklist import domain_blocklist
+from app.utils.storage import IngestRequest
+from app.models.app_scan import AppScan
 import os
 
 # Initialize extensions
 mongo = PyMongo()
 jwt = JWTManager()
+scan_cache = ScanCache(mongo)
+website_cache = WebsiteCache(mongo)
+permission_dictionary = PermissionDictionary(mongo)
+scan_documents = ScanDocumentCache(mongo)
+scan_jobs = ScanJobQueue()
+blob_store = BlobStore()
 
 def create_app():
     app = Flask(__name__)
+    app.request_class = IngestRequest  # Uploads are hashed and validated while they stream to disk
     
     # Configuration
     app.config["MONGO_URI"] = os.getenv("MONGO_URI", "mongodb://localhost:27017/consent_engine")
     app.config["UPLOAD_FOLDER"] = os.getenv("UPLOAD_FOLDER", "./uploads")
     app.config["ALLOWED_EXTENSIONS"] = {"apk"}
     app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # Set max upload size to 100 MB
+    app.config["MAX_APK_SIZE"] = int(os.getenv("MAX_APK_SIZE", app.config['MAX_CONTENT_LENGTH']))  # Bytes per uploaded APK
+    app.config["BLOB_STORE_MAX_BYTES"] = int(os.getenv("BLOB_STORE_MAX_BYTES", 10 * 1024 ** 3))  # Upload disk budget
+    app.config["BLOB_STORE_MAX_AGE"] = int(os.getenv("BLOB_STORE_MAX_AGE", 30 * 24 * 3600))  # Seconds unused before eviction
+    app.config["SCAN_CACHE_SIZE"] = int(os.getenv("SCAN_CACHE_SIZE", 256))  # In-process LRU entries
+    app.config["SCAN_CACHE_TTL"] = int(os.getenv("SCAN_CACHE_TTL", 7 * 24 * 3600))  # Seconds
+    app.config["SCAN_WORKERS"] = int(os.getenv("SCAN_WORKERS", os.cpu_count() or 1))  # Analysis processes
+    app.config["WEBSITE_BULK_MAX_URLS"] = int(os.getenv("WEBSITE_BULK_MAX_URLS", 500))  # URLs per bulk scan request
+    app.config["URL_RISK_BATCH_MAX_URLS"] = int(os.getenv("URL_RISK_BATCH_MAX_URLS", 100000))  # URLs per /analyze-url/batch request
+    app.config["SCAN_LOG_ASYNC"] = os.getenv("SCAN_LOG_ASYNC", "true").lower() in ("1", "true", "yes")  # Log scans through the background bulk writer
+    app.config["SCAN_LOG_BATCH_SIZE"] = int(os.getenv("SCAN_LOG_BATCH_SIZE", 500))  # Scans per insert_many
+    app.config["SCAN_LOG_FLUSH_INTERVAL"] = float(os.getenv("SCAN_LOG_FLUSH_INTERVAL", 0.2))  # Seconds a logged scan may wait for a batch
+    app.config["SCAN_LOG_QUEUE_SIZE"] = int(os.getenv("SCAN_LOG_QUEUE_SIZE", 10000))  # Scans buffered before callers block
+    app.config["SCAN_LOG_ENQUEUE_TIMEOUT"] = float(os.getenv("SCAN_LOG_ENQUEUE_TIMEOUT", 5))  # Seconds blocked on a full queue before writing directly
+    app.config["SCAN_DOC_CACHE_SIZE"] = int(os.getenv("SCAN_DOC_CACHE_SIZE", 4096))  # Scan documents kept in-process for /results and reports
+    app.config["SCAN_DOC_CACHE_BYTES"] = int(os.getenv("SCAN_DOC_CACHE_BYTES", 64 * 1024 * 1024))  # Memory budget for those documents
+    app.config["SCAN_DOC_CACHE_PATH"] = os.getenv("SCAN_DOC_CACHE_PATH")  # SQLite file shared by the workers on a host; unset keeps memory only
+    app.config["SCAN_RESULT_CACHE_CONTROL"] = os.getenv("SCAN_RESULT_CACHE_CONTROL", "private, max-age=86400, immutable")  # Scans never change once stored
+    app.config["REPORT_CACHE_DIR"] = os.getenv("REPORT_CACHE_DIR", os.path.join(app.config["UPLOAD_FOLDER"], "reports"))  # Rendered PDF reports
+    app.config["REPORT_CACHE_MAX_BYTES"] = int(os.getenv("REPORT_CACHE_MAX_BYTES", 2 * 1024 ** 3))  # Report disk budget; least recently served go first
+    app.config["REPORT_WORKERS"] = int(os.getenv("REPORT_WORKERS", os.cpu_count() or 1))  # Rendering processes for bulk exports
+    app.config["REPORT_EXPORT_MAX_SCANS"] = int(os.getenv("REPORT_EXPORT_MAX_SCANS", 5000))  # Reports per /reports/export request
+    app.config["SCAN_HISTORY_MAX_LIMIT"] = int(os.getenv("SCAN_HISTORY_MAX_LIMIT", 100))  # Scans per /api/user/scans page
+    app.config["DOMAIN_BLOCKLIST_PATH"] = os.getenv("DOMAIN_BLOCKLIST_PATH")  # Compiled feed from scripts/build_blocklist.py
+    app.config["WEBSITE_CACHE_TTL"] = int(os.getenv("WEBSITE_CACHE_TTL", 3600))  # Seconds a website scan is served without a request
+    app.config["WEBSITE_CACHE_MAX_AGE"] = int(os.getenv("WEBSITE_CACHE_MAX_AGE", 7 * 24 * 3600))  # Seconds validators are kept for conditional rescans
+    app.config["WEBSITE_CACHE_SIZE"] = int(os.getenv("WEBSITE_CACHE_SIZE", 1024))  # In-process LRU entries
+    app.config["DEX_CACHE_PATH"] = os.getenv("DEX_CACHE_PATH", os.path.join(app.config["UPLOAD_FOLDER"], "dex_cache.sqlite3"))
+    app.config["DEX_WORKERS"] = int(os.getenv("DEX_WORKERS", os.cpu_count() or 1))  # Per-DEX parsing processes
     
     # Initialize MongoDB
     print("MONGO_URI:", app.config["MONGO_URI"])
     mongo.init_app(app)
+    scan_cache.init_app(app)
+    website_cache.init_app(app)
+    scan_documents.init_app(app)
+    scan_jobs.init_app(app)
+    blob_store.init_app(app)
+    dex_analyzer.init_app(app)
+    scan_log_writer.init_app(app)
+    domain_blocklist.init_app(app)
+    report_store.init_app(app)
     
     # Initialize JWT
     jwt.init_app(app)
@@ -31,7 +87,8 @@ def create_app():
     CORS(app, resources={
         r"/api/*": {
             "origins": allowed_origins,
-            "supports_credentials": True
+            "supports_credentials": True,
+            "expose_headers": ["X-Scan-Cache", "X-Content-SHA256", "ETag"]
         }
     })
 
@@ -39,16 +96,35 @@ def create_app():
     from .routes.auth import bp as auth_bp
     from .routes.scan import bp as scan_bp
     from .routes.user import bp as user_bp
+    from .routes.health import bp as health_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(scan_bp, url_prefix='/api/scan')
     app.register_blueprint(user_bp, url_prefix='/api/user')
+    app.register_blueprint(health_bp, url_prefix='/api/health')
+
+    # Heavy models load lazily on first use; MODEL_WARMUP=true loads them here,
+    # MODEL_WARMUP=background loads them on a thread while the app starts serving
+    from app.ml.warmup import model_warmup
+    warmup_mode = os.getenv("MODEL_WARMUP", "false").lower()
+    if warmup_mode in ("1", "true", "yes"):
+        warmup_mode = "true"
+    elif warmup_mode != "background":
+        warmup_mode = "false"
+    app.config["MODEL_WARMUP"] = warmup_mode
+    if app.config["MODEL_WARMUP"] == "true":
+        model_warmup.run()
+    elif app.config["MODEL_WARMUP"] == "background":
+        model_warmup.start()
 
     # Create necessary MongoDB indexes
     with app.app_context():
         try:
             mongo.db.users.create_index('email', unique=True)
-            mongo.db.app_scans.create_index([('user_id', 1), ('timestamp', -1)])
+            AppScan(mongo).ensure_indexes()
+            scan_cache.ensure_indexes()
+            website_cache.ensure_indexes()
+            permission_dictionary.publish()
             print("MongoDB indexes created successfully")
         except Exception as e:
             print(f"Error creating MongoDB indexes: {e}")
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+
+# Serialized artifacts produced by ml/training_scripts/train_risk_model.py
+RISK_MODEL_PATH = os.getenv(
+    'RISK_MODEL_PATH',
+    r'D:/consent-engine-web/ml/training_scripts/ml/models/risk_model_20250607_234152.pkl')
+RISK_VECTORIZER_PATH = os.getenv(
+    'RISK_VECTORIZER_PATH',
+    r'D:/consent-engine-web/ml/training_scripts/ml/models/feature_vectorizer_20250607_234152.pkl')
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of joblib artifacts.
+
+    Each artifact is deserialized once per process on first use (or by
+    ``warmup``) and shared by every caller afterwards. With ``mmap_mode``
+    set, numpy arrays inside the pickles are memory-mapped read-only, so
+    workers forked from a warmed-up parent share those pages.
+    """
+
+    def __init__(self, mmap_mode=None):
+        self.mmap_mode = mmap_mode
+        self._paths = {}
+        self._models = {}
+        self._stamps = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path):
+        with self._lock:
+            self._paths[name] = path
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """Return the artifact registered under ``name``, loading it if needed."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+                self._models[name] = model
+            return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warmup(self, names=None):
+        """Eagerly load the given artifacts (all registered ones by default)."""
+        for name in names or list(self._paths):
+            self.get(name)
+
+    def reload(self, names=None):
+        """Reload artifacts from disk, swapping each in once it has loaded."""
+        for name in names or list(self._paths):
+            with self._locks[name]:
+                self._models[name] = self._load(name)
+
+    def version(self):
+        """
+        Short digest of the artifacts in use: loaded ones as they were when
+        loaded, the rest as they are on disk now. Changes on ``reload`` or a
+        new artifact path, so results computed with old models can be told apart.
+        """
+        stamps = [f"{name}={self._stamps.get(name) or self._stat(name)}" for name in sorted(self._paths)]
+        return hashlib.sha256('|'.join(stamps).encode()).hexdigest()[:12]
+
+    def status(self):
+        return {name: {'path': path, 'loaded': self.is_loaded(name)}
+                for name, path in self._paths.items()}
+
+    def _stat(self, name):
+        path = self._paths[name]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return f"{path}:missing"
+        return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _load(self, name):
+        import joblib
+        path = self._paths[name]
+        self._stamps[name] = self._stat(name)
+        print(f"Loading {name} from: {path}")
+        return joblib.load(path, mmap_mode=self.mmap_mode)
+
+
+model_registry = ModelRegistry(mmap_mode=os.getenv('MODEL_MMAP_MODE') or None)
+model_registry.register('risk_model', RISK_MODEL_PATH)
+model_registry.register('risk_vectorizer', RISK_VECTORIZER_PATH)
@@ -2,17 +2,32 @@
 import os
 os.environ["HF_HUB_DISABLE_SSL_VERIFICATION"] = "1"
 
-from transformers import AutoTokenizer, BartForConditionalGeneration
-import torch
-from typing import Dict, List
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
 import re
+from app.ml.summary_cache import SummaryCache
+from app.utils.pattern_matcher import MultiPatternMatcher
 
 class PolicyAnalyzer:
-    def __init__(self):
-        # Initialize BART model and tokenizer for text summarization
+    def __init__(self, batch_size: Optional[int] = None, num_threads: Optional[int] = None,
+                 quantize: Optional[bool] = None, cache_dir: Optional[str] = None):
+        # Inference settings, overridable through the environment
+        self.batch_size = batch_size or int(os.getenv("POLICY_BATCH_SIZE", 8))
+        self.num_threads = num_threads or int(os.getenv("POLICY_NUM_THREADS", 0))
+        if quantize is None:
+            quantize = os.getenv("POLICY_QUANTIZE", "false").lower() in ("1", "true", "yes")
+        self.quantize = quantize
+        self.summary_cache = SummaryCache(
+            max_entries=int(os.getenv("POLICY_SUMMARY_CACHE_SIZE", 4096)),
+            cache_dir=cache_dir or os.getenv("POLICY_SUMMARY_CACHE_DIR") or None
+        )
+        
+        # BART model and tokenizer for text summarization, loaded on first use
         self.model_name = "facebook/bart-large-cnn"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = BartForConditionalGeneration.from_pretrained(self.model_name)
+        self._tokenizer = None
+        self._model = None
+        self._load_lock = threading.Lock()
         
         # Define categories of interest in privacy policies
         self.categories = {
@@ -32,6 +47,47 @@ class PolicyAnalyzer:
                 "right", "access", "delete", "modify", "control", "opt-out", "consent", "revoke", "withdraw", "update", "correct", "rectify", "restrict", "object", "portability", "request", "manage", "preferences", "settings", "choices", "privacy settings", "user rights", "data subject", "data request", "data removal", "data correction", "data update", "data access", "data deletion", "data erasure"
             ]
         }
+        
+        # Compile all category keywords into one matcher (a keyword may belong to several)
+        keyword_categories = {}
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                keyword_categories.setdefault(keyword.lower(), set()).add(category)
+        self.keyword_matcher = MultiPatternMatcher(keyword_categories)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def tokenizer(self):
+        self.load()
+        return self._tokenizer
+
+    @property
+    def model(self):
+        self.load()
+        return self._model
+
+    def load(self):
+        """Import torch/transformers and load BART; safe to call from several threads"""
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None:
+                return
+            import torch
+            from transformers import AutoTokenizer, BartForConditionalGeneration
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = BartForConditionalGeneration.from_pretrained(self.model_name)
+            if self.quantize:
+                # Dynamic int8 quantization of the linear layers for faster CPU inference
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            model.eval()
+            self._tokenizer = tokenizer
+            self._model = model
 
     def _chunk_text(self, text: str, max_chunk_size: int = 1024) -> List[str]:
         """Split text into smaller chunks for processing"""
@@ -55,22 +111,46 @@ class PolicyAnalyzer:
 
     def _summarize_chunk(self, text: str, max_length: int = 150) -> str:
         """Summarize a chunk of text using BART"""
-        inputs = self.tokenizer(text, max_length=1024, truncation=True, return_tensors="pt")
-        
-        summary_ids = self.model.generate(
-            inputs["input_ids"],
-            max_length=max_length,
-            min_length=40,
-            length_penalty=2.0,
-            num_beams=4,
-            early_stopping=True
-        )
+        return self._summarize_chunks([text], max_length)[0]
+
+    def _summarize_chunks(self, chunks: List[str], max_length: int = 150) -> List[str]:
+        """Summarize chunks in padded batches, reusing cached summaries of repeated chunks"""
+        import torch
+        variant = "int8" if self.quantize else "fp32"
+        keys = [SummaryCache.make_key(chunk, self.model_name, variant, max_length) for chunk in chunks]
+        summaries = {key: self.summary_cache.get(key) for key in keys}
+        pending = {key: chunk for key, chunk in zip(keys, chunks) if summaries[key] is None}
+        
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), self.batch_size):
+            batch_keys = pending_keys[start:start + self.batch_size]
+            inputs = self.tokenizer([pending[key] for key in batch_keys], max_length=1024,
+                                    truncation=True, padding=True, return_tensors="pt")
+            with torch.inference_mode():
+                summary_ids = self.model.generate(
+                    inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    max_length=max_length,
+                    min_length=40,
+                    length_penalty=2.0,
+                    num_beams=4,
+                    early_stopping=True
+                )
+            decoded = self.tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+            for key, summary in zip(batch_keys, decoded):
+                summaries[key] = summary
+                self.summary_cache.set(key, summary)
         
-        return self.tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+        return [summaries[key] for key in keys]
 
     def _categorize_text(self, text: str) -> Dict[str, List[str]]:
         """Categorize text segments based on predefined categories"""
+        return self._scan_text(text)[0]
+
+    def _scan_text(self, text: str) -> Tuple[Dict[str, List[str]], Counter]:
+        """Categorize sentences and count keyword hits in a single matcher pass"""
         categorized_points = {category: [] for category in self.categories}
+        keyword_hits = Counter()
         
         # Split text into sentences
         sentences = re.split(r'[.!?]+', text)
@@ -80,23 +160,22 @@ class PolicyAnalyzer:
             if not sentence:
                 continue
                 
-            # Check each category's keywords
-            for category, keywords in self.categories.items():
-                if any(keyword.lower() in sentence.lower() for keyword in keywords):
+            # Every category whose keywords occur anywhere in the sentence
+            hit_categories, counts = self.keyword_matcher.scan(sentence.lower())
+            keyword_hits.update(counts)
+            for category in self.categories:
+                if category in hit_categories:
                     categorized_points[category].append(sentence)
         
-        return categorized_points
+        return categorized_points, keyword_hits
 
     def analyze_policy(self, policy_text: str) -> Dict:
         """Analyze and summarize a privacy policy"""
         # Split text into manageable chunks
         chunks = self._chunk_text(policy_text)
         
-        # Summarize each chunk
-        summaries = []
-        for chunk in chunks:
-            summary = self._summarize_chunk(chunk)
-            summaries.append(summary)
+        # Summarize the chunks in batches
+        summaries = self._summarize_chunks(chunks)
         
         # Combine summaries
         combined_summary = " ".join(summaries)
@@ -138,3 +217,7 @@ class PolicyAnalyzer:
             risk_scores[category] = min(risk_scores[category], 10)
             
         return risk_scores
+
+
+# Shared instance; constructing it is cheap because the model loads lazily
+policy_analyzer = PolicyAnalyzer()
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+from app.utils.lru import LRUCache
+
+
+class SummaryCache:
+    """
+    Cache of chunk summaries keyed by a hash of the chunk text and the
+    settings that affect the output (model, variant, generation params).
+
+    An in-process LRU sits in front of an optional directory of plain
+    text files, sharded by the first two hex digits of the key, so that
+    summaries survive restarts and are shared by workers on one host.
+    """
+
+    def __init__(self, max_entries=4096, cache_dir=None):
+        self.memory = LRUCache(max_entries)
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def make_key(text, *settings):
+        digest = hashlib.sha256()
+        for part in settings:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        summary = self.memory.get(key)
+        if summary is None and self.cache_dir:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    summary = f.read()
+                self.memory.set(key, summary)
+            except OSError:
+                pass
+        return summary
+
+    def set(self, key, summary):
+        self.memory.set(key, summary)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(summary)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARN] Could not persist summary cache entry: {str(e)}")
+
+    def stats(self):
+        return self.memory.stats()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
@@ -0,0 +1,54 @@
+import threading
+from datetime import datetime
+from app.ml.model_registry import model_registry
+from app.ml.policy_analyzer import policy_analyzer
+
+
+class ModelWarmup:
+    """
+    Loads the heavy models (joblib risk artifacts and BART) ahead of the
+    first request, either inline or on a daemon thread, and records the
+    outcome for the readiness probe.
+    """
+
+    def __init__(self):
+        self.state = 'idle'
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        self.state = 'running'
+        self.started_at = datetime.utcnow().isoformat()
+        try:
+            model_registry.warmup()
+            policy_analyzer.load()
+            self.state = 'done'
+        except Exception as e:
+            print(f"[ERROR] Model warmup failed: {str(e)}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self.finished_at = datetime.utcnow().isoformat()
+
+    def start(self):
+        """Run the warmup on a background thread (at most once)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='model-warmup', daemon=True)
+                self._thread.start()
+
+    def status(self):
+        return {
+            'state': self.state,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'risk_models': model_registry.status(),
+            'policy_model_loaded': policy_analyzer.is_loaded
+        }
+
+
+model_warmup = ModelWarmup()
@@ -1,26 +1,126 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+# Serves GET /api/user/scans: equality on user_id, newest first with _id as the
+# tie-breaker, plus the summary fields so history pages never load the documents
+HISTORY_INDEX = [('user_id', 1), ('timestamp', -1), ('_id', -1), ('app_name', 1), ('risk_score', 1)]
+HISTORY_INDEX_NAME = 'user_history'
+HISTORY_FIELDS = {'_id': 1, 'app_name': 1, 'risk_score': 1, 'timestamp': 1}
+EPOCH = datetime(1970, 1, 1)
 
 class AppScan:
     def __init__(self, mongo):
         self.scans = mongo.db.scans
 
-    def log_scan(self, user_id, app_name, risk_score, permissions, categories, critical_items):
+    def ensure_indexes(self):
+        """Create the index behind the scan-history queries."""
+        self.scans.create_index(HISTORY_INDEX, name=HISTORY_INDEX_NAME)
+
+    def log_scan(self, user_id, app_name, risk_score, permissions, categories, critical_items, apk_sha256=None):
+        # Permission text is stored once in the permission dictionary, not per scan
+        from app import permission_dictionary
+        from app.services.scan_log_writer import scan_log_writer
+        permission_ids, permission_risks = permission_dictionary.compact(permissions)
         scan_data = {
             "user_id": user_id,
             "app_name": app_name,
             "risk_score": risk_score,
-            "permissions": permissions,
+            "permission_ids": permission_ids,
+            "permission_risks": permission_risks,
+            "dictionary_version": permission_dictionary.version,
             "categories": categories,
             "critical_items": critical_items,
-            "timestamp": datetime.utcnow()
+            "timestamp": truncate_to_millis(datetime.utcnow())
         }
-        return self.scans.insert_one(scan_data).inserted_id
+        if apk_sha256:
+            scan_data["apk_sha256"] = apk_sha256
+        # Written in the background; the id is valid (and readable) right away
+        return scan_log_writer.submit(self.scans, scan_data)
 
-    def get_scan_by_id(self, scan_id):
-        """Retrieve a scan result by its ID"""
+    def get_scan_by_id(self, scan_id, include_pending=True):
+        """Retrieve a scan result by its ID; ``include_pending=False`` skips scans not yet written to Mongo"""
         try:
-            return self.scans.find_one({"_id": ObjectId(scan_id)})
+            from app.services.scan_log_writer import scan_log_writer
+            scan_id = ObjectId(scan_id)
+            scan = (include_pending and scan_log_writer.pending(scan_id)) or self.scans.find_one({"_id": scan_id})
+            return self.expand_permissions(scan)
         except Exception as e:
             print(f"Error retrieving scan: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def delete_scan(self, scan_id, user_id):
+        """
+        Remove one of ``user_id``'s scans and release its reference on the stored APK.
+
+        Returns the removed document's ``_id`` and ``apk_sha256``, or None
+        if the user has no such scan.
+        """
+        from app import blob_store
+        from app.services.scan_log_writer import scan_log_writer
+        try:
+            scan_id = ObjectId(scan_id)
+        except (InvalidId, TypeError):
+            return None
+        if scan_log_writer.pending(scan_id):
+            scan_log_writer.flush()
+        scan = self.scans.find_one_and_delete({"_id": scan_id, "user_id": user_id},
+                                              projection={"apk_sha256": 1})
+        if scan and scan.get("apk_sha256"):
+            blob_store.release_ref(scan["apk_sha256"])
+        return scan
+
+    @staticmethod
+    def expand_permissions(scan):
+        """Join a compact scan's permission ids back to the full permission list, in place"""
+        if scan and 'dictionary_version' in scan:
+            from app import permission_dictionary
+            scan['permissions'] = permission_dictionary.expand(scan.pop('permission_ids', []),
+                                                               scan.pop('permission_risks', []),
+                                                               scan.pop('dictionary_version'))
+        return scan
+
+    def history(self, user_id, limit, cursor=None):
+        """
+        One page of a user's scan summaries, newest first.
+
+        Returns ``(scans, next_cursor)``; pass ``next_cursor`` back to get the
+        following page (it is None on the last page). Pages continue from the
+        last (timestamp, _id) seen rather than skipping rows, so every page
+        is a bounded range scan of the history index however deep it is, and
+        scans logged meanwhile do not shift later pages. Raises ValueError
+        for a malformed cursor.
+        """
+        query = {'user_id': user_id}
+        if cursor:
+            timestamp, scan_id = decode_history_cursor(cursor)
+            query['$or'] = [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': scan_id}}
+            ]
+        docs = list(self.scans.find(query, HISTORY_FIELDS)
+                    .sort([('timestamp', -1), ('_id', -1)])
+                    .hint(HISTORY_INDEX_NAME)
+                    .limit(limit + 1))
+        next_cursor = encode_history_cursor(docs[limit - 1]) if len(docs) > limit else None
+        return docs[:limit], next_cursor
+
+
+def truncate_to_millis(timestamp):
+    """Round a datetime down to the millisecond precision BSON dates store."""
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+def encode_history_cursor(doc):
+    """Opaque page cursor for the position just after ``doc``"""
+    # Mongo stores datetimes with millisecond precision, so this round-trips exactly
+    millis = (doc['timestamp'] - EPOCH) // timedelta(milliseconds=1)
+    return f"{millis}.{doc['_id']}"
+
+
+def decode_history_cursor(cursor):
+    millis, _, scan_id = str(cursor).partition('.')
+    try:
+        return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(scan_id)
+    except (ValueError, InvalidId, OverflowError):
+        raise ValueError('Invalid cursor')
@@ -0,0 +1,44 @@
+from flask import Blueprint, jsonify, current_app
+from app import mongo, scan_cache, scan_documents, website_cache
+from app.services.scan_log_writer import scan_log_writer
+from app.services.reports import report_store
+from app.ml.warmup import model_warmup
+
+bp = Blueprint('health', __name__)
+
+@bp.route('/live', methods=['GET'])
+def live():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'alive'}), 200
+
+@bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: MongoDB is reachable and any configured model warmup has finished"""
+    checks = {}
+    try:
+        mongo.db.command('ping')
+        checks['mongo'] = 'ok'
+    except Exception as e:
+        checks['mongo'] = str(e)
+
+    models = model_warmup.status()
+    warmup_required = current_app.config.get('MODEL_WARMUP') != 'false'
+    checks['models'] = 'ok' if not warmup_required or models['state'] == 'done' else models['state']
+
+    is_ready = all(value == 'ok' for value in checks.values())
+    return jsonify({
+        'status': 'ready' if is_ready else 'not_ready',
+        'checks': checks,
+        'models': models
+    }), 200 if is_ready else 503
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Cache hit ratios, memory use, scan-log backlog and report cache for this worker process"""
+    return jsonify({
+        'scan_documents': scan_documents.stats(),
+        'scan_cache': scan_cache.stats(),
+        'website_cache': website_cache.stats(),
+        'scan_log_writer': scan_log_writer.stats(),
+        'reports': report_store.stats()
+    }), 200
@@ -1,48 +1,53 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, send_file, Response, stream_with_context
 import os
-from app.utils.storage import save_file
+from app.utils.storage import save_file, save_file_with_digest
 from app.services.website_scanner import WebsiteScanner
-from app import mongo
-from androguard.core.bytecodes.apk import APK
-from androguard.core.bytecodes.dvm import DalvikVMFormat
-from androguard.core.analysis.analysis import Analysis
-from app.services.scanner import APKScanner
-from app.models.app_scan import AppScan
+from app import mongo, scan_cache, scan_jobs, blob_store, website_cache, scan_documents
+from app.services.scanner import APKScanner, SCAN_MODES
 from werkzeug.utils import secure_filename
-from flask import session
+from werkzeug.exceptions import HTTPException
 from datetime import datetime
-from ..ml.policy_analyzer import PolicyAnalyzer
+from ..ml.policy_analyzer import policy_analyzer
 from typing import Dict
-from app.services.risk_calculator import PermissionOptimizer, RiskCalculator
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from app.services.risk_calculator import PermissionOptimizer, RiskCalculator, scoring_version
+from app.services.auth import current_user_id
+from app.services.url_risk import url_risk_engine
+from app.utils.domain_blocklist import domain_blocklist
+from app.services.scan_log_writer import scan_log_writer
+from app.services.reports import report_store, render_report, REPORT_TEMPLATE_VERSION
 from io import BytesIO
 from socketio_instance import socketio
 
 bp = Blueprint('scan', __name__, url_prefix='/api/scan')
-website_scanner = WebsiteScanner(None)  # MongoDB instance not needed for basic scan
+website_scanner = WebsiteScanner(mongo, cache=website_cache)  # Scans are logged through the background writer
 apk_scanner = APKScanner(None)  # MongoDB instance not needed for basic scan
-policy_analyzer = PolicyAnalyzer()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 @bp.route('/upload', methods=['POST'])
 def upload_apk():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No APK uploaded'}), 400
-    file = request.files['file']
-    if not file.filename.endswith('.apk'):
-        return jsonify({'error': 'Invalid file type'}), 400
     try:
-        apk_path = save_file(file, 'uploads')
+        if 'file' not in request.files:
+            return jsonify({'error': 'No APK uploaded'}), 400
+        file = request.files['file']
+        if not file.filename.endswith('.apk'):
+            return jsonify({'error': 'Invalid file type'}), 400
+        apk_path = save_file(file, blob_store)
         return jsonify({'status': 'success', 'file_path': apk_path})
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
     except Exception as e:
         return jsonify({'error': f'File save failed: {str(e)}'}), 500
 
 @bp.route('/analyze', methods=['POST'])
 def analyze_apk():
-    """Analyze an APK file"""
+    """Analyze an APK file; pass async=true to queue it and get a job id back
+
+    scan_mode=fast (default) reads only the manifest, scan_mode=deep runs androguard.
+    """
+    # Logged under the same identity /api/user/scans reads history with
+    user_id = current_user_id() or 'anonymous'
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -51,16 +56,35 @@ def analyze_apk():
         if not file.filename:
             return jsonify({'error': 'No file selected'}), 400
         
-        # Save the uploaded file
-        file_path = save_file(file, 'uploads')
+        scan_mode = request.values.get('scan_mode', 'fast').lower()
+        if scan_mode not in SCAN_MODES:
+            return jsonify({'error': f"scan_mode must be one of {', '.join(SCAN_MODES)}"}), 400
         
-        # Analyze the APK and log the scan
-        user_id = session.get('user_id', 'anonymous')
+        # The upload was hashed and validated while it streamed in; move it into the blob store
+        file_path, digest = save_file_with_digest(file, blob_store)
+        
+        # Analyze the APK (or reuse a cached result) and log the scan
         app_name = file.filename
         apk_scanner_with_mongo = APKScanner(mongo)
-        results = apk_scanner_with_mongo.scan_apk(file_path, user_id=user_id, app_name=app_name)
-        if not results or (isinstance(results, dict) and 'error' in results):
-            return jsonify({'error': results.get('error', 'Failed to analyze APK')}), 400
+        # Results from other models or scoring tables never match after a reload or deploy
+        cache_key = f"{digest}:{scan_mode}:{scoring_version()}"
+        results = scan_cache.get(cache_key)
+        cache_status = 'HIT' if results is not None else 'MISS'
+        if results is None and request.values.get('async', '').lower() in ('1', 'true', 'yes'):
+            job_id = scan_jobs.submit(file_path, user_id=user_id, app_name=app_name,
+                                      cache_key=cache_key, scan_mode=scan_mode, apk_sha256=digest)
+            response = jsonify({'status': 'queued', 'job_id': job_id})
+            response.headers['X-Scan-Cache'] = cache_status
+            response.headers['X-Content-SHA256'] = digest
+            return response, 202
+        if results is None:
+            results = apk_scanner_with_mongo.scan_apk(file_path, user_id=user_id, app_name=app_name,
+                                                      scan_mode=scan_mode, apk_sha256=digest)
+            if not results or (isinstance(results, dict) and 'error' in results):
+                return jsonify({'error': results.get('error', 'Failed to analyze APK')}), 400
+            scan_cache.set(cache_key, results)
+        else:
+            apk_scanner_with_mongo.log_result(results, user_id=user_id, app_name=app_name, apk_sha256=digest)
         # Emit real-time notification
         if 'scan_id' in results:
             print(f"Emitting scan_complete for user_id={user_id}, scan_id={results.get('scan_id')}")
@@ -70,13 +94,26 @@ def analyze_apk():
                 'risk_score': results.get('risk_score'),
                 'app_name': app_name
             }, room=user_id)
-        return jsonify(results), 200
+        response = jsonify(results)
+        response.headers['X-Scan-Cache'] = cache_status
+        response.headers['X-Content-SHA256'] = digest
+        return response, 200
         
+    except HTTPException as e:
+        return jsonify({'error': e.description}), e.code
     except Exception as e:
         import traceback
         print(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_scan_job(job_id):
+    """Report the status and progress of a queued APK analysis"""
+    job = scan_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
 @bp.route('/url', methods=['POST', 'OPTIONS'])
 def scan_url():
     if request.method == 'OPTIONS':
@@ -87,11 +124,44 @@ def scan_url():
     if not url:
         return jsonify({'error': 'No URL provided'}), 400
     try:
-        result = website_scanner.scan_website(url, user_id)
+        result = website_scanner.scan_website(url, user_id, refresh=bool(data.get('refresh', False)))
         return jsonify({'status': 'success', 'data': result})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/urls', methods=['POST'])
+def scan_urls():
+    """Scan many websites concurrently; body: {"urls": [...], "user_id": ..., "refresh": false}"""
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    user_id = data.get('user_id', 'dummy_user_id')
+    if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u for u in urls):
+        return jsonify({'error': 'urls must be a non-empty list of URLs'}), 400
+    max_urls = current_app.config.get('WEBSITE_BULK_MAX_URLS', 500)
+    if len(urls) > max_urls:
+        return jsonify({'error': f'At most {max_urls} URLs can be scanned per request'}), 400
+    try:
+        results = website_scanner.scan_websites(urls, user_id, refresh=bool(data.get('refresh', False)))
+        return jsonify({'status': 'success', 'count': len(results), 'data': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/trackers', methods=['GET'])
+def tracker_stats():
+    """Report the active tracker ruleset and this worker's per-rule hit counts"""
+    try:
+        return jsonify(website_scanner.trackers.stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/blocklist', methods=['GET'])
+def blocklist_stats():
+    """Report the domain blocklist build /analyze-url checks against"""
+    try:
+        return jsonify(domain_blocklist.stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/test-risk-prediction', methods=['GET'])
 def test_risk_prediction():
     try:
@@ -101,16 +171,72 @@ def test_risk_prediction():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/risk/batch', methods=['POST'])
+def risk_batch():
+    """Score many permission sets (e.g. an app catalog) in one call
+
+    ``format`` is ``records`` (default: one object per app) or ``columns``: one
+    array per field, with critical items as indexes into ``critical_item_sets``.
+    Columns skip building and encoding a dict per app, which dominates large batches.
+    """
+    data = request.get_json(silent=True) or {}
+    output_format = data.get('format', 'records')
+    if output_format not in ('records', 'columns'):
+        return jsonify({'error': 'format must be one of records, columns'}), 400
+    permission_sets = data.get('permission_sets')
+    policy_texts = data.get('policy_texts')
+    if not isinstance(permission_sets, list) or not all(isinstance(p, list) for p in permission_sets):
+        return jsonify({'error': 'permission_sets must be a list of permission lists'}), 400
+    if policy_texts is not None and (not isinstance(policy_texts, list) or len(policy_texts) != len(permission_sets)):
+        return jsonify({'error': 'policy_texts must be a list aligned with permission_sets'}), 400
+    try:
+        calculator = RiskCalculator()
+        if output_format == 'columns':
+            columns = calculator.calculate_risk_batch(permission_sets, policy_texts=policy_texts, as_arrays=True)
+            body = {
+                'status': 'success',
+                'count': len(permission_sets),
+                'categories': columns['categories'],
+                'risk_scores': columns['risk_scores'].tolist(),
+                'category_risks': columns['category_risks'].tolist(),
+                'critical_item_sets': columns['critical_item_sets'],
+                'critical_items': columns['critical_items'].tolist()
+            }
+            if data.get('include_permissions'):
+                body['permissions'] = [calculator._format_permissions(p) for p in permission_sets]
+            return jsonify(body), 200
+        results = calculator.calculate_risk_batch(
+            permission_sets,
+            policy_texts=policy_texts,
+            include_permissions=bool(data.get('include_permissions', False))
+        )
+        return jsonify({'status': 'success', 'count': len(results), 'results': results}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def cacheable(response, etag):
+    """Mark a stored-scan response (or its 304) with the scan's ETag and cache lifetime
+
+    A scan still queued for writing has no ETag; it must not be cached, since the write may yet fail.
+    """
+    if etag is None:
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config.get('SCAN_RESULT_CACHE_CONTROL',
+                                                               'private, max-age=86400, immutable')
+    return response
+
 @bp.route('/results/<scan_id>', methods=['GET'])
 def get_scan_result(scan_id):
     """Retrieve a specific scan result by ID"""
     try:
-        # Ensure AppScan is initialized with mongo for get_scan_by_id
-        app_scan_instance = AppScan(mongo)
-        scan_data = app_scan_instance.get_scan_by_id(scan_id)
+        scan_data, etag = scan_documents.get(scan_id)
         if not scan_data:
             return jsonify({'error': 'Scan result not found'}), 404
-        
+        if etag and request.if_none_match.contains_weak(etag):
+            return cacheable(current_app.response_class(status=304), etag)
+
         # Convert ObjectId to string for JSON serialization
         scan_data['_id'] = str(scan_data['_id'])
         # user_id might be ObjectId in MongoDB, ensure it's string for JSON
@@ -121,14 +247,14 @@ def get_scan_result(scan_id):
         critical_items = scan_data.get('critical_items', [])
         permissions = scan_data.get('permissions', [])
 
-        return jsonify({
+        return cacheable(jsonify({
             'status': 'success',
             'scan_id': scan_data['_id'],
             'risk_score': scan_data['risk_score'],
             'categories': categories,
             'critical_items': critical_items,
             'permissions': permissions 
-        })
+        }), etag)
     except Exception as e:
         print(f"[ERROR] Failed to retrieve scan result: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -158,9 +284,22 @@ def optimize_permissions():
     requested_permissions = data.get('permissions', [])
     policy_text = data.get('policy_text', '')
     policy_summary = data.get('policy_summary', '')
+    max_removals = data.get('max_removals')
+    if max_removals is not None:
+        try:
+            max_removals = int(max_removals)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'max_removals must be an integer'}), 400
+        if max_removals < 0:
+            return jsonify({'error': 'max_removals must not be negative'}), 400
+    strategy = data.get('strategy', 'greedy')
+    if strategy not in PermissionOptimizer.STRATEGIES:
+        return jsonify({'error': f"strategy must be one of {', '.join(PermissionOptimizer.STRATEGIES)}"}), 400
 
     optimizer = PermissionOptimizer()
-    result = optimizer.optimize_permissions(app_features, requested_permissions, policy_text, policy_summary)
+    result = optimizer.optimize_permissions(app_features, requested_permissions, policy_text, policy_summary,
+                                            max_removals=max_removals,
+                                            strategy=strategy)
     result['current_permissions'] = requested_permissions
     return jsonify(result)
 
@@ -173,190 +312,76 @@ def analyze_url():
     if not url:
         return jsonify({'error': 'No URL provided'}), 400
 
-    import re
-    from urllib.parse import urlparse, parse_qs
-    import math
-
-    # Knowledge base
-    SUSPICIOUS_KEYWORDS = [
-        'login', 'secure', 'update', 'verify', 'account', 'bank', 'confirm', 'signin', 'wp-admin', 'reset', 'pay', 'ebay', 'paypal', 'webscr', 'password', 'token', 'auth', 'shell', 'cmd', 'upload', 'admin'
-    ]
-    SUSPICIOUS_TLDS = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.work', '.support', '.info', '.ru', '.cn']
-    SHORTENERS = ['bit.ly', 'goo.gl', 'tinyurl.com', 't.co', 'ow.ly', 'is.gd', 'buff.ly', 'adf.ly', 'bit.do', 'cutt.ly']
-    BLACKLISTED_DOMAINS = ['malware.test', 'phishing.test', 'badsite.com', 'examplebad.com']
-    OBFUSCATION_PATTERNS = ['%2e', '%2f', '%5c', '@', 'xn--']
-    RISKY_EXTENSIONS = ['.exe', '.scr', '.zip', '.js', '.php', '.bat', '.cmd', '.jar', '.vbs', '.ps1']
-
-    def calculate_entropy(s):
-        """Shannon entropy calculation for a string"""
-        prob = [ float(s.count(c)) / len(s) for c in set(s) ]
-        entropy = - sum([ p * math.log2(p) for p in prob ])
-        return entropy
-
-    # Parse URL
     try:
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        path = parsed.path.lower()
-        query = parsed.query.lower()
-    except Exception:
+        return jsonify(url_risk_engine.score(url))
+    except ValueError:
         return jsonify({'error': 'Invalid URL'}), 400
 
-    risk_score = 1.0
-    risk_level = 'low'
-    details = []
-
-    # 1. HTTPS check
-    if not url.lower().startswith('https://'):
-        risk_score += 3
-        details.append('URL is not using HTTPS')
-
-    # 2. Suspicious keywords
-    for keyword in SUSPICIOUS_KEYWORDS:
-        if keyword in url.lower():
-            risk_score += 2
-            details.append(f"Suspicious keyword detected: '{keyword}'")
-            break
-
-    # 3. URL length
-    if len(url) < 15:
-        risk_score += 1
-        details.append('URL is very short (suspicious)')
-    elif len(url) > 60:
-        risk_score += 1
-        details.append('URL is very long (possible obfuscation)')
-
-    # 4. TLD and domain issues
-    for tld in SUSPICIOUS_TLDS:
-        if domain.endswith(tld):
-            risk_score += 2
-            details.append(f"Suspicious TLD detected: {tld}")
-            break
-
-    for shortener in SHORTENERS:
-        if shortener in domain:
-            risk_score += 2
-            details.append(f"URL uses shortening service: {shortener}")
-            break
-
-    for bad in BLACKLISTED_DOMAINS:
-        if bad in domain:
-            risk_score += 5
-            details.append("Domain is in blacklist")
-            break
-
-    # 5. Obfuscation check
-    if any(p in url.lower() for p in OBFUSCATION_PATTERNS):
-        risk_score += 2
-        details.append('URL appears obfuscated')
-
-    # 6. Double domain trick
-    if re.search(r'\.\w+\.\w+\.', domain):
-        risk_score += 1
-        details.append('Domain may contain deceptive multiple subdomains')
-
-    # 7. Risky file extensions
-    if any(url.lower().endswith(ext) for ext in RISKY_EXTENSIONS):
-        risk_score += 3
-        details.append(f"URL ends with risky file type")
-
-    # 8. Sensitive data in query
-    if 'password' in query or 'token' in query or 'auth' in query:
-        risk_score += 3
-        details.append('URL query contains possible credentials')
-
-    # 9. Risky path patterns
-    if any(x in path for x in ['admin', 'upload', 'shell', 'cmd']):
-        risk_score += 2
-        details.append('Suspicious path segment detected')
-
-    # 10. High entropy string
-    entropy = calculate_entropy(url)
-    if entropy > 4.5:
-        risk_score += 1
-        details.append(f"High URL entropy ({round(entropy, 2)}) indicates obfuscation")
-
-    # Final risk level
-    if risk_score >= 8:
-        risk_level = 'high'
-    elif risk_score >= 4:
-        risk_level = 'medium'
-
-    return jsonify({
-        'url': url,
-        'domain': domain,
-        'risk_score': round(risk_score, 2),
-        'risk_level': risk_level,
-        'details': details or ['No major risks detected']
-    })
+@bp.route('/analyze-url/batch', methods=['POST'])
+def analyze_url_batch():
+    """Classify many URLs (e.g. from access logs) with the /analyze-url heuristics; body: {"urls": [...]}"""
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u for u in urls):
+        return jsonify({'error': 'urls must be a non-empty list of URLs'}), 400
+    max_urls = current_app.config.get('URL_RISK_BATCH_MAX_URLS', 100000)
+    if len(urls) > max_urls:
+        return jsonify({'error': f'At most {max_urls} URLs can be classified per request'}), 400
+    try:
+        results = url_risk_engine.score_many(urls)
+        return jsonify({'status': 'success', 'count': len(results), 'results': results}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @bp.route('/download-report/<scan_id>', methods=['GET'])
 def download_report(scan_id):
     """Generate and download a PDF report for a scan result by ID"""
     try:
-        app_scan_instance = AppScan(mongo)
-        scan_data = app_scan_instance.get_scan_by_id(scan_id)
+        scan_data, etag = scan_documents.get(scan_id)
         if not scan_data:
             return jsonify({'error': 'Scan result not found'}), 404
-
-        # Prepare PDF in memory
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        y = height - 40
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(40, y, f"Scan Report: {scan_data.get('app_name', 'Unknown App')}")
-        y -= 30
-        p.setFont("Helvetica", 12)
-        p.drawString(40, y, f"Scan ID: {str(scan_data.get('_id', ''))}")
-        y -= 20
-        p.drawString(40, y, f"Risk Score: {scan_data.get('risk_score', 'N/A')}")
-        y -= 20
-        p.drawString(40, y, f"Timestamp: {scan_data.get('timestamp', '')}")
-        y -= 30
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(40, y, "Categories:")
-        y -= 20
-        p.setFont("Helvetica", 12)
-        for cat, score in (scan_data.get('categories', {}) or {}).items():
-            p.drawString(60, y, f"{cat}: {score}")
-            y -= 18
-            if y < 60:
-                p.showPage()
-                y = height - 40
-        y -= 10
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(40, y, "Critical Items:")
-        y -= 20
-        p.setFont("Helvetica", 12)
-        for item in (scan_data.get('critical_items', []) or []):
-            p.drawString(60, y, f"- {item}")
-            y -= 18
-            if y < 60:
-                p.showPage()
-                y = height - 40
-        y -= 10
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(40, y, "Permissions:")
-        y -= 20
-        p.setFont("Helvetica", 12)
-        for perm in (scan_data.get('permissions', []) or []):
-            if isinstance(perm, dict):
-                name = perm.get('name', str(perm))
-            else:
-                name = str(perm)
-            p.drawString(60, y, f"- {name}")
-            y -= 18
-            if y < 60:
-                p.showPage()
-                y = height - 40
-        p.save()
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name=f"scan_report_{scan_id}.pdf", mimetype='application/pdf')
+        if etag is None:
+            # Not in Mongo yet: render for this response only, nothing is written to the report cache
+            buffer = BytesIO()
+            render_report(scan_data, buffer)
+            buffer.seek(0)
+            return cacheable(send_file(buffer, as_attachment=True, download_name=f"scan_report_{scan_data['_id']}.pdf",
+                                       mimetype='application/pdf', etag=False), None)
+        etag = f"{etag}-pdf{REPORT_TEMPLATE_VERSION}"
+        if etag and request.if_none_match.contains_weak(etag):
+            return cacheable(current_app.response_class(status=304), etag)
+
+        # Rendered once per template version, then sent straight from the cached file
+        path = report_store.get(scan_data)
+        return cacheable(send_file(path, as_attachment=True, download_name=f"scan_report_{scan_data['_id']}.pdf",
+                                   mimetype='application/pdf', etag=False), etag)
     except Exception as e:
         print(f"[ERROR] Failed to generate PDF report: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/reports/export', methods=['POST'])
+def export_reports():
+    """Stream a zip of the PDF reports for many scans (body: {"scan_ids": [...]})"""
+    data = request.get_json(silent=True) or {}
+    scan_ids = data.get('scan_ids')
+    if not isinstance(scan_ids, list) or not scan_ids or not all(isinstance(s, str) for s in scan_ids):
+        return jsonify({'error': 'scan_ids must be a non-empty list of scan IDs'}), 400
+    max_scans = current_app.config.get('REPORT_EXPORT_MAX_SCANS', 5000)
+    if len(scan_ids) > max_scans:
+        return jsonify({'error': f'At most {max_scans} reports can be exported per request'}), 400
+
+    def load(scan_id):
+        scan_data, etag = scan_documents.get(scan_id)
+        if scan_data is not None and etag is None:
+            # Still queued: wait for the write so only stored scans reach the report cache
+            scan_log_writer.flush(timeout=30)
+            scan_data, etag = scan_documents.get(scan_id)
+        return scan_data if etag else None
+
+    response = Response(stream_with_context(report_store.export(scan_ids, load)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename=scan_reports_{datetime.utcnow():%Y%m%d%H%M%S}.zip'
+    return response
+
 @socketio.on('join')
 def on_join(data):
     user_id = data.get('user_id')
@@ -1,5 +1,60 @@
-from flask import Blueprint
+from flask import Blueprint, request, jsonify, current_app
+from app import mongo, scan_documents
+from app.models.app_scan import AppScan
+from app.services.auth import current_user_id
+from app.services.reports import report_store
 
 bp = Blueprint('user', __name__)
 
-# You can add user-related routes here later
+@bp.route('/scans', methods=['GET'])
+def scan_history():
+    """
+    Page through the caller's scan history, newest first.
+
+    Query: ``limit`` (default 20, at most SCAN_HISTORY_MAX_LIMIT) and
+    ``cursor`` (the previous page's ``next_cursor``).
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    max_limit = current_app.config.get('SCAN_HISTORY_MAX_LIMIT', 100)
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= max_limit:
+        return jsonify({'error': f'limit must be between 1 and {max_limit}'}), 400
+
+    try:
+        scans, next_cursor = AppScan(mongo).history(user_id, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({
+        'scans': [{
+            'scan_id': str(scan['_id']),
+            'app_name': scan.get('app_name'),
+            'risk_score': scan.get('risk_score'),
+            'timestamp': scan['timestamp'].isoformat() + 'Z'
+        } for scan in scans],
+        'next_cursor': next_cursor
+    }), 200
+
+@bp.route('/scans/<scan_id>', methods=['DELETE'])
+def delete_scan(scan_id):
+    """Delete one of the caller's scans; its stored APK loses a reference and becomes evictable"""
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({'error': 'Authentication required'}), 401
+    try:
+        scan = AppScan(mongo).delete_scan(scan_id, user_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if scan is None:
+        return jsonify({'error': 'Scan not found'}), 404
+    scan_documents.forget(str(scan['_id']))
+    report_store.forget(str(scan['_id']))
+    return jsonify({'status': 'deleted', 'scan_id': str(scan['_id'])}), 200
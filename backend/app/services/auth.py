@@ -7,3 +7,15 @@ def hash_password(password):
     """Basic password hashing (replace with secure hashing)"""
     # TODO: Implement secure password hashing using bcrypt or similar
     return password # This is insecure, replace with hashing
+
+def current_user_id():
+    """
+    The caller's user id: the JWT identity if a token was sent, else the session's user_id.
+
+    Scans are logged and their history is read under this same id. An
+    invalid token raises, so the JWT error handlers answer with a 401/422.
+    """
+    from flask import session
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    verify_jwt_in_request(optional=True)
+    return get_jwt_identity() or session.get('user_id')
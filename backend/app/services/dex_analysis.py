@@ -0,0 +1,251 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from app.services.dex_cache import DexCache
+
+DEX_NAME = re.compile(r'^classes\d*\.dex$')
+DEFAULT_API_LEVEL = 25
+DEFAULT_PARALLEL_MIN_BYTES = 512 * 1024  # Below this, process hand-off costs more than parsing
+
+
+def _dex_sort_key(name):
+    # classes.dex, classes2.dex, ... classes10.dex in load order
+    digits = name[len('classes'):-len('.dex')]
+    return int(digits) if digits else 1
+
+
+@lru_cache(maxsize=None)
+def _mapping_level(api_level):
+    """Return the closest bundled API permission map level at or below ``api_level``."""
+    import androguard.core.api_specific_resources as resources
+    mappings_dir = os.path.join(os.path.dirname(resources.__file__), 'api_permission_mappings')
+    levels = sorted(int(name[len('permissions_'):-len('.json')]) for name in os.listdir(mappings_dir)
+                    if re.match(r'^permissions_\d+\.json$', name))
+    if not levels:
+        return None
+    lower = [level for level in levels if level <= int(api_level or DEFAULT_API_LEVEL)]
+    return lower[-1] if lower else levels[0]
+
+
+@lru_cache(maxsize=None)
+def _permission_mappings(api_level):
+    """Load the API -> permissions map for ``api_level`` (see ``_mapping_level``)."""
+    from androguard.core.api_specific_resources import load_permission_mappings
+    level = _mapping_level(api_level)
+    return load_permission_mappings(level) if level is not None else {}
+
+
+def _dex_digests(apk_path, dex_names, chunk_size=1024 * 1024):
+    digests = {}
+    with zipfile.ZipFile(apk_path) as archive:
+        for name in dex_names:
+            digest = hashlib.sha256()
+            with archive.open(name) as dex:
+                for chunk in iter(lambda: dex.read(chunk_size), b''):
+                    digest.update(chunk)
+            digests[name] = digest.hexdigest()
+    return digests
+
+
+def _init_worker():
+    # androguard logs every parsed structure at DEBUG; keep worker output quiet
+    import logging
+    logging.disable(logging.CRITICAL)
+
+
+def _analyze_dex(apk_path, dex_name, api_level=None, with_analysis=True):
+    """
+    Worker entry point: parse one DEX and, for deep analysis, find the
+    permission-protected framework APIs its code actually calls.
+
+    Only plain data is returned so results are cheap to send back.
+    """
+    from androguard.core.bytecodes.dvm import DalvikVMFormat
+
+    started = time.perf_counter()
+    with zipfile.ZipFile(apk_path) as archive:
+        data = archive.read(dex_name)
+    vm = DalvikVMFormat(data)
+    # androguard names are MUTF8String; plain str keeps results picklable and JSON-serializable
+    classes = [str(c.get_name()) for c in vm.get_classes()]
+    methods = [f"{m.get_class_name()}->{m.get_name()}{m.get_descriptor()}" for m in vm.get_methods()]
+    parsed = time.perf_counter()
+
+    api_calls = {}
+    if with_analysis:
+        from androguard.core.analysis.analysis import Analysis
+        dx = Analysis(vm)
+        dx.create_xref()
+        permission_map = _permission_mappings(api_level)
+        for cls in dx.get_external_classes():
+            for method_analysis in cls.get_methods():
+                api = str(method_analysis.get_method().permission_api_name)
+                if api in permission_map:
+                    callers = len(list(method_analysis.get_xref_from()))
+                    if callers:
+                        api_calls[api] = {'permissions': permission_map[api], 'callers': callers}
+    finished = time.perf_counter()
+
+    return {
+        'name': dex_name,
+        'size': len(data),
+        'classes': classes,
+        'methods': methods,
+        'api_calls': api_calls,
+        'parse_ms': round((parsed - started) * 1000, 2),
+        'analysis_ms': round((finished - parsed) * 1000, 2),
+        'total_ms': round((finished - started) * 1000, 2)
+    }
+
+
+class DexAnalyzer:
+    """
+    Parses the ``classesN.dex`` files of an APK in parallel worker processes.
+
+    Each DEX is parsed, and for deep analysis cross-referenced, in its own
+    process. Only class names, method signatures and the permission-protected
+    framework APIs each DEX calls come back, and they are merged here.
+    Framework APIs are external to every DEX, so analysing the DEX files
+    separately finds the same API calls as one whole-APK ``Analysis``.
+
+    Results are cached per DEX content hash, so a new version of an app
+    only reparses the DEX files that changed.
+    """
+
+    def __init__(self, max_workers=None, start_method='spawn', parallel_min_bytes=DEFAULT_PARALLEL_MIN_BYTES,
+                 cache=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self.parallel_min_bytes = parallel_min_bytes
+        self.cache = cache or DexCache()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_workers = app.config.get('DEX_WORKERS') or self.max_workers
+        self.start_method = app.config.get('SCAN_WORKER_START_METHOD', self.start_method)
+        self.parallel_min_bytes = app.config.get('DEX_PARALLEL_MIN_BYTES', self.parallel_min_bytes)
+        self.cache.init_app(app)
+
+    @property
+    def executor(self):
+        # Created on first use so importing the app never spawns processes.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def analyze(self, apk_path, declared_permissions=None, api_level=None, with_analysis=True):
+        """
+        Parse every DEX of ``apk_path`` and merge the results.
+
+        Args:
+            apk_path: Path of the APK.
+            declared_permissions: Manifest permissions to check against the
+                APIs that are actually called. Read from the APK when None.
+            api_level: Target SDK used to pick the API permission map.
+                Read from the APK when None.
+            with_analysis: Cross-reference the code to find permission usage;
+                False only lists classes and methods.
+
+        Returns:
+            dict: ``classes``, ``methods``, ``dex_files`` (per-DEX sizes,
+            hashes, timings and whether the cache served them) and ``wall_ms``. Deep analysis adds ``permission_usage``.
+            If the APK has no DEX files, the dict holds an ``error`` instead.
+        """
+        started = time.perf_counter()
+        with zipfile.ZipFile(apk_path) as archive:
+            dex_sizes = {info.filename: info.file_size for info in archive.infolist() if DEX_NAME.match(info.filename)}
+        dex_names = sorted(dex_sizes, key=_dex_sort_key)
+        if not dex_names:
+            return {'error': 'No DEX files found in APK.'}
+
+        if with_analysis and (declared_permissions is None or api_level is None):
+            from androguard.core.bytecodes.apk import APK
+            apk = APK(apk_path)
+            if declared_permissions is None:
+                declared_permissions = apk.get_permissions()
+            if api_level is None:
+                api_level = apk.get_effective_target_sdk_version()
+
+        # Reuse what is known about DEX files seen before (usually all but one or two after an update)
+        digests = _dex_digests(apk_path, dex_names)
+        mode = 'deep' if with_analysis else 'classes'
+        level = _mapping_level(api_level) if with_analysis else None
+        keys = {name: DexCache.make_key(digests[name], mode, level) for name in dex_names}
+        cached = self.cache.get_many(keys.values())
+        parsed = {}
+        pending = [name for name in dex_names if keys[name] not in cached]
+        if len(pending) == 1 or self.max_workers == 1 or \
+                sum(dex_sizes[name] for name in pending) < self.parallel_min_bytes:
+            for name in pending:
+                parsed[name] = _analyze_dex(apk_path, name, api_level, with_analysis)
+        else:
+            futures = {name: self.executor.submit(_analyze_dex, apk_path, name, api_level, with_analysis)
+                       for name in pending}
+            parsed = {name: future.result() for name, future in futures.items()}
+        self.cache.set_many({keys[name]: {k: part[k] for k in ('size', 'classes', 'methods', 'api_calls')}
+                             for name, part in parsed.items()})
+
+        parts = []
+        for name in dex_names:
+            if name in parsed:
+                part = dict(parsed[name], cached=False)
+            else:
+                part = dict(cached[keys[name]], name=name, parse_ms=0.0, analysis_ms=0.0, total_ms=0.0, cached=True)
+            part['sha256'] = digests[name]
+            parts.append(part)
+
+        report = {
+            'classes': [name for part in parts for name in part['classes']],
+            'methods': [name for part in parts for name in part['methods']],
+            'dex_files': [{k: part[k] for k in ('name', 'sha256', 'size', 'cached', 'parse_ms', 'analysis_ms',
+                                                'total_ms')}
+                          for part in parts]
+        }
+        for entry, part in zip(report['dex_files'], parts):
+            entry['classes'] = len(part['classes'])
+            entry['methods'] = len(part['methods'])
+        if with_analysis:
+            report['permission_usage'] = self._permission_usage(parts, declared_permissions, api_level)
+        report['wall_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+    def _permission_usage(self, parts, declared_permissions, api_level):
+        used = {}
+        for part in parts:
+            for api, call in part['api_calls'].items():
+                for permission in call['permissions']:
+                    used.setdefault(permission, set()).add(api)
+        mapped = {p for permissions in _permission_mappings(api_level).values() for p in permissions}
+        declared = list(dict.fromkeys(declared_permissions or []))
+        return {
+            # Permission -> framework APIs called by the app that require it
+            'used': {p: sorted(used[p]) for p in declared if p in used},
+            # Declared, covered by the API map, but no call to a protected API was found
+            'unused': [p for p in declared if p in mapped and p not in used],
+            # Declared but not covered by the API map, so usage cannot be judged
+            'unverified': [p for p in declared if p not in mapped],
+            'undeclared': sorted(set(used) - set(declared)),
+            'api_level': api_level
+        }
+
+
+dex_analyzer = DexAnalyzer()
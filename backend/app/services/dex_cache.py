@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+
+DEFAULT_MAX_ENTRIES = 200000
+CACHE_FORMAT = 1  # Bump when the cached per-DEX fields change
+TRIM_EVERY = 1000
+
+
+def default_cache_path():
+    # Resolved from the environment so spawned scan workers share the web process's cache
+    return os.getenv('DEX_CACHE_PATH') or os.path.join(os.getenv('UPLOAD_FOLDER', './uploads'), 'dex_cache.sqlite3')
+
+
+class DexCache:
+    """
+    Persistent per-DEX analysis results keyed by the DEX content hash.
+
+    App updates usually change only one or two ``classesN.dex`` files, so
+    a rescan can reuse the cached class lists and API-usage facts of every
+    DEX it has seen before and reparse only the new ones. Entries are
+    stored as zlib-compressed JSON in a SQLite table. Once the table
+    holds more than ``max_entries`` rows, the least recently used entries
+    are trimmed.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._ready = False
+
+    def init_app(self, app):
+        self.path = app.config.get('DEX_CACHE_PATH') or self.path
+        self.max_entries = app.config.get('DEX_CACHE_MAX_ENTRIES', self.max_entries)
+        self._ready = False
+
+    @staticmethod
+    def make_key(dex_sha256, mode, api_level=None):
+        return f"{CACHE_FORMAT}:{dex_sha256}:{mode}:{api_level or ''}"
+
+    def get_many(self, keys):
+        """Return {key: entry} for the cached keys and mark them recently used."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = {}
+        try:
+            with self._connect() as db:
+                placeholders = ','.join('?' * len(keys))
+                for key, blob in db.execute(f'SELECT key, data FROM dex_cache WHERE key IN ({placeholders})', keys):
+                    found[key] = json.loads(zlib.decompress(blob))
+                if found:
+                    db.execute(f"UPDATE dex_cache SET last_used = ? WHERE key IN ({','.join('?' * len(found))})",
+                               [time.time(), *found])
+        except (sqlite3.Error, OSError, zlib.error, ValueError) as e:
+            print(f"[WARN] DEX cache lookup failed: {str(e)}")
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, entries):
+        """Store {key: entry}; entries must be JSON-serializable."""
+        if not entries:
+            return
+        now = time.time()
+        rows = [(key, zlib.compress(json.dumps(entry, separators=(',', ':')).encode('utf-8')), now)
+                for key, entry in entries.items()]
+        try:
+            with self._connect() as db:
+                db.executemany('INSERT OR REPLACE INTO dex_cache (key, data, last_used) VALUES (?, ?, ?)', rows)
+                self._writes += len(rows)
+                if self._writes >= TRIM_EVERY:
+                    self._writes = 0
+                    self._trim(db)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[WARN] DEX cache write failed: {str(e)}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'path': self.path
+        }
+
+    def _trim(self, db):
+        excess = db.execute('SELECT COUNT(*) FROM dex_cache').fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute('DELETE FROM dex_cache WHERE key IN '
+                       '(SELECT key FROM dex_cache ORDER BY last_used LIMIT ?)', (excess,))
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            self._create_table()
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _create_table(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS dex_cache '
+                       '(key TEXT PRIMARY KEY, data BLOB NOT NULL, last_used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS dex_cache_last_used ON dex_cache (last_used)')
+            db.commit()
+        finally:
+            db.close()
+        self._ready = True
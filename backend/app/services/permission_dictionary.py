@@ -0,0 +1,104 @@
+import hashlib
+import json
+from datetime import datetime
+from pymongo.errors import PyMongoError
+from app.services.risk_calculator import (DEFAULT_REMEDIATION, PERMISSION_DESCRIPTIONS, REMEDIATION_SUGGESTIONS,
+                                          scoring_engine)
+
+
+def generated_description(norm):
+    """Description used for permissions the tables do not describe"""
+    return f'Allows the app to {norm.lower().replace("_", " ")}'
+
+
+class PermissionDictionary:
+    """
+    Versioned permission descriptions and remediations shared by all scans.
+
+    Scan documents store only permission ids (the names as requested) and
+    numeric risks, plus the dictionary version they were written with. The
+    text is stored once per version in the ``permission_dictionary``
+    collection and joined back on read. The version is a digest of the text,
+    so it only changes when the wording does, and older scans keep
+    resolving against the wording they were written with. Versions are
+    cached in-process after the first lookup.
+    """
+
+    def __init__(self, mongo=None):
+        self.mongo = mongo
+        names = list(dict.fromkeys(list(PERMISSION_DESCRIPTIONS) + list(REMEDIATION_SUGGESTIONS)))
+        current = {
+            'entries': {
+                norm: [PERMISSION_DESCRIPTIONS.get(norm, generated_description(norm)),
+                       REMEDIATION_SUGGESTIONS.get(norm, DEFAULT_REMEDIATION)]
+                for norm in names
+            },
+            'default_remediation': DEFAULT_REMEDIATION
+        }
+        self.version = hashlib.sha256(json.dumps(current, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        self._versions = {self.version: current}
+
+    @property
+    def collection(self):
+        return self.mongo.db.permission_dictionary
+
+    def publish(self):
+        """Store the current version so scans written with it can be read by any worker."""
+        current = self._versions[self.version]
+        self.collection.update_one(
+            {'_id': self.version},
+            {'$setOnInsert': dict(current, created_at=datetime.utcnow())},
+            upsert=True
+        )
+
+    def get(self, version):
+        """The dictionary for ``version``, falling back to the current one if it is unknown."""
+        dictionary = self._versions.get(version)
+        if dictionary is None:
+            doc = None
+            if self.mongo is not None:
+                try:
+                    doc = self.collection.find_one({'_id': version})
+                except PyMongoError as e:
+                    print(f"[WARN] Permission dictionary lookup failed: {str(e)}")
+            if doc is None:
+                print(f"[WARN] Permission dictionary version {version} not found, using {self.version}")
+                return self._versions[self.version]
+            dictionary = self._versions[version] = {
+                'entries': doc['entries'],
+                'default_remediation': doc['default_remediation']
+            }
+        return dictionary
+
+    def compact(self, permissions):
+        """Split formatted permissions (or bare names) into parallel id and risk lists."""
+        ids = []
+        risks = []
+        for perm in permissions or []:
+            if isinstance(perm, dict):
+                ids.append(perm.get('name'))
+                risks.append(perm.get('risk'))
+            else:
+                ids.append(perm)
+                risks.append(scoring_engine.lookup(perm)[6])
+        return ids, risks
+
+    def expand(self, ids, risks, version=None):
+        """Rebuild the formatted permission list stored scans used to embed."""
+        dictionary = self.get(version or self.version)
+        entries = dictionary['entries']
+        default_remediation = dictionary['default_remediation']
+        lookup = scoring_engine.lookup
+        permissions = []
+        for name, risk in zip(ids, risks):
+            norm = lookup(name)[0]
+            entry = entries.get(norm)
+            description, remediation = entry if entry else (generated_description(norm), default_remediation)
+            permissions.append({
+                'name': name,
+                'description': description,
+                'risk': risk,
+                'enabled': True,
+                'remediation': remediation
+            })
+        return permissions
@@ -0,0 +1,273 @@
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+REPORT_TEMPLATE_VERSION = 1  # Bump whenever render_report's output changes; cached reports are keyed by it
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_EXPORT_IN_FLIGHT = 4  # Renders queued per worker during an export
+TRIM_EVERY = 200
+
+
+def render_report(scan_data, out):
+    """
+    Draw the PDF report for a scan document into ``out`` (a path or binary file).
+
+    Pages are finished and compressed as the listing reaches them, so a
+    scan with tens of thousands of permissions stays a few MB in memory.
+    Output is invariant: the same scan always gives the same bytes.
+    """
+    p = canvas.Canvas(out, pagesize=letter, invariant=1, pageCompression=1)
+    width, height = letter
+    y = height - 40
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(40, y, f"Scan Report: {scan_data.get('app_name', 'Unknown App')}")
+    y -= 30
+    p.setFont("Helvetica", 12)
+    p.drawString(40, y, f"Scan ID: {str(scan_data.get('_id', ''))}")
+    y -= 20
+    p.drawString(40, y, f"Risk Score: {scan_data.get('risk_score', 'N/A')}")
+    y -= 20
+    p.drawString(40, y, f"Timestamp: {scan_data.get('timestamp', '')}")
+    y -= 30
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(40, y, "Categories:")
+    y -= 20
+    p.setFont("Helvetica", 12)
+    for cat, score in (scan_data.get('categories', {}) or {}).items():
+        p.drawString(60, y, f"{cat}: {score}")
+        y -= 18
+        if y < 60:
+            p.showPage()
+            y = height - 40
+    y -= 10
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(40, y, "Critical Items:")
+    y -= 20
+    p.setFont("Helvetica", 12)
+    for item in (scan_data.get('critical_items', []) or []):
+        p.drawString(60, y, f"- {item}")
+        y -= 18
+        if y < 60:
+            p.showPage()
+            y = height - 40
+    y -= 10
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(40, y, "Permissions:")
+    y -= 20
+    p.setFont("Helvetica", 12)
+    for perm in (scan_data.get('permissions', []) or []):
+        if isinstance(perm, dict):
+            name = perm.get('name', str(perm))
+        else:
+            name = str(perm)
+        p.drawString(60, y, f"- {name}")
+        y -= 18
+        if y < 60:
+            p.showPage()
+            y = height - 40
+    p.save()
+
+
+def render_report_file(scan_data, path):
+    """Render into a temporary file next to ``path`` and rename it into place; returns ``path``."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.report-', suffix='.pdf', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            render_report(scan_data, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+class _ZipStream:
+    """Unseekable sink for ZipFile; the export generator hands out what it collects."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+class ReportStore:
+    """
+    Rendered scan reports, cached on disk and served straight from the file.
+
+    A report lives at ``<root>/<scan_id>-v<REPORT_TEMPLATE_VERSION>.pdf``;
+    it is rendered once per template version and then sent with
+    ``send_file`` from the path, so the WSGI server can use the platform's
+    zero-copy file transfer. Reports are written to a temporary file and
+    renamed into place, so concurrent requests never see a partial file.
+    When the directory grows past ``max_bytes`` the least recently served
+    reports are deleted.
+
+    ``export`` renders many reports in a process pool and yields a zip
+    archive as they complete, so an audit export starts streaming at once
+    instead of timing out while thousands of reports are drawn.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or os.path.join(os.getenv('UPLOAD_FOLDER', './uploads'), 'reports')
+        self.max_bytes = max_bytes
+        self.max_workers = os.cpu_count() or 1
+        self.start_method = 'spawn'
+        self.hits = 0
+        self.renders = 0
+        self._writes = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.root = app.config.get('REPORT_CACHE_DIR') or self.root
+        self.max_bytes = app.config.get('REPORT_CACHE_MAX_BYTES', self.max_bytes)
+        self.max_workers = app.config.get('REPORT_WORKERS') or self.max_workers
+        self.start_method = app.config.get('SCAN_WORKER_START_METHOD', self.start_method)
+
+    @property
+    def executor(self):
+        # Created on first export so importing the app never spawns processes.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def path_for(self, scan_data):
+        # Named after the stored document's id, never the id from the request
+        return os.path.join(self.root, f"{scan_data['_id']}-v{REPORT_TEMPLATE_VERSION}.pdf")
+
+    def get(self, scan_data):
+        """Path of the rendered report for a scan document, rendering it if needed."""
+        path = self.path_for(scan_data)
+        if self._touch(path):
+            return path
+        render_report_file(scan_data, path)
+        self._rendered()
+        return path
+
+    def forget(self, scan_id):
+        """Delete a removed scan's cached report."""
+        try:
+            os.remove(self.path_for({'_id': scan_id}))
+        except FileNotFoundError:
+            pass
+
+    def export(self, scan_ids, load):
+        """
+        Yield a zip archive of the reports for ``scan_ids``, in order.
+
+        ``load(scan_id)`` returns the scan document or None. Reports not
+        cached yet are rendered by the process pool, a few per worker at a
+        time. Unknown ids are listed in ``missing.txt`` at the end.
+        """
+        sink = _ZipStream()
+        missing = []
+        in_flight = deque()
+        limit = self.max_workers * DEFAULT_EXPORT_IN_FLIGHT
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+            def write_next():
+                scan_data, path, future = in_flight.popleft()
+                if future is not None:
+                    future.result()
+                    self._rendered()
+                archive.write(path, f"scan_report_{scan_data['_id']}.pdf")
+                return sink.drain()
+
+            for scan_id in scan_ids:
+                scan_data = load(scan_id)
+                if not scan_data:
+                    missing.append(scan_id)
+                    continue
+                path = self.path_for(scan_data)
+                future = None if self._touch(path) else self.executor.submit(render_report_file, scan_data, path)
+                in_flight.append((scan_data, path, future))
+                while len(in_flight) >= limit or (in_flight and in_flight[0][2] is None):
+                    yield from write_next()
+            while in_flight:
+                yield from write_next()
+            if missing:
+                archive.writestr('missing.txt', '\n'.join(missing) + '\n')
+        yield from sink.drain()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.renders
+            return {
+                'root': self.root,
+                'hits': self.hits,
+                'renders': self.renders,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _touch(self, path):
+        """True if ``path`` is cached; marks it recently served for trimming."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def _rendered(self):
+        with self._lock:
+            self.renders += 1
+            self._writes += 1
+            trim = self._writes >= TRIM_EVERY
+            if trim:
+                self._writes = 0
+        if trim:
+            self._trim()
+
+    def _trim(self):
+        try:
+            entries = []
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.endswith('.pdf') and not entry.name.startswith('.'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+        except OSError as e:
+            print(f"[WARN] Report cache trim failed: {str(e)}")
+
+
+report_store = ReportStore()
@@ -1,220 +1,446 @@
-import joblib
+import hashlib
+import json
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 import os
+import re
+from functools import lru_cache
+from itertools import chain, combinations
+from app.ml.model_registry import model_registry
 
 print("=== USING UPDATED RISK CALCULATOR ===")
 
+# Vendor prefixes stripped from permission names, tried in this order
+PERMISSION_PREFIXES = [
+    "android.permission.",
+    "com.google.android.gms.permission.",
+    "com.android.vending.",
+    "com.sonyericsson.home.permission.",
+    "com.google.android.providers.gsf.permission.",
+    "com.sec.android.provider.badge.permission.",
+    "com.google.android.c2dm.permission.",
+    "com.sonymobile.home.permission.",
+    "com.htc.launcher.permission.",
+    "com.google.android.youtube.permission.",
+    "com.google.android.youtube.",
+]
+
+# Dangerous permissions and their risk weights
+DANGEROUS_PERMISSIONS = {
+    # High Risk (weight: 1.0)
+    'READ_SMS': 1.0,
+    'RECEIVE_SMS': 1.0,
+    'READ_CONTACTS': 1.0,
+    'ACCESS_FINE_LOCATION': 1.0,
+    'RECORD_AUDIO': 1.0,
+    'READ_CALL_LOG': 1.0,
+    'CAMERA': 1.0,
+    'READ_EXTERNAL_STORAGE': 1.0,
+    'WRITE_EXTERNAL_STORAGE': 1.0,
+    'ACCESS_COARSE_LOCATION': 1.0,
+    
+    # Medium Risk (weight: 0.7)
+    'READ_PHONE_STATE': 0.7,
+    'ACCESS_NETWORK_STATE': 0.7,
+    'INTERNET': 0.7,
+    'ACCESS_WIFI_STATE': 0.7,
+    'WAKE_LOCK': 0.7,
+    
+    # Low Risk (weight: 0.3)
+    'VIBRATE': 0.3,
+    'RECEIVE_BOOT_COMPLETED': 0.3,
+    'GET_ACCOUNTS': 0.3,
+    'READ_SYNC_SETTINGS': 0.3,
+    'WRITE_SYNC_SETTINGS': 0.3
+}
+
+# Permission categories
+PERMISSION_CATEGORIES = {
+    'SMS': ['READ_SMS', 'RECEIVE_SMS', 'SEND_SMS'],
+    'Contacts': ['READ_CONTACTS', 'WRITE_CONTACTS'],
+    'Location': ['ACCESS_FINE_LOCATION', 'ACCESS_COARSE_LOCATION'],
+    'Storage': ['READ_EXTERNAL_STORAGE', 'WRITE_EXTERNAL_STORAGE'],
+    'Phone': ['READ_PHONE_STATE', 'READ_CALL_LOG'],
+    'Media': ['CAMERA', 'RECORD_AUDIO'],
+    'Network': ['INTERNET', 'ACCESS_NETWORK_STATE', 'ACCESS_WIFI_STATE'],
+    'System': ['WAKE_LOCK', 'VIBRATE', 'RECEIVE_BOOT_COMPLETED']
+}
+
+# Permission combinations reported as critical when all are present
+CRITICAL_COMBINATIONS = [
+    (['READ_SMS', 'RECEIVE_SMS'], "App can read and receive SMS messages"),
+    (['ACCESS_FINE_LOCATION', 'ACCESS_COARSE_LOCATION'], "App has access to precise location data"),
+    (['CAMERA', 'RECORD_AUDIO'], "App can access camera and record audio"),
+]
+
+PERMISSION_DESCRIPTIONS = {
+    'READ_SMS': 'Allows the app to read SMS messages',
+    'RECEIVE_SMS': 'Allows the app to receive SMS messages',
+    'READ_CONTACTS': 'Allows the app to read your contacts',
+    'ACCESS_FINE_LOCATION': 'Allows the app to access precise location',
+    'RECORD_AUDIO': 'Allows the app to record audio',
+    'READ_CALL_LOG': 'Allows the app to read call logs',
+    'CAMERA': 'Allows the app to access the camera',
+    'READ_EXTERNAL_STORAGE': 'Allows the app to read external storage',
+    'WRITE_EXTERNAL_STORAGE': 'Allows the app to write to external storage',
+    'ACCESS_COARSE_LOCATION': 'Allows the app to access approximate location',
+    'READ_PHONE_STATE': 'Allows the app to read phone state',
+    'ACCESS_NETWORK_STATE': 'Allows the app to access network information',
+    'INTERNET': 'Allows the app to access the internet',
+    'ACCESS_WIFI_STATE': 'Allows the app to access WiFi information',
+    'WAKE_LOCK': 'Allows the app to prevent device from sleeping',
+    'VIBRATE': 'Allows the app to control vibration',
+    'RECEIVE_BOOT_COMPLETED': 'Allows the app to start on device boot',
+    'GET_ACCOUNTS': 'Allows the app to access accounts on the device',
+    'READ_SYNC_SETTINGS': 'Allows the app to read sync settings',
+    'WRITE_SYNC_SETTINGS': 'Allows the app to write sync settings'
+}
+
+REMEDIATION_SUGGESTIONS = {
+    'READ_SMS': 'Consider if SMS access is necessary for core functionality',
+    'RECEIVE_SMS': 'Consider if SMS receiving is necessary for core functionality',
+    'READ_CONTACTS': 'Consider if contact access is necessary for core functionality',
+    'ACCESS_FINE_LOCATION': 'Consider using coarse location instead if precise location is not required',
+    'RECORD_AUDIO': 'Consider if audio recording is necessary for core functionality',
+    'READ_CALL_LOG': 'Consider if call log access is necessary for core functionality',
+    'CAMERA': 'Consider if camera access is necessary for core functionality',
+    'READ_EXTERNAL_STORAGE': 'Consider using app-specific storage instead',
+    'WRITE_EXTERNAL_STORAGE': 'Consider using app-specific storage instead',
+    'ACCESS_COARSE_LOCATION': 'Consider if location access is necessary for core functionality',
+    'READ_PHONE_STATE': 'Consider if phone state access is necessary for core functionality',
+    'ACCESS_NETWORK_STATE': 'Consider if network state access is necessary for core functionality',
+    'INTERNET': 'Consider if internet access is necessary for core functionality',
+    'ACCESS_WIFI_STATE': 'Consider if WiFi state access is necessary for core functionality',
+    'WAKE_LOCK': 'Consider if wake lock is necessary for core functionality',
+    'VIBRATE': 'Consider if vibration control is necessary for core functionality',
+    'RECEIVE_BOOT_COMPLETED': 'Consider if auto-start is necessary for core functionality',
+    'GET_ACCOUNTS': 'Consider if account access is necessary for core functionality',
+    'READ_SYNC_SETTINGS': 'Consider if sync settings access is necessary for core functionality',
+    'WRITE_SYNC_SETTINGS': 'Consider if sync settings modification is necessary for core functionality'
+}
+
+DEFAULT_REMEDIATION = 'Review if this permission is necessary for core functionality'
+
+
+class ScoringEngine:
+    """
+    Permission scoring tables compiled once per process.
+
+    Prefix stripping is a single anchored regex, and every distinct
+    permission string is resolved once to its normalized name, weight,
+    category, level, description and remediation. ``score`` then produces
+    the risk score, category risks, critical items and formatted
+    permissions in one pass over the permission list.
+    """
+
+    def __init__(self, dangerous_permissions, permission_categories):
+        self.dangerous_permissions = dangerous_permissions
+        self.permission_categories = permission_categories
+        self.prefix_pattern = re.compile('|'.join(re.escape(p) for p in PERMISSION_PREFIXES))
+        self.max_possible_weight = sum(dangerous_permissions.values())
+        self.category_of = {}
+        self.max_category_weights = {}
+        for category, perms in permission_categories.items():
+            for perm in perms:
+                self.category_of.setdefault(perm, category)
+            self.max_category_weights[category] = sum(dangerous_permissions.get(p, 0) for p in perms)
+        self.lookup = lru_cache(maxsize=8192)(self._resolve)
+
+        # Dense encoding used by score_batch: one column per known permission
+        # plus a trailing column that absorbs everything else.
+        self.vocabulary = list(dict.fromkeys(
+            list(dangerous_permissions) + [p for perms in permission_categories.values() for p in perms]))
+        self.other_column = len(self.vocabulary)
+        self.column_of = _ColumnIndex(self)
+        self.weight_vector = np.zeros(len(self.vocabulary) + 1)
+        self.category_matrix = np.zeros((len(self.vocabulary) + 1, len(permission_categories)))
+        for column, perm in enumerate(self.vocabulary):
+            self.weight_vector[column] = dangerous_permissions.get(perm, 0)
+        for j, perms in enumerate(permission_categories.values()):
+            for perm in perms:
+                self.category_matrix[self.vocabulary.index(perm), j] = dangerous_permissions.get(perm, 0)
+        self.critical_permissions = [
+            p for p in self.vocabulary
+            if dangerous_permissions.get(p, 0) >= 1.0 or any(p in perms for perms, _ in CRITICAL_COMBINATIONS)]
+        self.critical_columns = [self.vocabulary.index(p) for p in self.critical_permissions]
+        self.max_category_vector = np.array(
+            [self.max_category_weights[c] for c in permission_categories], dtype=float)
+
+    def normalize(self, perm):
+        match = self.prefix_pattern.match(perm)
+        return perm[match.end():] if match else perm
+
+    def _resolve(self, perm):
+        """Map a raw permission name to (norm, weight, category, level, description, remediation, risk)"""
+        norm = self.normalize(perm)
+        weight = self.dangerous_permissions.get(norm)
+        risk = weight if weight is not None else 0
+        level = 'high' if risk >= 1.0 else 'medium' if risk >= 0.7 else 'low'
+        description = PERMISSION_DESCRIPTIONS.get(norm, f'Allows the app to {norm.lower().replace("_", " ")}')
+        remediation = REMEDIATION_SUGGESTIONS.get(norm, DEFAULT_REMEDIATION)
+        return norm, weight, self.category_of.get(norm), level, description, remediation, risk * 10
+
+    def score(self, permissions):
+        """Return (permission risk, category risks, critical items, formatted permissions)"""
+        total_weight = 0
+        counts = {}
+        normalized = []
+        formatted_permissions = []
+        lookup = self.lookup
+        for perm in permissions:
+            norm, weight, _, _, description, remediation, risk = lookup(perm)
+            if weight is not None:
+                total_weight += weight
+            counts[norm] = counts.get(norm, 0) + 1
+            normalized.append(norm)
+            formatted_permissions.append({
+                'name': perm,
+                'description': description,
+                'risk': risk,  # Scale to 0-10
+                'enabled': True,
+                'remediation': remediation
+            })
+
+        max_possible_weight = self.max_possible_weight
+        base_risk = (total_weight / max_possible_weight) * 10 if max_possible_weight > 0 else 0
+
+        category_risks = {}
+        for category, perms in self.permission_categories.items():
+            # Accumulate in the same order as the per-category scan so floats match exactly
+            category_weight = 0
+            for perm in perms:
+                weight = self.dangerous_permissions.get(perm)
+                if weight is not None:
+                    for _ in range(counts.get(perm, 0)):
+                        category_weight += weight
+            max_category_weight = self.max_category_weights[category]
+            if max_category_weight > 0:
+                category_risks[category] = round((category_weight / max_category_weight) * 10, 2)
+            else:
+                category_risks[category] = 0
+
+        critical_items = self.critical_items(normalized)
+        return base_risk, category_risks, critical_items, formatted_permissions
+
+    def contributions(self, permissions):
+        """Return (total weight, {permission: weight it adds}) for a permission list"""
+        total_weight = 0
+        contributions = {}
+        for perm in permissions:
+            weight = self.lookup(perm)[1] or 0
+            total_weight += weight
+            contributions[perm] = contributions.get(perm, 0) + weight
+        return total_weight, contributions
+
+    def weight_to_risk(self, total_weight):
+        return (total_weight / self.max_possible_weight) * 10 if self.max_possible_weight > 0 else 0
+
+    def critical_items(self, normalized):
+        critical_items = []
+        perms_norm = set(normalized)
+        for perms, message in CRITICAL_COMBINATIONS:
+            if all(p in perms_norm for p in perms):
+                critical_items.append(message)
+        for perm in perms_norm:
+            weight = self.dangerous_permissions.get(perm)
+            if weight is not None and weight >= 1.0:
+                critical_items.append(f"App requests {perm.replace('_', ' ').lower()} permission")
+        return critical_items
+
+    def encode(self, permission_lists):
+        """Encode permission lists as an (apps x vocabulary+1) matrix of occurrence counts"""
+        lengths = np.fromiter(map(len, permission_lists), dtype=np.int64, count=len(permission_lists))
+        columns = np.fromiter(map(self.column_of.__getitem__, chain.from_iterable(permission_lists)),
+                              dtype=np.int64, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(permission_lists)), lengths)
+        width = self.other_column + 1
+        counts = np.bincount(rows * width + columns, minlength=len(permission_lists) * width)
+        return counts.reshape(len(permission_lists), width)
+
+    def score_batch(self, permission_lists, with_critical_items=True, critical_codes=False):
+        """
+        Score many permission lists with matrix products instead of per-app loops.
+
+        Returns (permission risks, category risks, critical items) where the
+        first two are arrays with one row per app. Scores agree with ``score``
+        to rounding precision; critical items follow vocabulary order and are
+        None when not requested. With ``critical_codes`` the critical items
+        come back as ``(item sets, per-app index into them)`` instead of one
+        list per app.
+        """
+        counts = self.encode(permission_lists)
+        if self.max_possible_weight > 0:
+            base_risks = counts @ self.weight_vector / self.max_possible_weight * 10
+        else:
+            base_risks = np.zeros(len(permission_lists))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            category_risks = np.where(self.max_category_vector > 0,
+                                      counts @ self.category_matrix / self.max_category_vector * 10, 0)
+        category_risks = np.round(category_risks, 2)
+        if not with_critical_items:
+            return base_risks, category_risks, None
+
+        # Critical items depend only on which of a handful of columns are present,
+        # so each app is reduced to a bitmask and the messages are built per mask.
+        present = counts[:, self.critical_columns] > 0
+        masks = present @ (1 << np.arange(len(self.critical_columns)))
+        if critical_codes:
+            unique_masks, codes = np.unique(masks, return_inverse=True)
+            return base_risks, category_risks, (
+                [self._critical_items_for_mask(mask) for mask in unique_masks.tolist()], codes)
+        messages = {}
+        critical_items = []
+        for mask in masks.tolist():
+            items = messages.get(mask)
+            if items is None:
+                items = messages[mask] = self._critical_items_for_mask(mask)
+            critical_items.append(list(items))
+        return base_risks, category_risks, critical_items
+
+    def _critical_items_for_mask(self, mask):
+        present = {perm for bit, perm in enumerate(self.critical_permissions) if mask >> bit & 1}
+        items = [message for perms, message in CRITICAL_COMBINATIONS if all(p in present for p in perms)]
+        for perm in self.critical_permissions:
+            if perm in present and self.dangerous_permissions.get(perm, 0) >= 1.0:
+                items.append(f"App requests {perm.replace('_', ' ').lower()} permission")
+        return items
+
+
+class _ColumnIndex(dict):
+    """Raw permission string -> encoding column, resolved on first sight."""
+
+    MAX_ENTRIES = 100000
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self.columns = {perm: i for i, perm in enumerate(engine.vocabulary)}
+
+    def __missing__(self, perm):
+        if len(self) >= self.MAX_ENTRIES:
+            self.clear()
+        column = self.columns.get(self.engine.normalize(perm), self.engine.other_column)
+        self[perm] = column
+        return column
+
+
+scoring_engine = ScoringEngine(DANGEROUS_PERMISSIONS, PERMISSION_CATEGORIES)
+# Digest of every table that shapes a scan result; cached results are keyed by it
+SCORING_TABLES_VERSION = hashlib.sha256(json.dumps(
+    [PERMISSION_PREFIXES, DANGEROUS_PERMISSIONS, PERMISSION_CATEGORIES, CRITICAL_COMBINATIONS,
+     PERMISSION_DESCRIPTIONS, REMEDIATION_SUGGESTIONS, DEFAULT_REMEDIATION],
+    sort_keys=True).encode()).hexdigest()[:12]
+
+
+def scoring_version():
+    """Identifies the scoring tables and model artifacts a scan result is computed with."""
+    return f"{SCORING_TABLES_VERSION}.{model_registry.version()}"
+
+
 class RiskCalculator:
-    def __init__(self):
-        # Use absolute paths to guarantee the model and vectorizer are found
-        model_path = r'D:/consent-engine-web/ml/training_scripts/ml/models/risk_model_20250607_234152.pkl'
-        vectorizer_path = r'D:/consent-engine-web/ml/training_scripts/ml/models/feature_vectorizer_20250607_234152.pkl'
-        print(f"Loading model from: {model_path}")
-        self.model = joblib.load(model_path)
-        self.vectorizer = joblib.load(vectorizer_path)
-        
-        # Define dangerous permissions and their risk weights
-        self.dangerous_permissions = {
-            # High Risk (weight: 1.0)
-            'READ_SMS': 1.0,
-            'RECEIVE_SMS': 1.0,
-            'READ_CONTACTS': 1.0,
-            'ACCESS_FINE_LOCATION': 1.0,
-            'RECORD_AUDIO': 1.0,
-            'READ_CALL_LOG': 1.0,
-            'CAMERA': 1.0,
-            'READ_EXTERNAL_STORAGE': 1.0,
-            'WRITE_EXTERNAL_STORAGE': 1.0,
-            'ACCESS_COARSE_LOCATION': 1.0,
-            
-            # Medium Risk (weight: 0.7)
-            'READ_PHONE_STATE': 0.7,
-            'ACCESS_NETWORK_STATE': 0.7,
-            'INTERNET': 0.7,
-            'ACCESS_WIFI_STATE': 0.7,
-            'WAKE_LOCK': 0.7,
-            
-            # Low Risk (weight: 0.3)
-            'VIBRATE': 0.3,
-            'RECEIVE_BOOT_COMPLETED': 0.3,
-            'GET_ACCOUNTS': 0.3,
-            'READ_SYNC_SETTINGS': 0.3,
-            'WRITE_SYNC_SETTINGS': 0.3
-        }
-        
-        # Define permission categories
-        self.permission_categories = {
-            'SMS': ['READ_SMS', 'RECEIVE_SMS', 'SEND_SMS'],
-            'Contacts': ['READ_CONTACTS', 'WRITE_CONTACTS'],
-            'Location': ['ACCESS_FINE_LOCATION', 'ACCESS_COARSE_LOCATION'],
-            'Storage': ['READ_EXTERNAL_STORAGE', 'WRITE_EXTERNAL_STORAGE'],
-            'Phone': ['READ_PHONE_STATE', 'READ_CALL_LOG'],
-            'Media': ['CAMERA', 'RECORD_AUDIO'],
-            'Network': ['INTERNET', 'ACCESS_NETWORK_STATE', 'ACCESS_WIFI_STATE'],
-            'System': ['WAKE_LOCK', 'VIBRATE', 'RECEIVE_BOOT_COMPLETED']
-        }
+    def __init__(self, registry=None):
+        # Models are shared through the registry and only deserialized on first use
+        self.registry = registry or model_registry
+        self.engine = scoring_engine
+        self.dangerous_permissions = DANGEROUS_PERMISSIONS
+        self.permission_categories = PERMISSION_CATEGORIES
+    
+    @property
+    def model(self):
+        return self.registry.get('risk_model')
+    
+    @property
+    def vectorizer(self):
+        return self.registry.get('risk_vectorizer')
     
     def calculate_risk(self, permissions, policy_text=None):
-        print("=== calculate_risk CALLED ===")
-        # Calculate base risk from permissions
-        base_risk = self._calculate_permission_risk(permissions)
-        
-        # Calculate category risks
-        category_risks = self._calculate_category_risks(permissions)
-        
-        # Get critical items
-        critical_items = self._get_critical_items(permissions)
+        # Score permissions, categories and critical items in a single pass
+        base_risk, category_risks, critical_items, formatted_permissions = self.engine.score(permissions)
         
         # If policy text is provided, incorporate it into the risk calculation
-        if policy_text:
-            text_features = self.vectorizer.transform([policy_text])
-            policy_risk = self.model.predict_proba(text_features.toarray())[0][1] * 10
-            final_risk = (base_risk + policy_risk) / 2
-        else:
-            final_risk = base_risk
+        final_risk = self.combine_risk(base_risk, self.policy_risk(policy_text))
         
         return {
             'risk_score': round(final_risk, 2),
             'categories': category_risks,
             'critical_items': critical_items,
-            'permissions': self._format_permissions(permissions)
+            'permissions': formatted_permissions
         }
     
-    def _normalize_permission(self, perm):
-        prefixes = [
-            "android.permission.",
-            "com.google.android.gms.permission.",
-            "com.android.vending.",
-            "com.sonyericsson.home.permission.",
-            "com.google.android.providers.gsf.permission.",
-            "com.sec.android.provider.badge.permission.",
-            "com.google.android.c2dm.permission.",
-            "com.sonymobile.home.permission.",
-            "com.htc.launcher.permission.",
-            "com.google.android.youtube.permission.",
-            "com.google.android.youtube.",
+    def policy_risk(self, policy_text):
+        """Return the model's 0-10 risk for a privacy policy text, or None without text"""
+        if not policy_text:
+            return None
+        text_features = self.vectorizer.transform([policy_text])
+        return self.model.predict_proba(text_features.toarray())[0][1] * 10
+    
+    def combine_risk(self, permission_risk, policy_risk=None):
+        """Blend the permission risk with an optional policy risk (unrounded)"""
+        if policy_risk is None:
+            return permission_risk
+        return (permission_risk + policy_risk) / 2
+    
+    def calculate_risk_batch(self, permission_lists, policy_texts=None, include_permissions=False, as_arrays=False):
+        """
+        Score many apps at once.
+
+        Permission lists are encoded against the known permission vocabulary
+        and scored with matrix products; policy texts (optional, aligned with
+        the permission lists) go through one batched transform/predict_proba.
+        With as_arrays=True the result is columnar: rounded scores as numpy
+        arrays, and critical items as the distinct item lists plus one index
+        per app into them, so no per-app dicts or lists are built.
+        """
+        base_risks, category_risks, critical_items = self.engine.score_batch(
+            permission_lists, critical_codes=as_arrays)
+        final_risks = base_risks
+        if policy_texts:
+            indices = [i for i, text in enumerate(policy_texts) if text]
+            if indices:
+                text_features = self.vectorizer.transform([policy_texts[i] for i in indices])
+                policy_risks = self.model.predict_proba(text_features.toarray())[:, 1] * 10
+                final_risks = base_risks.copy()
+                final_risks[indices] = (base_risks[indices] + policy_risks) / 2
+
+        categories = list(self.engine.permission_categories)
+        if as_arrays:
+            critical_item_sets, critical_item_codes = critical_items
+            return {
+                'risk_scores': np.round(final_risks, 2),
+                'categories': categories,
+                'category_risks': category_risks,
+                'critical_item_sets': critical_item_sets,
+                'critical_items': critical_item_codes
+            }
+        results = [
+            {'risk_score': risk, 'categories': dict(zip(categories, category_row)), 'critical_items': items}
+            for risk, category_row, items in zip(np.round(final_risks, 2).tolist(), category_risks.tolist(),
+                                                 critical_items)
         ]
-        for prefix in prefixes:
-            if perm.startswith(prefix):
-                return perm[len(prefix):]
-        return perm
+        if include_permissions:
+            for result, permissions in zip(results, permission_lists):
+                result['permissions'] = self.engine.score(permissions)[3]
+        return results
+    
+    def _normalize_permission(self, perm):
+        return self.engine.lookup(perm)[0]
 
     def _calculate_permission_risk(self, permissions):
-        total_weight = 0
-        max_possible_weight = sum(self.dangerous_permissions.values())
-        print(f"DEBUG: max_possible_weight = {max_possible_weight}")
-        print(f"DEBUG: dangerous_permissions keys = {list(self.dangerous_permissions.keys())}")
-        
-        for perm in permissions:
-            norm_perm = self._normalize_permission(perm)
-            print(f"DEBUG: {perm} -> {norm_perm}")
-            if norm_perm in self.dangerous_permissions:
-                weight = self.dangerous_permissions[norm_perm]
-                total_weight += weight
-                print(f"DEBUG: MATCHED! {norm_perm} has weight {weight}")
-            else:
-                print(f"DEBUG: NO MATCH for {norm_perm}")
-        
-        print(f"DEBUG: total_weight = {total_weight}")
-        result = (total_weight / max_possible_weight) * 10 if max_possible_weight > 0 else 0
-        print(f"DEBUG: final risk score = {result}")
-        return result
+        return self.engine.score(permissions)[0]
     
     def _calculate_category_risks(self, permissions):
-        category_risks = {}
-        for category, perms in self.permission_categories.items():
-            category_weight = 0
-            for perm in perms:
-                for p in permissions:
-                    norm_p = self._normalize_permission(p)
-                    if norm_p == perm and norm_p in self.dangerous_permissions:
-                        category_weight += self.dangerous_permissions[norm_p]
-            max_category_weight = sum(self.dangerous_permissions.get(p, 0) for p in perms)
-            if max_category_weight > 0:
-                category_risks[category] = round((category_weight / max_category_weight) * 10, 2)
-            else:
-                category_risks[category] = 0
-        return category_risks
+        return self.engine.score(permissions)[1]
     
     def _get_critical_items(self, permissions):
-        critical_items = []
-        perms_norm = set(self._normalize_permission(p) for p in permissions)
-        if all(p in perms_norm for p in ['READ_SMS', 'RECEIVE_SMS']):
-            critical_items.append("App can read and receive SMS messages")
-        if all(p in perms_norm for p in ['ACCESS_FINE_LOCATION', 'ACCESS_COARSE_LOCATION']):
-            critical_items.append("App has access to precise location data")
-        if all(p in perms_norm for p in ['CAMERA', 'RECORD_AUDIO']):
-            critical_items.append("App can access camera and record audio")
-        for perm in perms_norm:
-            if perm in self.dangerous_permissions and self.dangerous_permissions[perm] >= 1.0:
-                critical_items.append(f"App requests {perm.replace('_', ' ').lower()} permission")
-        return critical_items
+        return self.engine.critical_items([self._normalize_permission(p) for p in permissions])
     
     def _format_permissions(self, permissions):
-        formatted_permissions = []
-        for perm in permissions:
-            norm_perm = self._normalize_permission(perm)
-            risk = self.dangerous_permissions.get(norm_perm, 0)
-            risk_level = 'high' if risk >= 1.0 else 'medium' if risk >= 0.7 else 'low'
-            formatted_permissions.append({
-                'name': perm,
-                'description': self._get_permission_description(norm_perm),
-                'risk': risk * 10,  # Scale to 0-10
-                'enabled': True,
-                'remediation': self._get_remediation_suggestion(norm_perm)
-            })
-        return formatted_permissions
+        return self.engine.score(permissions)[3]
     
     def _get_permission_description(self, permission):
-        descriptions = {
-            'READ_SMS': 'Allows the app to read SMS messages',
-            'RECEIVE_SMS': 'Allows the app to receive SMS messages',
-            'READ_CONTACTS': 'Allows the app to read your contacts',
-            'ACCESS_FINE_LOCATION': 'Allows the app to access precise location',
-            'RECORD_AUDIO': 'Allows the app to record audio',
-            'READ_CALL_LOG': 'Allows the app to read call logs',
-            'CAMERA': 'Allows the app to access the camera',
-            'READ_EXTERNAL_STORAGE': 'Allows the app to read external storage',
-            'WRITE_EXTERNAL_STORAGE': 'Allows the app to write to external storage',
-            'ACCESS_COARSE_LOCATION': 'Allows the app to access approximate location',
-            'READ_PHONE_STATE': 'Allows the app to read phone state',
-            'ACCESS_NETWORK_STATE': 'Allows the app to access network information',
-            'INTERNET': 'Allows the app to access the internet',
-            'ACCESS_WIFI_STATE': 'Allows the app to access WiFi information',
-            'WAKE_LOCK': 'Allows the app to prevent device from sleeping',
-            'VIBRATE': 'Allows the app to control vibration',
-            'RECEIVE_BOOT_COMPLETED': 'Allows the app to start on device boot',
-            'GET_ACCOUNTS': 'Allows the app to access accounts on the device',
-            'READ_SYNC_SETTINGS': 'Allows the app to read sync settings',
-            'WRITE_SYNC_SETTINGS': 'Allows the app to write sync settings'
-        }
-        return descriptions.get(permission, f'Allows the app to {permission.lower().replace("_", " ")}')
+        return PERMISSION_DESCRIPTIONS.get(permission, f'Allows the app to {permission.lower().replace("_", " ")}')
     
     def _get_remediation_suggestion(self, permission):
-        suggestions = {
-            'READ_SMS': 'Consider if SMS access is necessary for core functionality',
-            'RECEIVE_SMS': 'Consider if SMS receiving is necessary for core functionality',
-            'READ_CONTACTS': 'Consider if contact access is necessary for core functionality',
-            'ACCESS_FINE_LOCATION': 'Consider using coarse location instead if precise location is not required',
-            'RECORD_AUDIO': 'Consider if audio recording is necessary for core functionality',
-            'READ_CALL_LOG': 'Consider if call log access is necessary for core functionality',
-            'CAMERA': 'Consider if camera access is necessary for core functionality',
-            'READ_EXTERNAL_STORAGE': 'Consider using app-specific storage instead',
-            'WRITE_EXTERNAL_STORAGE': 'Consider using app-specific storage instead',
-            'ACCESS_COARSE_LOCATION': 'Consider if location access is necessary for core functionality',
-            'READ_PHONE_STATE': 'Consider if phone state access is necessary for core functionality',
-            'ACCESS_NETWORK_STATE': 'Consider if network state access is necessary for core functionality',
-            'INTERNET': 'Consider if internet access is necessary for core functionality',
-            'ACCESS_WIFI_STATE': 'Consider if WiFi state access is necessary for core functionality',
-            'WAKE_LOCK': 'Consider if wake lock is necessary for core functionality',
-            'VIBRATE': 'Consider if vibration control is necessary for core functionality',
-            'RECEIVE_BOOT_COMPLETED': 'Consider if auto-start is necessary for core functionality',
-            'GET_ACCOUNTS': 'Consider if account access is necessary for core functionality',
-            'READ_SYNC_SETTINGS': 'Consider if sync settings access is necessary for core functionality',
-            'WRITE_SYNC_SETTINGS': 'Consider if sync settings modification is necessary for core functionality'
-        }
-        return suggestions.get(permission, 'Review if this permission is necessary for core functionality')
+        return REMEDIATION_SUGGESTIONS.get(permission, DEFAULT_REMEDIATION)
 
     def test_risk_prediction(self):
         """Test function to demonstrate risk prediction with different permission combinations"""
@@ -314,6 +540,12 @@ class PermissionOptimizer:
         # Add more mappings as needed
     }
 
+    # Removal-plan strategies accepted by optimize_permissions
+    STRATEGIES = ('greedy', 'exhaustive')
+
+    # Largest candidate set searched subset by subset
+    EXHAUSTIVE_LIMIT = 16
+
     def __init__(self, risk_calculator=None):
         self.risk_calculator = risk_calculator or RiskCalculator()
 
@@ -326,18 +558,22 @@ class PermissionOptimizer:
             minimal_set.update(self.MINIMAL_PERMISSIONS.get(feature, set()))
         return list(minimal_set)
 
-    def optimize_permissions(self, app_features, requested_permissions, policy_text=None, policy_summary=None):
+    def optimize_permissions(self, app_features, requested_permissions, policy_text=None, policy_summary=None,
+                             max_removals=None, strategy='greedy'):
         """
         Suggests which permissions can be removed to lower risk, while maintaining required features.
-        Returns a list of recommendations with expected risk reduction.
+        Returns a list of recommendations with expected risk reduction and a multi-permission removal plan.
+
+        Permission risk is additive, so every what-if is evaluated from per-permission
+        contributions computed in one pass, and the policy model runs at most once.
         """
         minimal_set = set(self.recommend_minimal_permissions(app_features, requested_permissions))
-        base_risk = self.risk_calculator.calculate_risk(requested_permissions, policy_text)["risk_score"]
+        evaluator = self._evaluator(requested_permissions, policy_text)
+        base_risk = evaluator.risk()
         recommendations = []
         for perm in requested_permissions:
             if perm not in minimal_set:
-                test_perms = [p for p in requested_permissions if p != perm]
-                new_risk = self.risk_calculator.calculate_risk(test_perms, policy_text)["risk_score"]
+                new_risk = evaluator.risk([perm])
                 if new_risk < base_risk:
                     recommendations.append({
                         "permission": perm,
@@ -349,11 +585,64 @@ class PermissionOptimizer:
             "minimal_permissions": list(minimal_set),
             "unnecessary_permissions": [p for p in requested_permissions if p not in minimal_set],
             "recommendations": recommendations,
+            "removal_plan": self.plan_removals(requested_permissions, minimal_set, evaluator,
+                                               max_removals=max_removals, strategy=strategy),
             "base_risk": base_risk,
             "knowledge_base": {p: self.get_permission_knowledge(p) for p in requested_permissions},
             "policy_summary": policy_summary or ""
         }
 
+    def plan_removals(self, requested_permissions, minimal_set, evaluator, max_removals=None, strategy='greedy'):
+        """
+        Find the set of removable permissions that minimizes risk while keeping every
+        permission required by the requested features.
+
+        ``greedy`` removes permissions in order of decreasing contribution, which is
+        optimal for this additive score; ``exhaustive`` checks every subset of up to
+        ``max_removals`` permissions and falls back to greedy above EXHAUSTIVE_LIMIT
+        candidates.
+
+        Unlike ``unnecessary_permissions``, which matches feature permissions
+        exactly, the plan also treats ``android.permission.X`` as satisfying a
+        required ``X``, so it never proposes removing a permission a feature needs.
+        """
+        candidates = [p for p in dict.fromkeys(requested_permissions)
+                      if not self._is_required(p, minimal_set) and evaluator.contributions[p] > 0]
+        limit = len(candidates) if max_removals is None else max(0, min(max_removals, len(candidates)))
+        if strategy == 'exhaustive' and len(candidates) <= self.EXHAUSTIVE_LIMIT:
+            best = ()
+            best_risk = evaluator.risk()
+            for size in range(1, limit + 1):
+                for subset in combinations(candidates, size):
+                    risk = evaluator.risk(subset)
+                    if risk < best_risk:
+                        best, best_risk = subset, risk
+            removal = sorted(best, key=lambda p: -evaluator.contributions[p])
+        else:
+            strategy = 'greedy'
+            removal = sorted(candidates, key=lambda p: -evaluator.contributions[p])[:limit]
+
+        steps = []
+        for i, perm in enumerate(removal, 1):
+            steps.append({"permission": perm, "risk_after": evaluator.risk(removal[:i])})
+        removed = set(removal)
+        return {
+            "strategy": strategy,
+            "remove": removal,
+            "keep": [p for p in dict.fromkeys(requested_permissions) if p not in removed],
+            "risk_before": evaluator.risk(),
+            "risk_after": evaluator.risk(removal),
+            "steps": steps
+        }
+
+    def _evaluator(self, requested_permissions, policy_text):
+        calculator = self.risk_calculator
+        total_weight, contributions = calculator.engine.contributions(requested_permissions)
+        return _WhatIfEvaluator(calculator, total_weight, contributions, calculator.policy_risk(policy_text))
+
+    def _is_required(self, perm, minimal_set):
+        return perm in minimal_set or self.risk_calculator._normalize_permission(perm) in minimal_set
+
     def get_permission_knowledge(self, permission):
         return PERMISSION_KNOWLEDGE_BASE.get(permission, {})
 
@@ -364,4 +653,19 @@ class PermissionOptimizer:
             info = PERMISSION_KNOWLEDGE_BASE.get(perm, {})
             if info.get("risk") == "High" and (not policy_summary or "consent" not in policy_summary.lower()):
                 issues.append(f"{perm}: High-risk permission with weak/no consent in policy.")
-        return issues
\ No newline at end of file
+        return issues
+
+
+class _WhatIfEvaluator:
+    """Risk of a fixed permission list with some permissions removed, from cached contributions."""
+
+    def __init__(self, risk_calculator, total_weight, contributions, policy_risk):
+        self.risk_calculator = risk_calculator
+        self.total_weight = total_weight
+        self.contributions = contributions
+        self.policy_risk = policy_risk
+
+    def risk(self, removed=()):
+        weight = self.total_weight - sum(self.contributions[p] for p in removed)
+        permission_risk = self.risk_calculator.engine.weight_to_risk(weight)
+        return round(self.risk_calculator.combine_risk(permission_risk, self.policy_risk), 2)
@@ -0,0 +1,78 @@
+import copy
+from datetime import datetime, timedelta
+from pymongo.errors import OperationFailure, PyMongoError
+from app.utils.lru import LRUCache
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+
+
+class ScanCache:
+    """
+    Result cache for APK scans keyed by the SHA-256 of the uploaded file.
+
+    Lookups go to an in-process LRU first and then to the ``scan_cache``
+    Mongo collection, whose documents are expired by a TTL index so the
+    collection never has to be pruned by hand.
+    """
+
+    def __init__(self, mongo=None):
+        self.mongo = mongo
+        self.ttl_seconds = DEFAULT_CACHE_TTL
+        self.memory = LRUCache(DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL)
+
+    def init_app(self, app):
+        self.ttl_seconds = app.config.get('SCAN_CACHE_TTL', DEFAULT_CACHE_TTL)
+        self.memory = LRUCache(app.config.get('SCAN_CACHE_SIZE', DEFAULT_CACHE_SIZE), self.ttl_seconds)
+
+    @property
+    def collection(self):
+        return self.mongo.db.scan_cache
+
+    def ensure_indexes(self):
+        """Create (or retune) the TTL index that expires cached results."""
+        try:
+            self.collection.create_index('created_at', expireAfterSeconds=self.ttl_seconds)
+        except OperationFailure:
+            # The index exists with a different TTL; adjust it in place.
+            self.mongo.db.command('collMod', 'scan_cache', index={
+                'keyPattern': {'created_at': 1},
+                'expireAfterSeconds': self.ttl_seconds
+            })
+
+    def get(self, digest):
+        """Return a copy of the cached result for ``digest`` or None."""
+        result = self.memory.get(digest)
+        if result is None and self.mongo is not None:
+            now = datetime.utcnow()
+            try:
+                # Mongo's TTL monitor runs about once a minute; expired documents may still be there
+                doc = self.collection.find_one({'_id': digest,
+                                                'created_at': {'$gt': now - timedelta(seconds=self.ttl_seconds)}})
+            except PyMongoError as e:
+                print(f"[WARN] Scan cache lookup failed: {str(e)}")
+                doc = None
+            if doc:
+                result = doc['result']
+                # Keep it in memory only for what is left of its Mongo lifetime
+                remaining = self.ttl_seconds - (now - doc['created_at']).total_seconds()
+                self.memory.set(digest, result, ttl=max(remaining, 0.001))
+        return copy.deepcopy(result) if result is not None else None
+
+    def set(self, digest, result):
+        """Store a scan result; per-scan fields such as scan_id are dropped."""
+        result = {k: v for k, v in result.items() if k != 'scan_id'}
+        self.memory.set(digest, copy.deepcopy(result))
+        if self.mongo is None:
+            return
+        try:
+            self.collection.replace_one(
+                {'_id': digest},
+                {'_id': digest, 'result': result, 'created_at': datetime.utcnow()},
+                upsert=True
+            )
+        except PyMongoError as e:
+            print(f"[WARN] Scan cache write failed: {str(e)}")
+
+    def stats(self):
+        return self.memory.stats()
@@ -0,0 +1,186 @@
+import copy
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+import bson
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from app.utils.lru import LRUCache
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_ENTRIES = 500000
+TRIM_EVERY = 1000
+
+
+class ScanDocumentCache:
+    """
+    Read-through cache of stored scan documents for /results and /download-report.
+
+    Scan documents never change once written, so a document is loaded
+    from Mongo (through ``AppScan``, permission text joined) at most once
+    per process and then served from an in-process LRU bounded by entry
+    count and bytes. With ``SCAN_DOC_CACHE_PATH`` set, documents are also
+    kept in a SQLite file that every worker on the host shares, so one
+    worker's load serves the others. Each document carries an ETag
+    derived from its content, for conditional requests. Unknown ids and
+    scans still queued for writing are not cached.
+    """
+
+    def __init__(self, mongo=None):
+        self.mongo = mongo
+        self.memory = LRUCache(DEFAULT_CACHE_SIZE, max_bytes=DEFAULT_CACHE_BYTES)
+        self.path = None
+        self.disk_max_entries = DEFAULT_DISK_MAX_ENTRIES
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.loads = 0
+        self._writes = 0
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.memory = LRUCache(app.config.get('SCAN_DOC_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+                               max_bytes=app.config.get('SCAN_DOC_CACHE_BYTES', DEFAULT_CACHE_BYTES))
+        self.path = app.config.get('SCAN_DOC_CACHE_PATH') or None
+        self.disk_max_entries = app.config.get('SCAN_DOC_CACHE_DISK_ENTRIES', DEFAULT_DISK_MAX_ENTRIES)
+        self._ready = False
+
+    def get(self, scan_id):
+        """
+        Return ``(document, etag)`` for ``scan_id``, or ``(None, None)`` if there is no such scan.
+
+        A scan still queued in the scan-log writer is returned with no
+        ETag and is not cached: it is not in Mongo yet, and may never be.
+        """
+        entry = self.memory.get(scan_id)
+        if entry is None:
+            raw = self._disk_get(scan_id)
+            if raw is None:
+                from app.models.app_scan import AppScan
+                model = AppScan(self.mongo)
+                # Pending first: a scan written in between is then found by find_one
+                pending = self._pending(scan_id)
+                if pending is not None:
+                    return model.expand_permissions(copy.deepcopy(pending)), None
+                document = model.get_scan_by_id(scan_id, include_pending=False)
+                if document is None:
+                    return None, None
+                with self._lock:
+                    self.loads += 1
+                raw = bson.encode(document)
+                self._disk_set(scan_id, raw)
+            else:
+                document = bson.decode(raw)
+            entry = (document, self.make_etag(raw))
+            self.memory.set(scan_id, entry, size=len(raw))
+        document, etag = entry
+        return copy.deepcopy(document), etag
+
+    def forget(self, scan_id):
+        """Drop a deleted scan from this process's memory and the shared disk tier."""
+        self.memory.pop(scan_id)
+        if not self.path:
+            return
+        try:
+            with self._connect() as db:
+                db.execute('DELETE FROM scan_documents WHERE scan_id = ?', (scan_id,))
+        except (sqlite3.Error, OSError) as e:
+            print(f"[WARN] Scan document cache delete failed: {str(e)}")
+
+    @staticmethod
+    def _pending(scan_id):
+        from app.services.scan_log_writer import scan_log_writer
+        try:
+            return scan_log_writer.pending(ObjectId(scan_id))
+        except (InvalidId, TypeError):
+            return None
+
+    @staticmethod
+    def make_etag(raw):
+        return hashlib.sha256(raw).hexdigest()[:32]
+
+    def stats(self):
+        memory = self.memory.stats()
+        with self._lock:
+            lookups = memory['hits'] + memory['misses']
+            served_from_cache = memory['hits'] + self.disk_hits
+            return {
+                'memory': memory,
+                'disk': {
+                    'path': self.path,
+                    'hits': self.disk_hits,
+                    'misses': self.disk_misses
+                },
+                'mongo_loads': self.loads,
+                'hit_ratio': round(served_from_cache / lookups, 4) if lookups else 0.0
+            }
+
+    def _disk_get(self, scan_id):
+        if not self.path:
+            return None
+        raw = None
+        try:
+            with self._connect() as db:
+                row = db.execute('SELECT data FROM scan_documents WHERE scan_id = ?', (scan_id,)).fetchone()
+                if row is not None:
+                    raw = zlib.decompress(row[0])
+                    db.execute('UPDATE scan_documents SET last_used = ? WHERE scan_id = ?', (time.time(), scan_id))
+        except (sqlite3.Error, OSError, zlib.error) as e:
+            print(f"[WARN] Scan document cache lookup failed: {str(e)}")
+        with self._lock:
+            if raw is None:
+                self.disk_misses += 1
+            else:
+                self.disk_hits += 1
+        return raw
+
+    def _disk_set(self, scan_id, raw):
+        if not self.path:
+            return
+        try:
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO scan_documents (scan_id, data, last_used) VALUES (?, ?, ?)',
+                           (scan_id, zlib.compress(raw), time.time()))
+                with self._lock:
+                    self._writes += 1
+                    trim = self._writes >= TRIM_EVERY
+                    if trim:
+                        self._writes = 0
+                if trim:
+                    excess = db.execute('SELECT COUNT(*) FROM scan_documents').fetchone()[0] - self.disk_max_entries
+                    if excess > 0:
+                        db.execute('DELETE FROM scan_documents WHERE scan_id IN '
+                                   '(SELECT scan_id FROM scan_documents ORDER BY last_used LIMIT ?)', (excess,))
+        except (sqlite3.Error, OSError) as e:
+            print(f"[WARN] Scan document cache write failed: {str(e)}")
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            self._create_table()
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _create_table(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS scan_documents '
+                       '(scan_id TEXT PRIMARY KEY, data BLOB NOT NULL, last_used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS scan_documents_last_used ON scan_documents (last_used)')
+            db.commit()
+        finally:
+            db.close()
+        self._ready = True
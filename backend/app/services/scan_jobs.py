@@ -0,0 +1,192 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+DEFAULT_JOB_HISTORY = 1000
+# Settings passed to workers for DEX analysis; they are spawned and never run create_app
+DEX_CONFIG_KEYS = ('DEX_CACHE_PATH', 'DEX_CACHE_MAX_ENTRIES', 'DEX_PARALLEL_MIN_BYTES', 'SCAN_WORKER_START_METHOD')
+# Stages a job passes through, per scan mode; progress is the position in this list
+JOB_STAGES = {
+    'fast': ('queued', 'started', 'permissions_extracted', 'scored', 'finalizing', 'completed'),
+    'deep': ('queued', 'started', 'permissions_extracted', 'scored', 'code_analyzed', 'finalizing', 'completed')
+}
+
+_progress_queue = None  # Set in each worker process by _init_worker
+
+
+def _init_worker(progress_queue, dex_config=None):
+    global _progress_queue
+    _progress_queue = progress_queue
+    # The scan pool already uses every core, so DEX files are parsed serially here
+    # instead of each worker starting a nested pool of its own.
+    from app.services.dex_analysis import dex_analyzer
+    dex_analyzer.init_app(SimpleNamespace(config=dict(dex_config or {}, DEX_WORKERS=1)))
+
+
+def _run_scan(job_id, apk_path, scan_mode='fast'):
+    """Worker entry point: extract and score permissions without touching Mongo."""
+    from app.services.scanner import APKScanner
+
+    def report(stage):
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, stage))
+
+    report('started')
+    return APKScanner(None).scan_apk(apk_path, scan_mode=scan_mode, progress=report)
+
+
+class ScanJobQueue:
+    """
+    Runs APK analysis in a pool of worker processes so that androguard
+    parsing neither blocks request threads nor contends for the GIL.
+
+    Workers only compute the risk result; logging the scan, filling the
+    scan cache and emitting ``scan_complete`` happen back in the web
+    process once the job finishes. Workers report each stage they reach
+    over a queue, which a listener thread applies to the job, so a job
+    only shows as running once a worker has actually picked it up.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_workers = os.cpu_count() or 1
+        self.max_jobs = DEFAULT_JOB_HISTORY
+        self.start_method = 'spawn'
+        self.dex_config = {}
+        self._executor = None
+        self._progress = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('SCAN_WORKERS') or self.max_workers
+        self.max_jobs = app.config.get('SCAN_JOB_HISTORY', DEFAULT_JOB_HISTORY)
+        self.start_method = app.config.get('SCAN_WORKER_START_METHOD', self.start_method)
+        self.dex_config = {key: app.config[key] for key in DEX_CONFIG_KEYS if key in app.config}
+
+    @property
+    def executor(self):
+        # Created on first use so importing the app never spawns processes.
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._progress = context.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self._progress, self.dex_config)
+                )
+                threading.Thread(target=self._listen, args=(self._progress,), name='scan-job-progress',
+                                 daemon=True).start()
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def submit(self, apk_path, user_id='anonymous', app_name=None, cache_key=None, scan_mode='fast',
+               apk_sha256=None):
+        """Queue an APK for analysis and return the job id."""
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'stage': 'queued',
+            'user_id': user_id,
+            'app_name': app_name,
+            'scan_mode': scan_mode,
+            'cache_key': cache_key,
+            'apk_sha256': apk_sha256,
+            'submitted_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'future': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+        future = self.executor.submit(_run_scan, job_id, apk_path, scan_mode)
+        job['future'] = future
+        future.add_done_callback(lambda f: self._on_done(job, f))
+        return job_id
+
+    def get(self, job_id):
+        """Return the public view of a job, or None if it is unknown."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        view = {k: v for k, v in job.items() if k not in ('future', 'cache_key', 'apk_sha256')}
+        stages = JOB_STAGES.get(job['scan_mode'], JOB_STAGES['fast'])
+        if job['status'] in ('completed', 'failed'):
+            view['progress'] = 100
+        else:
+            view['progress'] = round(100 * stages.index(job['stage']) / (len(stages) - 1))
+        return view
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._progress.put(None)
+            self._progress = None
+
+    def _listen(self, progress):
+        # Stage reports may trail the job's completion; never move a finished job backwards
+        while True:
+            item = progress.get()
+            if item is None:
+                break
+            job_id, stage = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job['status'] in ('queued', 'running'):
+                    job['status'] = 'running'
+                    job['stage'] = stage
+
+    def _prune(self):
+        # Forget the oldest finished jobs once the history is full.
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]['status'] in ('completed', 'failed'):
+                del self._jobs[job_id]
+
+    def _on_done(self, job, future):
+        from app import mongo, scan_cache
+        from app.services.scanner import APKScanner
+        from socketio_instance import socketio
+
+        with self._lock:
+            job['status'] = job['stage'] = 'finalizing'
+        try:
+            result = future.result()
+            if not result or 'error' in result:
+                raise RuntimeError((result or {}).get('error', 'Failed to analyze APK'))
+            with self.app.app_context():
+                if job['cache_key']:
+                    scan_cache.set(job['cache_key'], result)
+                APKScanner(mongo).log_result(result, user_id=job['user_id'], app_name=job['app_name'],
+                                             apk_sha256=job['apk_sha256'])
+            job['result'] = result
+            job['status'] = job['stage'] = 'completed'
+        except Exception as e:
+            print(f"[ERROR] Scan job {job['job_id']} failed: {str(e)}")
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        finally:
+            job['finished_at'] = datetime.utcnow().isoformat()
+
+        if job['status'] == 'completed' and 'scan_id' in job['result']:
+            socketio.emit('scan_complete', {
+                'user_id': job['user_id'],
+                'scan_id': job['result']['scan_id'],
+                'job_id': job['job_id'],
+                'risk_score': job['result'].get('risk_score'),
+                'app_name': job['app_name']
+            }, room=job['user_id'])
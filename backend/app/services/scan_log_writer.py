@@ -0,0 +1,201 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.2
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_ENQUEUE_TIMEOUT = 5
+MAX_ATTEMPTS = 3
+DUPLICATE_KEY = 11000
+_FLUSH = object()
+_STOP = object()
+
+
+class ScanLogWriter:
+    """
+    Writes scan documents to Mongo in batches off the request path.
+
+    ``submit`` gives the document its ObjectId up front and returns it
+    immediately. A writer thread drains a bounded queue with
+    ``insert_many(ordered=False)``, flushing when ``batch_size`` documents
+    are waiting or ``flush_interval`` seconds after the first one arrived.
+    A full queue blocks callers for up to ``enqueue_timeout`` seconds and
+    then falls back to a direct insert, so bursts slow down instead of
+    losing scans. Until a document is written, ``pending`` returns it so
+    a scan can be read back as soon as its id is handed out. Whatever is
+    queued is flushed at interpreter exit.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.queue_size = DEFAULT_QUEUE_SIZE
+        self.enqueue_timeout = DEFAULT_ENQUEUE_TIMEOUT
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._pending = {}
+        self._counts = {'written': 0, 'batches': 0, 'direct_writes': 0, 'failed': 0}
+        self._lock = threading.Condition()
+        self._exit_registered = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SCAN_LOG_ASYNC', True)
+        self.batch_size = app.config.get('SCAN_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = app.config.get('SCAN_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self.queue_size = app.config.get('SCAN_LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        self.enqueue_timeout = app.config.get('SCAN_LOG_ENQUEUE_TIMEOUT', DEFAULT_ENQUEUE_TIMEOUT)
+
+    def submit(self, collection, doc):
+        """Queue ``doc`` for insertion into ``collection`` and return its ``_id``."""
+        doc.setdefault('_id', ObjectId())
+        if not self.enabled:
+            collection.insert_one(doc)
+            return doc['_id']
+        self._ensure_started()
+        with self._lock:
+            self._pending[doc['_id']] = doc
+        try:
+            self._queue.put((collection, doc), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._counts['direct_writes'] += 1
+            self._write_group(collection, [doc])
+        return doc['_id']
+
+    def pending(self, scan_id):
+        """A shallow copy of the queued document with ``scan_id``, or None once it is written."""
+        with self._lock:
+            doc = self._pending.get(scan_id)
+            return dict(doc) if doc is not None else None
+
+    def flush(self, timeout=None):
+        """Write everything queued so far; returns False if ``timeout`` seconds pass first."""
+        if self._thread is None or self._pid != os.getpid():
+            return not self._pending
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            # Only wait for what was queued before the call, not for later submissions
+            waiting = list(self._pending)
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        with self._lock:
+            while any(scan_id in self._pending for scan_id in waiting):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self, timeout=30):
+        """Flush and stop the writer thread (runs at exit)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self.flush(timeout)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+                'pending': len(self._pending),
+                **self._counts,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval
+            }
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked worker where the parent's thread does not exist
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._pending = {}
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, name='scan-log-writer', daemon=True)
+            self._thread.start()
+            if not self._exit_registered:
+                atexit.register(self.close)
+                self._exit_registered = True
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [] if item is _FLUSH else [item]
+            deadline = time.monotonic() + self.flush_interval
+            while batch and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _FLUSH:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        # Keyed by namespace: pymongo hands out a new Collection object on every attribute access
+        groups = {}
+        for collection, doc in batch:
+            key = getattr(collection, 'full_name', None) or id(collection)
+            groups.setdefault(key, (collection, []))[1].append(doc)
+        for collection, docs in groups.values():
+            self._write_group(collection, docs)
+
+    def _write_group(self, collection, docs):
+        written = failed = 0
+        error = None
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                collection.insert_many(docs, ordered=False)
+                written = len(docs)
+                break
+            except BulkWriteError as e:
+                # A retried batch may already be partly written; those ids come back as duplicates
+                errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY]
+                failed = len(errors)
+                written = len(docs) - failed
+                if errors:
+                    error = errors[0].get('errmsg')
+                break
+            except PyMongoError as e:
+                error = str(e)
+                time.sleep(0.1 * 2 ** attempt)
+            except Exception as e:
+                # Not a connection problem (e.g. a document BSON cannot encode); retrying will not help
+                error = str(e)
+                failed = len(docs)
+                break
+        else:
+            failed = len(docs)
+        if failed:
+            print(f"[WARN] Could not log {failed} scan(s): {error}")
+        with self._lock:
+            self._counts['written'] += written
+            self._counts['failed'] += failed
+            self._counts['batches'] += 1
+            for doc in docs:
+                self._pending.pop(doc['_id'], None)
+            self._lock.notify_all()
+
+
+scan_log_writer = ScanLogWriter()
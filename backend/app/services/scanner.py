@@ -1,7 +1,7 @@
-from androguard.core.bytecodes.apk import APK
-from androguard.core.bytecodes.dvm import DalvikVMFormat
-from androguard.core.analysis.analysis import Analysis
 from app.services.risk_calculator import RiskCalculator
+from app.utils.manifest import ManifestError, read_manifest_permissions
+
+SCAN_MODES = ('fast', 'deep')
 
 class APKScanner:
     def __init__(self, mongo):
@@ -35,15 +35,39 @@ class APKScanner:
             'WRITE_SYNC_SETTINGS': 0.3
         }
 
-    def _extract_permissions(self, apk_path):
-        """Extract permissions from an APK file"""
+    def _extract_permissions(self, apk_path, scan_mode='fast'):
+        """Extract permissions from an APK file
+
+        The fast mode only decodes AndroidManifest.xml; androguard is used
+        for deep scans and whenever the manifest cannot be decoded directly.
+        """
+        if scan_mode == 'fast':
+            try:
+                return read_manifest_permissions(apk_path)
+            except ManifestError as e:
+                print(f"Fast manifest parse failed, falling back to androguard: {str(e)}")
         try:
+            from androguard.core.bytecodes.apk import APK
             apk = APK(apk_path)
             return apk.get_permissions()
         except Exception as e:
             print(f"Error extracting permissions: {str(e)}")
             return []
 
+    def _permission_usage(self, apk_path, permissions):
+        """Check declared permissions against the protected APIs the app's code calls"""
+        from app.services.dex_analysis import dex_analyzer
+        try:
+            report = dex_analyzer.analyze(apk_path, declared_permissions=permissions)
+        except Exception as e:
+            print(f"Error analyzing DEX files: {str(e)}")
+            return None
+        if 'error' in report:
+            return None
+        usage = report['permission_usage']
+        usage['dex_files'] = report['dex_files']
+        return usage
+
     def _calculate_risk_score(self, permissions):
         """Calculate risk score based on permissions"""
         total_weight = 0
@@ -106,24 +130,44 @@ class APKScanner:
         
         return category_risks
 
-    def scan_apk(self, apk_path, user_id='anonymous', app_name=None):
-        """Scan an APK file, log the result, and return risk assessment with scan_id"""
-        permissions = self._extract_permissions(apk_path)
+    def scan_apk(self, apk_path, user_id='anonymous', app_name=None, scan_mode='fast', apk_sha256=None,
+                 progress=None):
+        """Scan an APK file, log the result, and return risk assessment with scan_id
+
+        ``progress(stage)`` is called as each stage finishes (see scan_jobs.JOB_STAGES).
+        """
+        progress = progress or (lambda stage: None)
+        permissions = self._extract_permissions(apk_path, scan_mode)
         print(f"[DEBUG] Extracted permissions: {permissions}")
+        progress('permissions_extracted')
         risk_calculator = RiskCalculator()
         result = risk_calculator.calculate_risk(permissions)
-        # Log the scan result if mongo is available
-        scan_id = None
+        progress('scored')
+        if scan_mode == 'deep':
+            result['permission_usage'] = self._permission_usage(apk_path, permissions)
+            progress('code_analyzed')
+        self.log_result(result, user_id=user_id, app_name=app_name or apk_path, apk_sha256=apk_sha256)
+        return result
+
+    def log_result(self, result, user_id='anonymous', app_name=None, apk_sha256=None):
+        """Log a scan result if mongo is available and attach its scan_id
+
+        apk_sha256 links the record to the stored APK so the blob store counts the reference.
+        """
         if self.mongo:
             from app.models.app_scan import AppScan
             app_scan_instance = AppScan(self.mongo)
             scan_id = app_scan_instance.log_scan(
                 user_id=user_id,
-                app_name=app_name or apk_path,
+                app_name=app_name,
                 risk_score=result.get('risk_score'),
                 permissions=result.get('permissions'),
                 categories=result.get('categories'),
-                critical_items=result.get('critical_items')
+                critical_items=result.get('critical_items'),
+                apk_sha256=apk_sha256
             )
             result['scan_id'] = str(scan_id)
-        return result 
\ No newline at end of file
+            if apk_sha256:
+                from app import blob_store
+                blob_store.add_ref(apk_sha256)
+        return result
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 64
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = 'ConsentEngine-WebsiteScanner/1.0'
+
+
+class FetchResult:
+    """Outcome of one HTTP fetch; ``error`` is set instead of raising."""
+
+    __slots__ = ('url', 'final_url', 'status_code', 'headers', 'content', 'size', 'encoding',
+                 'elapsed_ms', 'truncated', 'error', 'timed_out')
+
+    def __init__(self, url):
+        self.url = url
+        self.final_url = url
+        self.status_code = None
+        self.headers = {}
+        self.content = b''
+        self.size = 0
+        self.encoding = None
+        self.elapsed_ms = None
+        self.truncated = False
+        self.error = None
+        self.timed_out = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def text(self):
+        # Same decoding rule as requests' Response.text
+        if not self.content:
+            return ''
+        encoding = self.encoding
+        if encoding is None:
+            from requests.compat import chardet
+            encoding = chardet.detect(self.content)['encoding']
+        try:
+            return str(self.content, encoding or 'utf-8', errors='replace')
+        except LookupError:
+            return str(self.content, errors='replace')
+
+
+class WebFetcher:
+    """
+    Shared HTTP client for website scans.
+
+    One ``requests.Session`` keeps pooled keep-alive connections, a
+    thread pool runs fetches concurrently, and a semaphore per host caps
+    how many requests hit the same site at once (kept only while that
+    host has fetches running or waiting). Every fetch honours an
+    absolute deadline (``time.monotonic()`` value): its timeouts shrink
+    to the time left and the body stops downloading once the deadline
+    passes or ``max_bytes`` have arrived. A ``sink`` callable can consume
+    the body as it streams in instead of it being buffered.
+    """
+
+    def __init__(self, pool_size=None, per_host=None, timeout=None, max_bytes=None):
+        self.pool_size = pool_size or int(os.getenv('WEB_FETCH_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.per_host = per_host or int(os.getenv('WEB_FETCH_PER_HOST', DEFAULT_PER_HOST))
+        self.timeout = timeout or float(os.getenv('WEB_FETCH_TIMEOUT', DEFAULT_TIMEOUT))
+        self.max_bytes = max_bytes or int(os.getenv('WEB_FETCH_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self._session = None
+        self._executor = None
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._session = session
+            return self._session
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='web-fetch')
+            return self._executor
+
+    def deadline(self, seconds=None):
+        """Return an absolute deadline ``seconds`` (default: the fetch timeout) from now."""
+        return time.monotonic() + (self.timeout if seconds is None else seconds)
+
+    def fetch(self, url, deadline=None, max_bytes=None, sink=None, headers=None):
+        """
+        Fetch ``url`` in the calling thread and return a ``FetchResult``.
+
+        If ``sink`` is given it is called as ``sink(chunk, encoding)`` for each
+        piece of the body and ``content`` stays empty. ``headers`` are sent
+        with the request (e.g. ``If-None-Match`` for a conditional fetch).
+        """
+        result = FetchResult(url)
+        deadline = self.deadline() if deadline is None else deadline
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        host = urlsplit(url).netloc.lower()
+        slot = self._enter_host(host)
+        started = time.monotonic()
+        if not slot.acquire(timeout=max(deadline - started, 0)):
+            self._leave_host(host)
+            return self._timed_out(result, 'Deadline exceeded waiting for a connection slot')
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self._timed_out(result, 'Deadline exceeded')
+            with self.session.get(url, timeout=(min(DEFAULT_CONNECT_TIMEOUT, remaining), remaining),
+                                  headers=headers, stream=True) as response:
+                result.status_code = response.status_code
+                result.headers = response.headers
+                result.final_url = response.url
+                result.encoding = response.encoding
+                body = bytearray()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if result.size + len(chunk) >= max_bytes:
+                        result.truncated = True
+                        chunk = chunk[:max_bytes - result.size]
+                    result.size += len(chunk)
+                    if sink is not None:
+                        sink(chunk, result.encoding)
+                    else:
+                        body += chunk
+                    if result.size >= max_bytes:
+                        break
+                    if time.monotonic() > deadline:
+                        result.truncated = True
+                        break
+                result.content = bytes(body)
+        except requests.exceptions.Timeout:
+            return self._timed_out(result, 'Request timed out.')
+        except requests.exceptions.RequestException as e:
+            result.error = f'Network error: {str(e)}'
+        except Exception as e:
+            result.error = f'Unexpected error: {str(e)}'
+        finally:
+            slot.release()
+            self._leave_host(host)
+            result.elapsed_ms = (time.monotonic() - started) * 1000
+        return result
+
+    def submit(self, url, deadline=None, max_bytes=None, sink=None, headers=None):
+        """Fetch ``url`` on the pool; returns a future resolving to a ``FetchResult``."""
+        return self.executor.submit(self.fetch, url, deadline, max_bytes, sink, headers)
+
+    def fetch_many(self, urls, deadline=None, max_bytes=None):
+        """Fetch several URLs concurrently; returns results in the order given."""
+        deadline = self.deadline() if deadline is None else deadline
+        futures = [self.submit(url, deadline, max_bytes) for url in urls]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _enter_host(self, host):
+        """Return ``host``'s semaphore, counting the caller as one of its users until ``_leave_host``."""
+        with self._lock:
+            entry = self._host_slots.get(host)
+            if entry is None:
+                entry = self._host_slots[host] = [threading.BoundedSemaphore(self.per_host), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _leave_host(self, host):
+        # Idle hosts are dropped, so fanning out over many domains leaves nothing behind
+        with self._lock:
+            entry = self._host_slots[host]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._host_slots[host]
+
+    @staticmethod
+    def _timed_out(result, message):
+        result.error = message
+        result.timed_out = True
+        return result
+
+
+web_fetcher = WebFetcher()
@@ -0,0 +1,93 @@
+import copy
+from datetime import datetime
+from pymongo.errors import OperationFailure, PyMongoError
+from app.utils.lru import LRUCache
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_FRESH_TTL = 3600
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+
+class WebsiteCache:
+    """
+    Last scan of each website URL, for cheap scheduled rescans.
+
+    Each entry keeps the scan result together with the page's ``ETag`` and
+    ``Last-Modified`` validators and when the page was last checked. An
+    entry younger than ``fresh_ttl`` is served without touching the network;
+    older entries still supply the validators for a conditional request, so
+    an unchanged page (304) reuses the cached analysis. Entries are kept for
+    ``max_age`` seconds: in an in-process LRU and in the ``website_cache``
+    Mongo collection, whose TTL index expires them.
+    """
+
+    def __init__(self, mongo=None):
+        self.mongo = mongo
+        self.fresh_ttl = DEFAULT_FRESH_TTL
+        self.max_age = DEFAULT_MAX_AGE
+        self.memory = LRUCache(DEFAULT_CACHE_SIZE, DEFAULT_MAX_AGE)
+
+    def init_app(self, app):
+        self.fresh_ttl = app.config.get('WEBSITE_CACHE_TTL', DEFAULT_FRESH_TTL)
+        self.max_age = app.config.get('WEBSITE_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+        self.memory = LRUCache(app.config.get('WEBSITE_CACHE_SIZE', DEFAULT_CACHE_SIZE), self.max_age)
+
+    @property
+    def collection(self):
+        return self.mongo.db.website_cache
+
+    def ensure_indexes(self):
+        """Create (or retune) the TTL index that expires cached scans."""
+        try:
+            self.collection.create_index('checked_at', expireAfterSeconds=self.max_age)
+        except OperationFailure:
+            # The index exists with a different TTL; adjust it in place.
+            self.mongo.db.command('collMod', 'website_cache', index={
+                'keyPattern': {'checked_at': 1},
+                'expireAfterSeconds': self.max_age
+            })
+
+    def get(self, url):
+        """Return a copy of the cache entry for ``url`` or None."""
+        entry = self.memory.get(url)
+        if entry is None and self.mongo is not None:
+            try:
+                doc = self.collection.find_one({'_id': url})
+            except PyMongoError as e:
+                print(f"[WARN] Website cache lookup failed: {str(e)}")
+                doc = None
+            if doc:
+                entry = {k: v for k, v in doc.items() if k != '_id'}
+                self.memory.set(url, entry)
+        return copy.deepcopy(entry) if entry is not None else None
+
+    def is_fresh(self, entry):
+        """True if ``entry`` was checked within the fresh TTL."""
+        return (datetime.utcnow() - entry['checked_at']).total_seconds() < self.fresh_ttl
+
+    def set(self, url, result, etag=None, last_modified=None):
+        """Store the scan of ``url`` with the validators its page was served with."""
+        entry = {
+            'result': copy.deepcopy(result),
+            'etag': etag,
+            'last_modified': last_modified,
+            'checked_at': datetime.utcnow()
+        }
+        self._write(url, entry)
+
+    def touch(self, url, entry):
+        """Mark ``entry`` as just revalidated (the page answered 304)."""
+        entry = dict(entry, checked_at=datetime.utcnow())
+        self._write(url, entry)
+
+    def stats(self):
+        return self.memory.stats()
+
+    def _write(self, url, entry):
+        self.memory.set(url, entry)
+        if self.mongo is None:
+            return
+        try:
+            self.collection.replace_one({'_id': url}, {'_id': url, **entry}, upsert=True)
+        except PyMongoError as e:
+            print(f"[WARN] Website cache write failed: {str(e)}")
@@ -1,25 +1,91 @@
-import requests
 import os
-from datetime import datetime
-from bs4 import BeautifulSoup # Import BeautifulSoup for HTML parsing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
 from app.models.app_scan import AppScan # Reusing AppScan model for storage
+from app.services.web_fetcher import web_fetcher
+from app.utils.html_features import HtmlFeatureExtractor
+from app.utils.tracker_rules import tracker_db
+
+DEFAULT_MAX_SCRIPTS = 5
+DEFAULT_SCAN_DEADLINE = 15
+DEFAULT_BULK_DEADLINE = 120
+DEFAULT_SITE_CONCURRENCY = 32
+DEFAULT_MAX_PAGE_BYTES = 5 * 1024 * 1024
 
 class WebsiteScanner:
-    def __init__(self, mongo):
+    def __init__(self, mongo, fetcher=None, max_scripts=None, deadline=None, max_sites=None, trackers=None,
+                 cache=None):
         self.mongo = mongo # Store the mongo object
-        # We can add more sophisticated tools here later
-        pass
+        # Pooled HTTP client shared by every scan
+        self.fetcher = fetcher or web_fetcher
+        # Tracker ruleset, reloaded when its file changes
+        self.trackers = trackers or tracker_db
+        # Last result and validators per URL (a WebsiteCache); None scans every time
+        self.cache = cache
+        self.max_scripts = max_scripts if max_scripts is not None else int(
+            os.getenv('WEBSITE_SCAN_MAX_SCRIPTS', DEFAULT_MAX_SCRIPTS))
+        self.deadline = deadline or float(os.getenv('WEBSITE_SCAN_DEADLINE', DEFAULT_SCAN_DEADLINE))
+        self.max_sites = max_sites or int(os.getenv('WEBSITE_SCAN_CONCURRENCY', DEFAULT_SITE_CONCURRENCY))
+        self.max_page_bytes = int(os.getenv('WEBSITE_SCAN_MAX_PAGE_BYTES', DEFAULT_MAX_PAGE_BYTES))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_sites, thread_name_prefix='site-scan')
+            return self._executor
 
-    def scan_website(self, url, user_id):
+    def scan_website(self, url, user_id, deadline=None, refresh=False):
         """
         Scans a given website URL and returns a risk assessment.
         For simplicity, this is a placeholder with heuristic-based risk.
+
+        The page's privacy policy, robots.txt and first external scripts are
+        fetched concurrently; the whole scan stops at ``deadline`` (a
+        ``time.monotonic()`` value, default WEBSITE_SCAN_DEADLINE from now).
+
+        With a cache, a result younger than its fresh TTL is returned without
+        any request (unless ``refresh``); an older one is revalidated with a
+        conditional request and reused if the page answers 304 Not Modified.
+        ``result['cache']`` tells which happened: fresh, revalidated or miss.
         """
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and not refresh and self.cache.is_fresh(cached):
+            result = dict(cached['result'], cache='fresh')
+        else:
+            result = self._scan(url, deadline, cached)
+        self._log(url, user_id, result)
+        return result
+
+    def scan_websites(self, urls, user_id, deadline=None, refresh=False):
+        """
+        Scan many websites concurrently and return their results in order.
+
+        Up to ``max_sites`` sites are scanned at once. Each site still gets
+        its own WEBSITE_SCAN_DEADLINE, capped by ``deadline`` for the whole
+        batch (default WEBSITE_BULK_DEADLINE seconds from now).
+        """
+        if deadline is None:
+            deadline = self.fetcher.deadline(float(os.getenv('WEBSITE_BULK_DEADLINE', DEFAULT_BULK_DEADLINE)))
+        futures = [self.executor.submit(self._scan_for_batch, url, user_id, deadline, refresh) for url in urls]
+        return [future.result() for future in futures]
+
+    def _scan_for_batch(self, url, user_id, batch_deadline, refresh=False):
+        result = self.scan_website(url, user_id, deadline=min(self.fetcher.deadline(self.deadline), batch_deadline),
+                                   refresh=refresh)
+        return {'url': url, **result}
+
+    def _scan(self, url, deadline=None, cached=None):
+        deadline = deadline or self.fetcher.deadline(self.deadline)
         features = {
             'url': url,
             'status_code': None,
             'has_ssl': False,
             'common_trackers_detected': [],
+            'tracker_details': [],
             'privacy_policy_keywords_detected': False,
             'response_time_ms': None,
             'security_headers': {}, # New feature
@@ -27,16 +93,34 @@ class WebsiteScanner:
             'iframe_count': 0, # New feature
             'form_count': 0, # New feature
             'potential_js_obfuscation': False, # New feature
+            'privacy_policy': None,
+            'robots_txt': None,
+            'external_scripts': [],
         }
         risk_score = 0.0
+        validators = {}
 
         try:
-            start_time = datetime.now()
-            response = requests.get(url, timeout=10) # Add a timeout
-            end_time = datetime.now()
+            # The page is parsed as it downloads; no tree or full copy of the body is kept
+            page = HtmlFeatureExtractor(max_chars=self.max_page_bytes, max_script_urls=self.max_scripts,
+                                        ruleset=self.trackers.current())
+            response = self.fetcher.fetch(url, deadline, max_bytes=self.max_page_bytes, sink=page.feed_bytes,
+                                          headers=self._conditional_headers(cached))
+            page.close()
+            if response.timed_out:
+                raise TimeoutError(response.error)
+            if not response.ok:
+                raise ConnectionError(response.error)
+
+            # Unchanged since the cached scan: reuse it without parsing anything
+            if response.status_code == 304 and cached is not None:
+                self.cache.touch(url, cached)
+                return dict(cached['result'], cache='revalidated')
+            validators = {'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
 
             features['status_code'] = response.status_code
-            features['response_time_ms'] = (end_time - start_time).total_seconds() * 1000
+            features['response_time_ms'] = response.elapsed_ms
             features['has_ssl'] = url.startswith('https://')
             
             # Extract security headers
@@ -57,53 +141,48 @@ class WebsiteScanner:
             if response.status_code >= 400 or not features['has_ssl']:
                 risk_score += 5.0
 
-            # Parse HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Placeholder for tracker detection
-            if 'google-analytics.com' in response.text:
-                features['common_trackers_detected'].append('Google Analytics')
-                risk_score += 1.0
-            if 'facebook.com/tr' in response.text: # Facebook pixel
-                features['common_trackers_detected'].append('Facebook Pixel')
+            # Trackers matched by the ruleset's domains and inline patterns
+            for tracker in page.trackers:
+                features['common_trackers_detected'].append(tracker)
                 risk_score += 1.0
+            features['tracker_details'] = [rule._asdict() for rule in page.tracker_rules]
+            self.trackers.record(page.tracker_rules)
             
             # Count external scripts
-            for script in soup.find_all('script', src=True):
-                if script['src'].startswith('http') or script['src'].startswith('//'):
-                    features['external_scripts_count'] += 1
-                    risk_score += 0.2 # Slight penalty for external scripts
+            features['external_scripts_count'] = page.external_scripts_count
+            for _ in range(page.external_scripts_count):
+                risk_score += 0.2 # Slight penalty for external scripts
 
             # Count iframes
-            features['iframe_count'] = len(soup.find_all('iframe'))
+            features['iframe_count'] = page.iframe_count
             if features['iframe_count'] > 0:
                 risk_score += 1.0 # Penalty for iframes
 
             # Count forms
-            features['form_count'] = len(soup.find_all('form'))
+            features['form_count'] = page.form_count
             if features['form_count'] > 0:
                 risk_score += 0.5 # Slight penalty for forms (potential data collection)
 
             # Basic heuristic for potential JavaScript obfuscation
-            for script in soup.find_all('script', string=True):
-                if len(script.string) > 500 and ('eval(' in script.string or 'unescape(' in script.string):
-                    features['potential_js_obfuscation'] = True
-                    risk_score += 2.0 # Higher penalty for suspected obfuscation
-                    break # Only need to find one instance
+            if page.potential_js_obfuscation:
+                features['potential_js_obfuscation'] = True
+                risk_score += 2.0 # Higher penalty for suspected obfuscation
 
             # Placeholder for privacy policy keywords
-            privacy_keywords = ['privacy policy', 'data protection', 'terms of service']
-            if any(keyword in response.text.lower() for keyword in privacy_keywords):
+            if page.privacy_keywords_detected:
                 features['privacy_policy_keywords_detected'] = True
             else:
                 risk_score += 2.0 # Higher risk if no privacy policy keywords found
 
-        except requests.exceptions.Timeout:
+            # Fetch the linked privacy policy, robots.txt and external scripts concurrently
+            self._fetch_linked_resources(response.final_url, page, features, deadline)
+
+        except TimeoutError as e:
             risk_score += 3.0
-            features['error'] = 'Request timed out.'
-        except requests.exceptions.RequestException as e:
+            features['error'] = str(e)
+        except ConnectionError as e:
             risk_score += 4.0
-            features['error'] = f'Network error: {str(e)}'
+            features['error'] = str(e)
         except Exception as e:
             risk_score += 5.0
             features['error'] = f'Unexpected error during scan: {str(e)}'
@@ -111,24 +190,76 @@ class WebsiteScanner:
         # Clamp risk score between 0 and 10
         risk_score = max(0, min(10, risk_score))
 
-        scan_data = {
-            'user_id': user_id,
-            'features': features,
+        result = {
             'risk_score': risk_score,
-            'timestamp': datetime.utcnow(),
-            'scan_type': 'url',
+            'features': features
         }
-        
+        if self.cache is None:
+            return result
+        if 'error' not in features:
+            self.cache.set(url, result, **validators)
+        return dict(result, cache='miss')
+
+    @staticmethod
+    def _conditional_headers(cached):
+        """If-None-Match / If-Modified-Since built from a cached scan's validators"""
+        if cached is None:
+            return None
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers or None
+
+    def _fetch_linked_resources(self, page_url, page, features, deadline):
+        """Fill the privacy_policy, robots_txt and external_scripts features in one concurrent round"""
+        parts = urlsplit(page_url)
+        targets = {'robots_txt': f"{parts.scheme}://{parts.netloc}/robots.txt"}
+        if page.privacy_link is not None:
+            targets['privacy_policy'] = urljoin(page_url, page.privacy_link)
+        script_urls = [urljoin(page_url, src) for src in page.external_script_urls[:self.max_scripts]]
+
+        urls = list(targets.values()) + script_urls
+        results = dict(zip(urls, self.fetcher.fetch_many(urls, deadline)))
+
+        policy_url = targets.get('privacy_policy')
+        if policy_url:
+            policy = results[policy_url]
+            features['privacy_policy'] = {
+                'url': policy_url,
+                'status_code': policy.status_code,
+                'bytes': len(policy.content),
+                'error': policy.error
+            }
+        robots = results[targets['robots_txt']]
+        robots_text = robots.text if robots.status_code == 200 else ''
+        features['robots_txt'] = {
+            'status_code': robots.status_code,
+            'disallow_rules': sum(1 for line in robots_text.splitlines()
+                                  if line.strip().lower().startswith('disallow:')),
+            'error': robots.error
+        }
+        features['external_scripts'] = [
+            {
+                'url': script_url,
+                'status_code': results[script_url].status_code,
+                'bytes': len(results[script_url].content),
+                'error': results[script_url].error
+            }
+            for script_url in script_urls
+        ]
+
+    def _log(self, url, user_id, result):
         # Save result using AppScan model
         # For website scans, app_name will be the URL and permissions will be an empty list
-        AppScan(self.mongo).log_scan(
+        if self.mongo is None:
+            return
+        result['scan_id'] = str(AppScan(self.mongo).log_scan(
             user_id=user_id,
             app_name=url,
-            risk_score=risk_score,
-            permissions=[] # Permissions are not directly applicable to website static analysis
-        )
-
-        return {
-            'risk_score': risk_score,
-            'features': features
-        } 
\ No newline at end of file
+            risk_score=result['risk_score'],
+            permissions=[], # Permissions are not directly applicable to website static analysis
+            categories={},
+            critical_items=[]
+        ))
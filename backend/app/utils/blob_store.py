@@ -0,0 +1,232 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+DEFAULT_GRACE = 600
+INDEX_NAME = 'blobs.sqlite3'
+
+
+class BlobStore:
+    """
+    Content-addressed, deduplicated store for uploaded APKs.
+
+    A blob lives at ``<root>/<sha[:2]>/<sha[2:4]>/<sha>.apk``. That keeps
+    every directory small no matter how many APKs are stored. A SQLite
+    index in the root records each blob's size, last access and how many
+    scan records reference it. Every process that uses the same root
+    shares the index. Adding and evicting blobs hold the index write lock,
+    so a blob is never deleted while another request is storing the same
+    bytes.
+
+    Scans count a reference when they are logged with the APK's digest
+    and release it when the scan record is deleted. Unreferenced blobs
+    unused for ``max_age`` seconds are evicted. When the store grows past
+    ``max_bytes``, unreferenced blobs go first, least recently used
+    first. Referenced blobs are evicted only as a last resort, when the
+    unreferenced ones do not free enough space, so the budget still
+    holds. A blob used within the last ``grace`` seconds is never
+    evicted, so queued and running scans keep their file.
+    """
+
+    def __init__(self, root='uploads', max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, grace=DEFAULT_GRACE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.grace = grace
+        self.evicted = 0
+        self.evicted_referenced = 0
+        self._ready = False
+
+    def init_app(self, app):
+        self.root = app.config.get('UPLOAD_FOLDER', self.root)
+        self.max_bytes = app.config.get('BLOB_STORE_MAX_BYTES', self.max_bytes)
+        self.max_age = app.config.get('BLOB_STORE_MAX_AGE', self.max_age)
+        self.grace = app.config.get('BLOB_STORE_GRACE', self.grace)
+        self._ready = False
+        app.extensions['blob_store'] = self
+
+    @property
+    def temp_dir(self):
+        """Staging directory on the same filesystem, so moving a blob in is an atomic rename."""
+        path = os.path.join(self.root, 'tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path_for(self, digest, extension='.apk'):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + extension)
+
+    def put(self, temp_path, digest, extension='.apk'):
+        """
+        Move a fully written file into the store under its digest.
+
+        If the blob is already stored, the temp file is discarded and the
+        existing blob's last access is refreshed.
+
+        Returns:
+            str: Path of the stored blob.
+        """
+        path = self.path_for(digest, extension)
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+            if row is not None and os.path.exists(path):
+                os.remove(temp_path)
+                db.execute('UPDATE blobs SET last_access = ? WHERE digest = ?', (now, digest))
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                size = os.path.getsize(path)
+                if row is None:
+                    db.execute(
+                        'INSERT INTO blobs (digest, path, size, created_at, last_access, refs) '
+                        'VALUES (?, ?, ?, ?, ?, 0)', (digest, path, size, now, now)
+                    )
+                else:
+                    db.execute('UPDATE blobs SET path = ?, size = ?, last_access = ? WHERE digest = ?',
+                               (path, size, now, digest))
+                db.execute('UPDATE totals SET bytes = bytes + ?', (size - (row[0] if row else 0),))
+        self.evict()
+        return path
+
+    def get(self, digest):
+        """Return the path of a stored blob (refreshing its last access) or None."""
+        with self._transaction() as db:
+            row = db.execute('SELECT path FROM blobs WHERE digest = ?', (digest,)).fetchone()
+            if row is None or not os.path.exists(row[0]):
+                return None
+            db.execute('UPDATE blobs SET last_access = ? WHERE digest = ?', (time.time(), digest))
+            return row[0]
+
+    def add_ref(self, digest, count=1):
+        """Record that ``count`` more scan records point at ``digest``."""
+        try:
+            with self._transaction() as db:
+                db.execute('UPDATE blobs SET refs = MAX(refs + ?, 0), last_access = ? WHERE digest = ?',
+                           (count, time.time(), digest))
+        except sqlite3.Error as e:
+            print(f"[WARN] Blob reference update failed: {str(e)}")
+
+    def release_ref(self, digest, count=1):
+        self.add_ref(digest, -count)
+
+    def evict(self, now=None):
+        """Drop expired unreferenced blobs, then least recently used ones until the byte budget holds."""
+        now = time.time() if now is None else now
+        protected_after = now - self.grace
+        with self._connect() as db:
+            expired = [row[0] for row in db.execute(
+                'SELECT digest FROM blobs WHERE refs = 0 AND last_access < ?',
+                (min(now - self.max_age, protected_after),)
+            )]
+            total = db.execute('SELECT bytes FROM totals').fetchone()[0]
+        for digest in expired:
+            self._remove(digest, protected_after, unreferenced_only=True)
+        if self.max_bytes is None or total <= self.max_bytes:
+            return
+        with self._connect() as db:
+            total = db.execute('SELECT bytes FROM totals').fetchone()[0]
+            unreferenced = db.execute(
+                'SELECT digest, size FROM blobs WHERE refs = 0 AND last_access < ? ORDER BY last_access',
+                (protected_after,)
+            ).fetchall()
+        for digest, size in unreferenced:
+            if total <= self.max_bytes:
+                return
+            if self._remove(digest, protected_after, unreferenced_only=True):
+                total -= size
+        if total <= self.max_bytes:
+            return
+        # Last resort: the budget is a hard cap, so scans may lose their stored APK
+        with self._connect() as db:
+            referenced = db.execute(
+                'SELECT digest, size FROM blobs WHERE refs > 0 AND last_access < ? ORDER BY last_access',
+                (protected_after,)
+            ).fetchall()
+        evicted = 0
+        for digest, size in referenced:
+            if total <= self.max_bytes:
+                break
+            if self._remove(digest, protected_after):
+                total -= size
+                evicted += 1
+        self.evicted_referenced += evicted
+        if evicted:
+            print(f"[WARN] Blob store over budget; evicted {evicted} APK(s) still referenced by scans")
+
+    def stats(self):
+        with self._connect() as db:
+            blobs, referenced = db.execute('SELECT COUNT(*), COUNT(NULLIF(refs, 0)) FROM blobs').fetchone()
+            total = db.execute('SELECT bytes FROM totals').fetchone()[0]
+        return {
+            'blobs': blobs,
+            'referenced': referenced,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'evicted': self.evicted,
+            'evicted_referenced': self.evicted_referenced
+        }
+
+    def _remove(self, digest, protected_after, unreferenced_only=False):
+        # Re-check under the write lock: the blob may have been used or referenced since it was picked
+        with self._transaction() as db:
+            row = db.execute('SELECT path, size FROM blobs WHERE digest = ? AND last_access < ?'
+                             + (' AND refs = 0' if unreferenced_only else ''),
+                             (digest, protected_after)).fetchone()
+            if row is None:
+                return False
+            path, size = row
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+            db.execute('UPDATE totals SET bytes = MAX(bytes - ?, 0)', (size,))
+        self.evicted += 1
+        return True
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            self._create_index()
+        db = sqlite3.connect(os.path.join(self.root, INDEX_NAME), timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def _create_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        db = sqlite3.connect(os.path.join(self.root, INDEX_NAME), timeout=30, isolation_level=None)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    refs INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+                CREATE INDEX IF NOT EXISTS blobs_eviction ON blobs (refs > 0, last_access);
+                CREATE TABLE IF NOT EXISTS totals (bytes INTEGER NOT NULL);
+                INSERT INTO totals (bytes) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM totals);
+            ''')
+        finally:
+            db.close()
+        self._ready = True
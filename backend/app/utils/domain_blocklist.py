@@ -0,0 +1,218 @@
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+MAGIC = b'CEBL'
+FORMAT_VERSION = 1
+# magic, format version, byte order (0 little, 1 big), entry count, built at (unix seconds)
+HEADER = struct.Struct('<4sHHQd')
+HEADER_SIZE = 32  # HEADER padded so the hash array starts 8-byte aligned
+DEFAULT_CHECK_INTERVAL = 5
+
+
+def normalize_domain(line):
+    """
+    The domain named by one feed line, or None for blanks and comments.
+
+    Accepts plain domains, ``*.domain`` / ``.domain`` wildcards, hosts-file
+    lines (``0.0.0.0 domain``) and a trailing ``# comment``.
+    """
+    line = line.split('#', 1)[0].strip()
+    if not line:
+        return None
+    fields = line.split()
+    domain = fields[-1] if len(fields) > 1 else fields[0]
+    domain = domain.lower().rstrip('.')
+    if domain.startswith('*.'):
+        domain = domain[2:]
+    domain = domain.lstrip('.')
+    return domain or None
+
+
+def domain_hash(domain):
+    """64-bit hash of a normalized domain, the key stored in a compiled blocklist."""
+    return int.from_bytes(hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def compile_blocklist(feed_paths, out_path):
+    """
+    Compile domain feed files into a blocklist index at ``out_path``.
+
+    The index is a small header followed by the sorted, de-duplicated 64-bit
+    hashes of every listed domain. It is written to a temporary file next to
+    ``out_path`` and renamed over it, so readers see either the old build or
+    the new one, never a partial file. Returns the number of domains.
+    """
+    import numpy as np
+
+    if isinstance(feed_paths, str):
+        feed_paths = [feed_paths]
+    # 8 bytes per domain while reading, so feeds of tens of millions fit in memory
+    hashes = array('Q')
+    for feed_path in feed_paths:
+        with open(feed_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                domain = normalize_domain(line)
+                if domain:
+                    hashes.append(domain_hash(domain))
+    entries = np.unique(np.frombuffer(hashes, dtype=np.uint64)) if hashes else np.empty(0, dtype=np.uint64)
+    del hashes
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0 if sys.byteorder == 'little' else 1, len(entries), time.time())
+    directory = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.blocklist-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(entries.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, out_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(entries)
+
+
+class DomainBlocklist:
+    """
+    Read-only view of a compiled blocklist, memory-mapped from disk.
+
+    The sorted hash array is never copied into the heap: lookups binary
+    search the mapped pages directly, so every worker process that opens
+    the same build shares one copy in the OS page cache. ``match`` checks a
+    host and each of its parent domains, so listing ``example.com`` also
+    blocks ``ads.example.com``. Keys are 64-bit hashes; with tens of
+    millions of entries the chance of a false match is around 1e-12.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < HEADER_SIZE:
+                raise ValueError(f"{path} is not a domain blocklist")
+            magic, version, byte_order, count, built_at = HEADER.unpack_from(self._map)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} domain blocklist")
+            if byte_order != (0 if sys.byteorder == 'little' else 1):
+                raise ValueError(f"{path} was built on a machine with a different byte order")
+            if len(self._map) != HEADER_SIZE + count * 8:
+                raise ValueError(f"{path} is truncated")
+            self.count = count
+            self.built_at = built_at
+            self._hashes = memoryview(self._map)[HEADER_SIZE:].cast('Q')
+        except Exception:
+            self._map.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, domain):
+        return self._contains_hash(domain_hash(domain))
+
+    def match(self, host):
+        """The listed domain covering ``host`` (itself or a parent), most specific first, or None."""
+        host = host.lower().rstrip('.')
+        position = 0
+        while host:
+            candidate = host[position:]
+            if self._contains_hash(domain_hash(candidate)):
+                return candidate
+            position = host.find('.', position) + 1
+            if position == 0:
+                return None
+        return None
+
+    def close(self):
+        self._hashes.release()
+        self._map.close()
+
+    def _contains_hash(self, value):
+        index = bisect.bisect_left(self._hashes, value)
+        return index < self.count and self._hashes[index] == value
+
+
+class BlocklistStore:
+    """
+    The active blocklist build, swapped when a new build replaces the file.
+
+    ``current()`` re-checks the file at most every ``check_interval``
+    seconds. A new build (``compile_blocklist`` renames it into place) is
+    opened and swapped in; the previous mapping stays valid for lookups
+    already holding it and is unmapped once no longer referenced. Returns
+    None while no build exists. ``generation`` changes on every swap so
+    callers can drop memoised results.
+    """
+
+    def __init__(self, path=None, check_interval=None):
+        self.path = path or os.getenv('DOMAIN_BLOCKLIST_PATH') or None
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv('DOMAIN_BLOCKLIST_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+        self.generation = 0
+        self._blocklist = None
+        self._identity = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('DOMAIN_BLOCKLIST_PATH') or self.path
+        self._checked_at = None
+
+    def current(self):
+        """Return the active ``DomainBlocklist`` (or None), opening a newer build first."""
+        if not self.path:
+            return None
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            if self._lock.acquire(blocking=self._checked_at is None):
+                try:
+                    self._refresh(now)
+                finally:
+                    self._lock.release()
+        return self._blocklist
+
+    def match(self, host):
+        blocklist = self.current()
+        return blocklist.match(host) if blocklist is not None and host else None
+
+    def stats(self):
+        blocklist = self.current()
+        return {
+            'path': self.path,
+            'domains': len(blocklist) if blocklist is not None else 0,
+            'built_at': blocklist.built_at if blocklist is not None else None,
+            'generation': self.generation
+        }
+
+    def _refresh(self, now):
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self._identity:
+            return
+        self._identity = identity
+        try:
+            blocklist = DomainBlocklist(self.path)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Could not open domain blocklist {self.path}: {str(e)}")
+            return
+        self._blocklist = blocklist
+        self.generation += 1
+        print(f"Opened domain blocklist {self.path}: {len(blocklist)} domains")
+
+
+domain_blocklist = BlocklistStore()
@@ -0,0 +1,185 @@
+import codecs
+from html.parser import HTMLParser
+
+PRIVACY_KEYWORDS = ('privacy policy', 'data protection', 'terms of service')
+OBFUSCATION_MARKERS = ('eval(', 'unescape(')
+OBFUSCATION_MIN_LENGTH = 500
+DEFAULT_MAX_CHARS = 5 * 1024 * 1024
+RESOURCE_TAGS = ('script', 'iframe', 'img')  # Tags whose src is checked against tracker domains
+
+
+class _Substrings:
+    """Tracks which of a fixed set of substrings occur in text fed in pieces."""
+
+    def __init__(self, needles, lower=False):
+        self.needles = needles
+        self.lower = lower
+        self.found = set()
+        self._carry = ''
+        self._overlap = max(len(n) for n in needles) - 1
+
+    def feed(self, text):
+        if len(self.found) == len(self.needles):
+            return
+        if self.lower:
+            text = text.lower()
+        window = self._carry + text
+        for needle in self.needles:
+            if needle not in self.found and needle in window:
+                self.found.add(needle)
+        # Keep just enough of the tail to catch a needle split across pieces
+        self._carry = window[-self._overlap:] if self._overlap else ''
+
+
+class HtmlFeatureExtractor:
+    """
+    Collects the website-scan features of an HTML page in a single pass.
+
+    Text is fed in pieces (``feed`` or ``feed_bytes``) to ``html.parser``, the
+    tokenizer BeautifulSoup's ``html.parser`` backend used, so malformed
+    markup is read exactly as before, but no tree is built. Scripts, iframes,
+    forms, inline-script obfuscation signals, tracker hits, privacy keywords
+    and the privacy-policy link are tallied as the events arrive, so memory
+    use does not grow with the page. Trackers are matched against
+    ``ruleset`` (a ``TrackerRuleset``): its patterns over the page source
+    and its domains over script, iframe and image URLs. Input beyond ``max_chars`` is ignored and flagged
+    as ``truncated``.
+    """
+
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS, max_script_urls=None, ruleset=None):
+        self.max_chars = max_chars
+        self.max_script_urls = max_script_urls
+        self.chars = 0
+        self.truncated = False
+        self.external_scripts_count = 0
+        self.external_script_urls = []
+        self.iframe_count = 0
+        self.form_count = 0
+        self.potential_js_obfuscation = False
+        self.privacy_link = None
+        self._trackers = ruleset.scan() if ruleset is not None else None
+        self._keywords = _Substrings(PRIVACY_KEYWORDS, lower=True)
+        self._script = None
+        self._link = None
+        self._decoder = None
+        self._parser = _ParserEvents(self)
+
+    @property
+    def tracker_rules(self):
+        """Matched ``TrackerRule``s, in ruleset order."""
+        return self._trackers.rules if self._trackers is not None else []
+
+    @property
+    def trackers(self):
+        """Names of the detected trackers, in ruleset order."""
+        names = []
+        for rule in self.tracker_rules:
+            if rule.name not in names:
+                names.append(rule.name)
+        return names
+
+    @property
+    def privacy_keywords_detected(self):
+        return bool(self._keywords.found)
+
+    def feed(self, text):
+        if self.truncated:
+            return
+        if self.chars + len(text) > self.max_chars:
+            text = text[:self.max_chars - self.chars]
+            self.truncated = True
+        if not text:
+            return
+        self.chars += len(text)
+        if self._trackers is not None:
+            self._trackers.feed(text)
+        self._keywords.feed(text)
+        self._parser.feed(text)
+
+    def feed_bytes(self, chunk, encoding=None):
+        """Decode a piece of the raw body (``encoding`` as reported by the response) and feed it."""
+        if self._decoder is None:
+            try:
+                self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+            except LookupError:
+                self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.feed(self._decoder.decode(chunk))
+
+    def close(self):
+        if self._decoder is not None and not self.truncated:
+            self.feed(self._decoder.decode(b'', final=True))
+        self._parser.close()
+        self._end_script()
+        self._end_link()
+
+    def _start(self, tag, attributes):
+        if self._trackers is not None and tag in RESOURCE_TAGS:
+            self._trackers.add_url(attributes.get('src'))
+        if tag == 'script':
+            src = attributes.get('src')
+            if src is not None and (src.startswith('http') or src.startswith('//')):
+                self.external_scripts_count += 1
+                if self.max_script_urls is None or len(self.external_script_urls) < self.max_script_urls:
+                    self.external_script_urls.append(src)
+            self._script = {'length': 0, 'markers': _Substrings(OBFUSCATION_MARKERS)}
+        elif tag == 'iframe':
+            self.iframe_count += 1
+        elif tag == 'form':
+            self.form_count += 1
+        elif tag == 'a':
+            # Links cannot nest: a new <a> closes any still open, as browsers parse it,
+            # so unclosed anchors never pile up
+            self._end_link()
+            href = attributes.get('href')
+            if href is not None and self.privacy_link is None:
+                if 'privacy' in href.lower():
+                    self.privacy_link = href
+                else:
+                    self._link = {'href': href, 'text': _Substrings(('privacy',), lower=True)}
+
+    def _end(self, tag):
+        if tag == 'script':
+            self._end_script()
+        elif tag == 'a':
+            self._end_link()
+
+    def _data(self, data):
+        if self._script is not None:
+            self._script['length'] += len(data)
+            self._script['markers'].feed(data)
+        if self._link is not None:
+            self._link['text'].feed(data)
+
+    def _end_script(self):
+        script = self._script
+        self._script = None
+        if script and script['length'] > OBFUSCATION_MIN_LENGTH and script['markers'].found:
+            self.potential_js_obfuscation = True
+
+    def _end_link(self):
+        link = self._link
+        self._link = None
+        if link and self.privacy_link is None and link['text'].found:
+            self.privacy_link = link['href']
+
+
+class _ParserEvents(HTMLParser):
+    """Forwards tokenizer events to the extractor."""
+
+    def __init__(self, extractor):
+        super().__init__(convert_charrefs=True)
+        self.extractor = extractor
+
+    def handle_starttag(self, tag, attrs):
+        self.extractor._start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.extractor._start(tag, dict(attrs))
+        self.extractor._end(tag)
+
+    def handle_endtag(self, tag):
+        self.extractor._end(tag)
+
+    def handle_data(self, data):
+        self.extractor._data(data)
+
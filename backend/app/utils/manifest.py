@@ -0,0 +1,146 @@
+import struct
+import zipfile
+
+# Chunk types from the Android resource format (ResourceTypes.h)
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 1 << 8
+TYPE_STRING = 0x03
+NO_ENTRY = 0xFFFFFFFF
+ANDROID_NAME_RES_ID = 0x01010003  # android:name
+
+PERMISSION_TAGS = ('uses-permission',)
+
+
+class ManifestError(ValueError):
+    """Raised when AndroidManifest.xml is missing or cannot be decoded."""
+
+
+class _StringPool:
+    """Lazily decoded view over a ResStringPool chunk."""
+
+    def __init__(self, data, offset):
+        (_, header_size, _, count, _, flags,
+         strings_start, _) = struct.unpack_from('<HHIIIIII', data, offset)
+        self.data = data
+        self.offsets = struct.unpack_from(f'<{count}I', data, offset + header_size)
+        self.base = offset + strings_start
+        self.utf8 = bool(flags & UTF8_FLAG)
+        self._cache = {}
+
+    def get(self, index):
+        if index == NO_ENTRY or index >= len(self.offsets):
+            return None
+        value = self._cache.get(index)
+        if value is None:
+            value = self._decode(self.base + self.offsets[index])
+            self._cache[index] = value
+        return value
+
+    def _decode(self, pos):
+        data = self.data
+        if self.utf8:
+            # Character count, then byte count; each is 1 or 2 bytes long.
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            return data[pos:pos + length].decode('utf-8', 'replace')
+        length, = struct.unpack_from('<H', data, pos)
+        if length & 0x8000:
+            low, = struct.unpack_from('<H', data, pos + 2)
+            length = ((length & 0x7FFF) << 16) | low
+            pos += 4
+        else:
+            pos += 2
+        return data[pos:pos + length * 2].decode('utf-16-le', 'replace')
+
+
+def parse_manifest_permissions(data, tags=PERMISSION_TAGS):
+    """
+    Decode the permission names declared in a binary (AXML) manifest.
+
+    Only the string pool, resource map and start-element chunks are read;
+    everything else is skipped by its chunk size.
+
+    Args:
+        data: Raw bytes of AndroidManifest.xml as stored in the APK.
+        tags: Element names whose android:name attribute is collected.
+
+    Returns:
+        list: Permission names in declaration order, without duplicates.
+    """
+    try:
+        xml_type, header_size, total_size = struct.unpack_from('<HHI', data, 0)
+    except struct.error:
+        raise ManifestError('Manifest is truncated')
+    if xml_type != RES_XML_TYPE:
+        raise ManifestError('Manifest is not binary XML')
+
+    strings = None
+    resource_ids = ()
+    permissions = []
+    end = min(total_size, len(data))
+    offset = header_size
+    try:
+        while offset + 8 <= end:
+            chunk_type, chunk_header, chunk_size = struct.unpack_from('<HHI', data, offset)
+            if chunk_size < 8:
+                raise ManifestError(f'Corrupt chunk at offset {offset}')
+            if chunk_type == RES_STRING_POOL_TYPE:
+                strings = _StringPool(data, offset)
+            elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+                count = (chunk_size - chunk_header) // 4
+                resource_ids = struct.unpack_from(f'<{count}I', data, offset + chunk_header)
+            elif chunk_type == RES_XML_START_ELEMENT_TYPE and strings is not None:
+                ext = offset + chunk_header
+                _, name, attr_start, attr_size, attr_count = struct.unpack_from('<IIHHH', data, ext)
+                if strings.get(name) in tags:
+                    value = _find_name_attribute(data, strings, resource_ids,
+                                                 ext + attr_start, attr_size, attr_count)
+                    if value and value not in permissions:
+                        permissions.append(value)
+            offset += chunk_size
+    except struct.error:
+        raise ManifestError(f'Manifest is truncated at offset {offset}')
+    if strings is None:
+        raise ManifestError('Manifest has no string pool')
+    return permissions
+
+
+def _find_name_attribute(data, strings, resource_ids, offset, attr_size, attr_count):
+    for i in range(attr_count):
+        (_, name, raw_value, _, _, data_type,
+         value) = struct.unpack_from('<IIIHBBI', data, offset + i * attr_size)
+        # Obfuscated manifests may blank the attribute name; the resource id survives.
+        is_name = (name < len(resource_ids) and resource_ids[name] == ANDROID_NAME_RES_ID) \
+            or strings.get(name) == 'name'
+        if not is_name:
+            continue
+        if raw_value != NO_ENTRY:
+            return strings.get(raw_value)
+        if data_type == TYPE_STRING:
+            return strings.get(value)
+    return None
+
+
+def read_manifest_permissions(apk_path):
+    """
+    Read declared permissions from an APK without building an androguard APK.
+
+    Only the AndroidManifest.xml zip entry is inflated.
+    """
+    try:
+        with zipfile.ZipFile(apk_path) as apk:
+            data = apk.read('AndroidManifest.xml')
+    except KeyError:
+        raise ManifestError('APK has no AndroidManifest.xml')
+    except zipfile.BadZipFile as e:
+        raise ManifestError(f'Not a valid APK: {str(e)}')
+    return parse_manifest_permissions(data)
@@ -0,0 +1,72 @@
+import re
+from collections import Counter
+
+
+class MultiPatternMatcher:
+    """
+    Finds every occurrence of a fixed set of literal substrings in one scan.
+
+    The patterns are compiled into a single regex shaped like a trie, so at
+    each text position the engine follows one branch per character instead
+    of trying every pattern. A zero-width lookahead lets matches overlap;
+    the longest pattern starting at a position is reported along with every
+    shorter pattern that is a prefix of it, which together are exactly the
+    patterns starting there.
+
+    Args:
+        patterns: Mapping of pattern -> iterable of labels (e.g. categories).
+            Patterns are matched case-sensitively; lowercase both sides for
+            case-insensitive matching.
+    """
+
+    def __init__(self, patterns):
+        self.labels_of = {}
+        for pattern, labels in patterns.items():
+            if pattern:
+                self.labels_of.setdefault(pattern, set()).update(labels)
+        # Patterns that are prefixes of each pattern (itself included), found by
+        # slicing rather than comparing every pair, so large sets build quickly
+        self.prefixes_of = {
+            pattern: [pattern[:end] for end in range(1, len(pattern) + 1) if pattern[:end] in self.labels_of]
+            for pattern in self.labels_of
+        }
+        self.regex = re.compile('(?=(' + _trie_pattern(self.labels_of) + '))') if self.labels_of else None
+
+    def iter_matches(self, text):
+        """Yield (position, pattern) for every occurrence, overlaps included."""
+        if self.regex is None:
+            return
+        prefixes_of = self.prefixes_of
+        for match in self.regex.finditer(text):
+            for pattern in prefixes_of[match.group(1)]:
+                yield match.start(), pattern
+
+    def scan(self, text):
+        """Return (set of labels hit, Counter of pattern occurrences) for ``text``."""
+        counts = Counter(pattern for _, pattern in self.iter_matches(text))
+        labels = set()
+        for pattern in counts:
+            labels |= self.labels_of[pattern]
+        return labels, counts
+
+    def labels(self, text):
+        return self.scan(text)[0]
+
+
+def _trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ends here: the longer continuations are optional and tried first (greedy).
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
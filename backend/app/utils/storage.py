@@ -1,7 +1,129 @@
 import os
-from werkzeug.utils import secure_filename
-from androguard.core.bytecodes.apk import APK
-from androguard.core.bytecodes.dvm import DalvikVMFormat
+import hashlib
+import tempfile
+from flask import Request, current_app
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from app.utils.blob_store import BlobStore
+
+CHUNK_SIZE = 64 * 1024
+ZIP_LOCAL_HEADER = b'PK\x03\x04'
+ZIP_END_OF_CENTRAL_DIR = b'PK\x05\x06'
+EOCD_MIN_SIZE = 22
+EOCD_SEARCH_SIZE = EOCD_MIN_SIZE + 0xFFFF  # Fixed record plus the longest possible archive comment
+
+class InvalidUpload(BadRequest):
+    """Raised while streaming an upload that is not a well-formed ZIP/APK archive."""
+
+class IngestStream:
+    """
+    Write target for one uploaded file.
+    
+    Bytes are spooled to a unique temp file while the SHA-256 is computed, the
+    size cap is enforced and the ZIP signatures are checked, so a bad upload is
+    rejected as soon as it shows and never more than one chunk is held in memory.
+    ``commit`` moves the file into a ``BlobStore``; closing an uncommitted stream
+    deletes the temp file.
+    
+    Args:
+        temp_dir: Staging directory on the same filesystem as the blob store.
+        max_size: Maximum accepted size in bytes (None for no limit).
+    """
+    
+    def __init__(self, temp_dir, max_size=None):
+        self.max_size = max_size
+        fd, self.temp_path = tempfile.mkstemp(suffix='.part', dir=temp_dir)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self._tail = b''
+        self.size = 0
+        self.path = None
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(f'Upload exceeds the {self.max_size} byte limit')
+        if len(self._head) < len(ZIP_LOCAL_HEADER):
+            self._head += data[:len(ZIP_LOCAL_HEADER) - len(self._head)]
+            if not ZIP_LOCAL_HEADER.startswith(self._head):
+                self.discard()
+                raise InvalidUpload('Upload is not a ZIP/APK archive')
+        # Only the end of the file can hold the end-of-central-directory record
+        if len(data) >= EOCD_SEARCH_SIZE:
+            self._tail = data[-EOCD_SEARCH_SIZE:]
+        else:
+            self._tail = (self._tail + data)[-EOCD_SEARCH_SIZE:]
+        self._digest.update(data)
+        self._file.write(data)
+        return len(data)
+    
+    def read(self, size=-1):
+        return self._file.read(size)
+    
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._file.seek(offset, whence)
+    
+    def tell(self):
+        return self._file.tell()
+    
+    def readable(self):
+        return True
+    
+    def writable(self):
+        return self.path is None
+    
+    def seekable(self):
+        return True
+    
+    @property
+    def closed(self):
+        return self._file.closed
+    
+    def finish(self):
+        """Check the archive is complete and return its hex SHA-256."""
+        if self._head != ZIP_LOCAL_HEADER:
+            self.discard()
+            raise InvalidUpload('Upload is not a ZIP/APK archive')
+        index = self._tail.rfind(ZIP_END_OF_CENTRAL_DIR)
+        if index < 0 or len(self._tail) - index < EOCD_MIN_SIZE:
+            self.discard()
+            raise InvalidUpload('Upload is truncated: ZIP central directory not found')
+        return self._digest.hexdigest()
+    
+    def commit(self, store, extension='.apk'):
+        """
+        Validate the upload and atomically move it into ``store`` under its SHA-256.
+        
+        Returns:
+            tuple: The full path of the stored file and its hex SHA-256 digest.
+        """
+        if self.path is not None:
+            return self.path, self._digest.hexdigest()
+        digest = self.finish()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        path = store.put(self.temp_path, digest, extension)
+        self.path = path
+        self._file = open(path, 'rb')
+        return path, digest
+    
+    def discard(self):
+        """Close the stream and delete the temp file if it was never committed."""
+        self._file.close()
+        if self.path is None and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+    
+    def close(self):
+        self.discard()
+
+class IngestRequest(Request):
+    """Request whose uploaded files stream straight into an ``IngestStream``."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        store = current_app.extensions['blob_store']
+        return IngestStream(store.temp_dir, current_app.config.get('MAX_APK_SIZE'))
 
 def save_file(file, upload_folder):
     """
@@ -9,33 +131,67 @@ def save_file(file, upload_folder):
     
     Args:
         file: The file object to save.
-        upload_folder: The directory where the file should be saved.
+        upload_folder: A ``BlobStore`` or the directory of one.
         
     Returns:
         str: The full path of the saved file.
     """
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
+    return save_file_with_digest(file, upload_folder)[0]
+
+def save_file_with_digest(file, upload_folder, chunk_size=CHUNK_SIZE, max_size=None):
+    """
+    Store an uploaded APK under its SHA-256 and return the path and digest.
+    
+    Uploads parsed by ``IngestRequest`` were already hashed and validated while
+    the body streamed in and are only moved into place; any other file object is
+    copied through an ``IngestStream`` in ``chunk_size`` pieces.
     
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(upload_folder, filename)
-    file.save(file_path)
+    Args:
+        file: The file object to save.
+        upload_folder: A ``BlobStore`` or the directory of one.
+        chunk_size: Number of bytes copied per read.
+        max_size: Maximum accepted size in bytes (None for no limit).
+        
+    Returns:
+        tuple: The full path of the saved file and its hex SHA-256 digest.
+        
+    Raises:
+        InvalidUpload: The file is not a complete ZIP/APK archive.
+        RequestEntityTooLarge: The file is larger than ``max_size``.
+    """
+    store = upload_folder if isinstance(upload_folder, BlobStore) else BlobStore(upload_folder)
+    stream = file.stream
+    if isinstance(stream, IngestStream) and os.path.dirname(stream.temp_path) == store.temp_dir:
+        return stream.commit(store)
     
-    return file_path
+    ingest = IngestStream(store.temp_dir, max_size)
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            ingest.write(chunk)
+        return ingest.commit(store)
+    finally:
+        ingest.close()
 
-def analyze_apk(apk_path):
-    apk = APK(apk_path)
-    all_classes = []
+def analyze_apk(apk_path, deep=False):
+    """
+    List the classes of an APK, parsing its DEX files in parallel.
+    
+    Args:
+        apk_path: Path of the APK.
+        deep: Also cross-reference the code to report which declared
+            permissions are backed by calls to protected APIs.
+        
+    Returns:
+        dict: ``classes`` plus the method table and per-DEX timings (and
+        ``permission_usage`` when ``deep``), or ``error`` on failure.
+    """
+    # androguard is heavy to import, so the workers only pay for it when analysis runs
+    from app.services.dex_analysis import dex_analyzer
     try:
-        dex_files = list(apk.get_all_dex())
-        if not dex_files:
-            return {"error": "No DEX files found in APK."}
-        for dex in dex_files:
-            dvm = DalvikVMFormat(dex)
-            # get_classes returns a list of ClassDefItem objects, get their names:
-            classes = [c.get_name() for c in dvm.get_classes()]
-            all_classes.extend(classes)
-        return {"classes": all_classes}
+        return dex_analyzer.analyze(apk_path, with_analysis=deep)
     except Exception as e:
         return {"error": f"APK analysis failed: {str(e)}"}
 
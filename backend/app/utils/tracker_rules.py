@@ -0,0 +1,234 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit
+
+from app.utils.pattern_matcher import MultiPatternMatcher
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'tracker_rules.json')
+DEFAULT_CHECK_INTERVAL = 5
+
+TrackerRule = namedtuple('TrackerRule', ['id', 'name', 'category'])
+
+
+class TrackerRuleset:
+    """
+    A tracker ruleset compiled for matching; immutable once built.
+
+    Each rule lists ``domains`` and ``patterns``. A domain matches a resource
+    URL whose host is that domain or any subdomain of it: the host's parent
+    suffixes are looked up in a dict, so the cost depends on the number of
+    labels in the host, not on the number of rules. Patterns are literal
+    substrings of the page source (inline payloads such as ``fbq(`` or a
+    tracker URL inside a script); they are compiled into one
+    ``MultiPatternMatcher`` so the page is scanned once for all of them.
+
+    Args:
+        rules: Iterable of dicts with ``id``, ``name`` and optional
+            ``category``, ``domains`` and ``patterns``.
+        version: Free-form version string of the ruleset.
+        source: Where the rules were loaded from, for reporting.
+    """
+
+    def __init__(self, rules, version=None, source=None):
+        self.version = version
+        self.source = source
+        self.rules = []
+        self._domains = {}
+        patterns = {}
+        for index, rule in enumerate(rules):
+            self.rules.append(TrackerRule(
+                str(rule['id']), rule.get('name') or str(rule['id']), rule.get('category') or 'Tracking'))
+            for domain in rule.get('domains') or ():
+                domain = domain.strip().lower().lstrip('.')
+                if domain:
+                    self._domains.setdefault(domain, set()).add(index)
+            for pattern in rule.get('patterns') or ():
+                if pattern:
+                    patterns.setdefault(pattern, set()).add(index)
+        self.pattern_count = len(patterns)
+        self.matcher = MultiPatternMatcher(patterns)
+        # Text kept between fed pieces so a pattern split across them is still found
+        self.overlap = max((len(p) for p in patterns), default=1) - 1
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def domain_count(self):
+        return len(self._domains)
+
+    def match_host(self, host):
+        """Indexes of the rules whose domains cover ``host``."""
+        matched = set()
+        labels = host.lower().rstrip('.').split('.')
+        for start in range(len(labels)):
+            indexes = self._domains.get('.'.join(labels[start:]))
+            if indexes:
+                matched |= indexes
+        return matched
+
+    def match_url(self, url):
+        """Indexes of the rules whose domains cover the host of ``url`` (none for relative URLs)."""
+        try:
+            host = urlsplit(url.strip()).hostname
+        except ValueError:
+            return set()
+        return self.match_host(host) if host else set()
+
+    def match_text(self, text):
+        """Indexes of the rules with a pattern occurring in ``text``."""
+        return self.matcher.labels(text)
+
+    def scan(self):
+        """Start matching one page that is fed in pieces; see ``RulesetScan``."""
+        return RulesetScan(self)
+
+
+class RulesetScan:
+    """Accumulates the rules one page matches as its source and resource URLs arrive."""
+
+    def __init__(self, ruleset):
+        self.ruleset = ruleset
+        self.matched = set()
+        self._carry = ''
+
+    def feed(self, text):
+        ruleset = self.ruleset
+        if ruleset.matcher.regex is None:
+            return
+        window = self._carry + text
+        self.matched |= ruleset.matcher.labels(window)
+        self._carry = window[-ruleset.overlap:] if ruleset.overlap else ''
+
+    def add_url(self, url):
+        if url:
+            self.matched |= self.ruleset.match_url(url)
+
+    @property
+    def rules(self):
+        """Matched rules, in ruleset order."""
+        return [self.ruleset.rules[index] for index in sorted(self.matched)]
+
+
+def load_ruleset(path):
+    """
+    Load a ruleset from JSON or CSV.
+
+    JSON: ``{"version": ..., "rules": [{"id", "name", "category", "domains",
+    "patterns"}]}``. CSV: one signature per row with the columns ``id``,
+    ``name``, ``category``, ``type`` (``domain`` or ``pattern``) and
+    ``value``; rows sharing an id form one rule.
+    """
+    if path.lower().endswith('.csv'):
+        rules = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rule = rules.setdefault(row['id'], {
+                    'id': row['id'], 'name': row.get('name'), 'category': row.get('category'),
+                    'domains': [], 'patterns': []
+                })
+                kind = (row.get('type') or 'domain').strip().lower()
+                if kind not in ('domain', 'pattern'):
+                    raise ValueError(f"Unknown signature type {kind!r} for rule {row['id']}")
+                rule[kind + 's'].append(row['value'])
+        return TrackerRuleset(rules.values(), version=None, source=path)
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return TrackerRuleset(data.get('rules', []), version=data.get('version'), source=path)
+
+
+class TrackerDatabase:
+    """
+    Process-wide tracker ruleset that reloads itself when its file changes.
+
+    ``current()`` returns the compiled ruleset, re-checking the file's mtime
+    at most every ``check_interval`` seconds; a changed file is compiled and
+    swapped in, so every worker picks up an edited ruleset without a
+    restart. Scans keep using the previous ruleset while one thread
+    compiles the new one. A file that fails to load is reported and the
+    previous ruleset stays active. Per-rule hit counts (pages matched) are kept per process.
+    """
+
+    def __init__(self, path=None, check_interval=None):
+        self.path = path or os.getenv('TRACKER_RULES_PATH') or DEFAULT_RULES_PATH
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv('TRACKER_RULES_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+        self._ruleset = None
+        self._mtime = None
+        self._checked_at = None
+        self._loaded_at = None
+        self._hits = Counter()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def current(self):
+        """Return the active ruleset, reloading it first if the file changed."""
+        now = time.monotonic()
+        if self._ruleset is None:
+            with self._refresh_lock:
+                if self._ruleset is None:
+                    self._refresh(now)
+        elif now - self._checked_at >= self.check_interval and self._refresh_lock.acquire(blocking=False):
+            try:
+                self._refresh(now)
+            finally:
+                self._refresh_lock.release()
+        return self._ruleset
+
+    def reload(self):
+        """Recompile the ruleset from disk now, whether or not the file changed."""
+        with self._refresh_lock:
+            self._mtime = None
+            self._refresh(time.monotonic())
+        return self._ruleset
+
+    def record(self, rules):
+        """Count one hit for each matched rule."""
+        if rules:
+            with self._lock:
+                self._hits.update(rule.id for rule in rules)
+
+    def stats(self):
+        ruleset = self.current()
+        with self._lock:
+            hits = dict(self._hits.most_common())
+        return {
+            'path': self.path,
+            'version': ruleset.version,
+            'rules': len(ruleset),
+            'domains': ruleset.domain_count,
+            'patterns': ruleset.pattern_count,
+            'loaded_at': self._loaded_at,
+            'hits': hits
+        }
+
+    def _refresh(self, now):
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._ruleset is None:
+                print(f"[WARN] Tracker ruleset not available: {str(e)}")
+                self._ruleset = TrackerRuleset([], source=self.path)
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            ruleset = load_ruleset(self.path)
+        except Exception as e:
+            print(f"[WARN] Could not load tracker ruleset {self.path}: {str(e)}")
+            self._mtime = mtime  # Retry once the file changes again
+            if self._ruleset is None:
+                self._ruleset = TrackerRuleset([], source=self.path)
+            return
+        self._ruleset = ruleset
+        self._mtime = mtime
+        self._loaded_at = time.time()
+        print(f"Loaded tracker ruleset {self.path}: {len(ruleset)} rules (version {ruleset.version})")
+
+
+tracker_db = TrackerDatabase()
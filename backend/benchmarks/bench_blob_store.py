@@ -0,0 +1,105 @@
+"""
+Drive the APK blob store with a steady stream of uploads and report disk usage.
+
+Uploads are random blobs with a share of repeats (the same APK uploaded
+again). Half of the uploads are logged as scans, which take a reference
+on the blob. Only the newest --retained scan records are kept, and older
+ones are deleted, releasing their reference. The store should deduplicate
+the repeats and stay under its byte budget however many uploads arrive,
+so the "on disk" column should plateau. It should evict unreferenced
+blobs, so "ref-evicted" stays 0 while the retained scans' APKs fit in the
+budget.
+
+Usage: python benchmarks/bench_blob_store.py [--uploads N] [--budget-mb MB] [--dup-ratio R] [--retained N]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def load_blob_store():
+    # Load the module on its own so the Flask app package is not imported.
+    spec = importlib.util.spec_from_file_location(
+        'blob_store', os.path.join(BACKEND_DIR, 'app', 'utils', 'blob_store.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def disk_usage(root):
+    total = files = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith('.apk'):
+                total += os.path.getsize(os.path.join(dirpath, name))
+                files += 1
+    return total, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', type=int, default=5000)
+    parser.add_argument('--budget-mb', type=float, default=64)
+    parser.add_argument('--dup-ratio', type=float, default=0.3)
+    parser.add_argument('--min-kb', type=int, default=16)
+    parser.add_argument('--max-kb', type=int, default=256)
+    parser.add_argument('--retained', type=int, default=100, help='scan records kept before the oldest is deleted')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import hashlib
+    from collections import deque
+    blob_store = load_blob_store()
+    rng = random.Random(args.seed)
+    root = tempfile.mkdtemp(prefix='bench_blob_store_')
+    store = blob_store.BlobStore(root, max_bytes=int(args.budget_mb * 1024 * 1024), grace=0)
+    seen = []
+    scans = deque()
+    latencies = []
+    report_every = max(args.uploads // 10, 1)
+    try:
+        print(f"{'uploads':>8}  {'on disk MB':>10}  {'files':>6}  {'referenced':>10}  {'evicted':>7}  {'ref-evicted':>11}")
+        for i in range(1, args.uploads + 1):
+            if seen and rng.random() < args.dup_ratio:
+                payload = rng.choice(seen)
+            else:
+                payload = rng.randbytes(rng.randint(args.min_kb, args.max_kb) * 1024)
+                seen.append(payload)
+                if len(seen) > 200:
+                    seen.pop(0)
+            digest = hashlib.sha256(payload).hexdigest()
+            fd, temp_path = tempfile.mkstemp(dir=store.temp_dir)
+            with os.fdopen(fd, 'wb') as out:
+                out.write(payload)
+            start = time.perf_counter()
+            store.put(temp_path, digest)
+            if rng.random() < 0.5:
+                store.add_ref(digest)
+                scans.append(digest)
+                if len(scans) > args.retained:
+                    store.release_ref(scans.popleft())
+            latencies.append(time.perf_counter() - start)
+            if i % report_every == 0:
+                total, files = disk_usage(root)
+                stats = store.stats()
+                print(f"{i:>8}  {total / 1024 / 1024:>10.1f}  {files:>6}  {stats['referenced']:>10}  "
+                      f"{store.evicted:>7}  {store.evicted_referenced:>11}")
+        latencies.sort()
+        print(f"\nbudget {args.budget_mb:.0f} MB; put+ref latency "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+        print('index:', store.stats())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare serial and parallel per-DEX analysis of multi-DEX APKs.
+
+For each APK the analysis runs once with a single worker and once per
+requested worker count, on a warmed-up pool so process start-up is not
+counted. The merged class/method tables and permission usage must match
+the serial run. APKs default to backend/uploads; --replicate N instead
+builds a synthetic N-DEX APK from each one by copying its classes.dex.
+
+Usage: python benchmarks/bench_dex_analysis.py [--workers 1,2,4] [--replicate N] [--repeat R] [apk ...]
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def replicate_dex(apk_path, copies, out_dir):
+    """Write a copy of ``apk_path`` whose classes.dex is repeated as classes2..N.dex."""
+    target = os.path.join(out_dir, f"{os.path.basename(apk_path)[:-4]}_x{copies}.apk")
+    with zipfile.ZipFile(apk_path) as src, zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as dst:
+        dex = src.read('classes.dex')
+        for info in src.infolist():
+            if not (info.filename.startswith('classes') and info.filename.endswith('.dex')):
+                dst.writestr(info, src.read(info.filename))
+        dst.writestr('classes.dex', dex)
+        for i in range(2, copies + 1):
+            dst.writestr(f'classes{i}.dex', dex)
+    return target
+
+
+def comparable(report):
+    return (report['classes'], report['methods'], report.get('permission_usage'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('apks', nargs='*')
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument('--replicate', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app.services.dex_analysis import DexAnalyzer
+
+    apks = args.apks or sorted(glob.glob(os.path.join(BACKEND_DIR, 'uploads', '**', '*.apk'), recursive=True))
+    worker_counts = sorted({int(w) for w in args.workers.split(',')})
+    temp_dir = tempfile.mkdtemp(prefix='bench_dex_')
+    try:
+        if args.replicate > 1:
+            apks = [replicate_dex(path, args.replicate, temp_dir) for path in apks]
+        print(f"cpus: {os.cpu_count()}")
+        for path in apks:
+            baseline = None
+            print(f"\n{os.path.basename(path)}")
+            for workers in worker_counts:
+                analyzer = DexAnalyzer(max_workers=workers, parallel_min_bytes=0)
+                report = analyzer.analyze(path)  # Warm up the pool and the permission map
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    report = analyzer.analyze(path)
+                    timings.append(time.perf_counter() - start)
+                analyzer.shutdown()
+                if baseline is None:
+                    baseline = (min(timings), comparable(report))
+                identical = comparable(report) == baseline[1]
+                print(f"  workers={workers:<3} wall {min(timings) * 1000:8.1f} ms  "
+                      f"speedup {baseline[0] / min(timings):4.2f}x  identical={identical}")
+            for dex in report['dex_files']:
+                print(f"    {dex['name']:<16} {dex['size']:>9} B  {dex['classes']:>6} classes  "
+                      f"parse {dex['parse_ms']:8.1f} ms  xref {dex['analysis_ms']:8.1f} ms")
+            usage = report['permission_usage']
+            print(f"  used: {sorted(usage['used'])}  unused: {usage['unused']}  unverified: {usage['unverified']}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure how much of a rescan the per-DEX analysis cache saves.
+
+A synthetic app with N distinct DEX files is derived from a real APK. Each
+DEX is a copy of its classes.dex with a different signature field, so the
+content hashes differ while the code parses identically. Each scenario runs
+deep analysis:
+
+  cold      first scan, empty cache
+  rescan    the same version again (nightly rescan of an unchanged app)
+  update    a new version in which --changed DEX files differ
+
+Every cached result must equal the uncached analysis of the same APK.
+
+Usage: python benchmarks/bench_dex_cache.py [--dex-count N] [--changed K] [apk]
+"""
+import argparse
+import glob
+import hashlib
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def build_version(apk_path, out_path, dex_count, salt):
+    """Write an APK with ``dex_count`` DEX files whose hashes depend on ``salt[i]``."""
+    with zipfile.ZipFile(apk_path) as src, zipfile.ZipFile(out_path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        dex = src.read('classes.dex')
+        for info in src.infolist():
+            if not (info.filename.startswith('classes') and info.filename.endswith('.dex')):
+                dst.writestr(info, src.read(info.filename))
+        for i in range(dex_count):
+            # Bytes 12..32 hold the DEX SHA-1 signature, which the parser does not check;
+            # bytes 8..12 hold the Adler-32 of everything after them, which it does
+            body = hashlib.sha1(f"{i}:{salt[i]}".encode()).digest() + dex[32:]
+            variant = dex[:8] + struct.pack('<I', zlib.adler32(body)) + body
+            dst.writestr('classes.dex' if i == 0 else f'classes{i + 1}.dex', variant)
+    return out_path
+
+
+def comparable(report):
+    return (report['classes'], report['methods'], report['permission_usage'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('apk', nargs='?')
+    parser.add_argument('--dex-count', type=int, default=12)
+    parser.add_argument('--changed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app.services.dex_analysis import DexAnalyzer
+    from app.services.dex_cache import DexCache
+
+    apk = args.apk or sorted(glob.glob(os.path.join(BACKEND_DIR, 'uploads', '**', '*.apk'), recursive=True))[0]
+    temp_dir = tempfile.mkdtemp(prefix='bench_dex_cache_')
+    try:
+        salts = [0] * args.dex_count
+        v1 = build_version(apk, os.path.join(temp_dir, 'v1.apk'), args.dex_count, salts)
+        for i in range(args.changed):
+            salts[-1 - i] = 1
+        v2 = build_version(apk, os.path.join(temp_dir, 'v2.apk'), args.dex_count, salts)
+
+        uncached = DexAnalyzer(max_workers=args.workers, cache=DexCache(os.path.join(temp_dir, 'unused.sqlite3')))
+        uncached.cache.get_many = lambda keys: {}
+        uncached.cache.set_many = lambda entries: None
+        cached = DexAnalyzer(max_workers=args.workers, cache=DexCache(os.path.join(temp_dir, 'dex_cache.sqlite3')))
+        uncached.analyze(v1)  # Warm imports and the permission map
+
+        print(f"{os.path.basename(apk)}: {args.dex_count} DEX files, {args.changed} changed in the update\n")
+        print(f"{'scenario':<10} {'uncached ms':>12} {'cached ms':>10} {'reparsed':>9} {'speedup':>8}  identical")
+        for scenario, path in (('cold', v1), ('rescan', v1), ('update', v2)):
+            start = time.perf_counter()
+            expected = uncached.analyze(path)
+            uncached_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            report = cached.analyze(path)
+            cached_ms = (time.perf_counter() - start) * 1000
+            reparsed = sum(not dex['cached'] for dex in report['dex_files'])
+            print(f"{scenario:<10} {uncached_ms:>12.1f} {cached_ms:>10.1f} {reparsed:>9} "
+                  f"{uncached_ms / cached_ms:>7.1f}x  {comparable(report) == comparable(expected)}")
+        print(f"\ncache: {cached.cache.stats()}  "
+              f"size {os.path.getsize(os.path.join(temp_dir, 'dex_cache.sqlite3')) / 1024:.0f} KiB")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Measure the memory-mapped domain blocklist against an in-heap set.
+
+A synthetic threat-intel feed of --domains domains is compiled with
+compile_blocklist. Then:
+
+  memory   heap used by a Python set of the feed vs. by opening the build
+  lookups  per-host latency for hosts that are listed, subdomains of listed
+           domains and unlisted hosts; results must equal a set-based
+           parent-domain walk
+  sharing  --workers processes open the same build and touch every page;
+           /proc smaps shows the mapping counted once (Pss = Rss / workers)
+  swap     a new build is renamed over the file while a thread keeps
+           looking hosts up; lookups never fail and the new entry appears
+
+Usage: python benchmarks/bench_domain_blocklist.py [--domains N] [--workers W]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def random_domain(rng):
+    labels = [''.join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(rng.randint(4, 14)))
+              for _ in range(rng.randint(1, 2))]
+    return '.'.join(labels + [rng.choice(['com', 'net', 'org', 'xyz', 'ru', 'info', 'top'])])
+
+
+def write_feed(path, domains):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# synthetic threat-intel feed\n')
+        for i, domain in enumerate(domains):
+            if i % 10 == 0:
+                f.write(f'0.0.0.0 {domain}\n')  # hosts-file style
+            elif i % 10 == 1:
+                f.write(f'*.{domain}\n')
+            else:
+                f.write(domain + '\n')
+
+
+def set_match(listed, host):
+    labels = host.split('.')
+    for start in range(len(labels)):
+        candidate = '.'.join(labels[start:])
+        if candidate in listed:
+            return candidate
+    return None
+
+
+def mapping_usage(path):
+    """(Rss, Pss) in KiB of this process's mapping of ``path``, from /proc/self/smaps."""
+    rss = pss = 0
+    inside = False
+    with open('/proc/self/smaps') as f:
+        for line in f:
+            if not line[0].isupper() or ' ' in line.split(':', 1)[0]:
+                inside = line.rstrip().endswith(path)
+            elif inside and line.startswith('Rss:'):
+                rss += int(line.split()[1])
+            elif inside and line.startswith('Pss:'):
+                pss += int(line.split()[1])
+    return rss, pss
+
+
+def worker(path, barrier, queue):
+    from app.utils.domain_blocklist import DomainBlocklist
+    blocklist = DomainBlocklist(path)
+    # Touch every page of the mapping so it is resident in this process too
+    total = 0
+    for i in range(0, len(blocklist), 512):
+        total += blocklist._hashes[i] & 1
+    barrier.wait()
+    queue.put(mapping_usage(os.path.realpath(path)))
+    barrier.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--domains', type=int, default=2000000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app.utils.domain_blocklist import BlocklistStore, DomainBlocklist, compile_blocklist
+
+    rng = random.Random(args.seed)
+    temp_dir = tempfile.mkdtemp(prefix='bench_blocklist_')
+    try:
+        domains = [random_domain(rng) for _ in range(args.domains)]
+        feed = os.path.join(temp_dir, 'feed.txt')
+        write_feed(feed, domains)
+        out = os.path.join(temp_dir, 'blocklist.bin')
+        start = time.perf_counter()
+        count = compile_blocklist(feed, out)
+        print(f"compiled {count} domains in {time.perf_counter() - start:.1f} s, "
+              f"{os.path.getsize(out) / 2**20:.1f} MB on disk\n")
+
+        tracemalloc.start()
+        listed = set(domains)
+        set_mb = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+        tracemalloc.start()
+        blocklist = DomainBlocklist(out)
+        mmap_mb = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+        print(f"memory   python set: {set_mb:.0f} MB of heap per worker; "
+              f"mmap build: {mmap_mb:.3f} MB of heap, pages shared via the page cache")
+
+        hosts = []
+        for i in range(args.lookups):
+            kind = i % 3
+            if kind == 0:
+                hosts.append(rng.choice(domains))
+            elif kind == 1:
+                hosts.append(f"{rng.choice(['www', 'cdn', 'a.b'])}.{rng.choice(domains)}")
+            else:
+                hosts.append(random_domain(rng))
+        start = time.perf_counter()
+        actual = [blocklist.match(host) for host in hosts]
+        mmap_us = (time.perf_counter() - start) / len(hosts) * 1e6
+        start = time.perf_counter()
+        expected = [set_match(listed, host) for host in hosts]
+        set_us = (time.perf_counter() - start) / len(hosts) * 1e6
+        print(f"lookups  {len(hosts)} hosts (listed / subdomain / unlisted): mmap {mmap_us:.1f} us, "
+              f"set {set_us:.1f} us per host; identical: {actual == expected}, "
+              f"matched {sum(m is not None for m in actual)}")
+        del listed
+
+        if os.path.exists('/proc/self/smaps'):
+            ctx = multiprocessing.get_context('spawn')
+            barrier = ctx.Barrier(args.workers)
+            queue = ctx.Queue()
+            procs = [ctx.Process(target=worker, args=(out, barrier, queue)) for _ in range(args.workers)]
+            for proc in procs:
+                proc.start()
+            usage = [queue.get() for _ in procs]
+            for proc in procs:
+                proc.join()
+            rss = sum(u[0] for u in usage) / len(usage) / 1024
+            pss = sum(u[1] for u in usage) / 1024
+            print(f"sharing  {args.workers} workers: {rss:.1f} MB resident in each, "
+                  f"{pss:.1f} MB proportional total (one copy)")
+
+        store = BlocklistStore(out, check_interval=0)
+        store.current()
+        errors = []
+        stop = threading.Event()
+        lookups = [0]
+
+        def hammer():
+            while not stop.is_set():
+                try:
+                    store.match(domains[lookups[0] % len(domains)])
+                    lookups[0] += 1
+                except Exception as e:
+                    errors.append(e)
+
+        thread = threading.Thread(target=hammer)
+        thread.start()
+        with open(feed, 'a', encoding='utf-8') as f:
+            f.write('freshly-listed.example\n')
+        start = time.perf_counter()
+        compile_blocklist(feed, out)
+        rebuild_s = time.perf_counter() - start
+        time.sleep(0.2)
+        stop.set()
+        thread.join()
+        print(f"swap     rebuilt in {rebuild_s:.1f} s under {lookups[0]} concurrent lookups, errors: {len(errors)}; "
+              f"new entry matched: {store.match('x.freshly-listed.example')!r}, generation {store.generation}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Compare the BeautifulSoup feature walk with the single-pass HtmlFeatureExtractor.
+
+Synthetic pages of several sizes mix ordinary markup with everything the
+website scan looks at: external and inline scripts (some obfuscated),
+iframes, forms, self-closing tags, tracker URLs, privacy keywords in mixed
+case, character references and privacy links. The extractor is fed the
+encoded page in 64 KiB byte chunks, as the scanner does while the page
+downloads. Its features must equal the legacy walk's on every page.
+
+Pages made only of anchors that are never closed check that the
+extractor stays linear in time and flat in memory on such markup (the
+legacy walk is not timed there: it nests every anchor in the previous
+one). The privacy link at the end of those pages must still be found.
+
+Usage: python benchmarks/bench_html_extractor.py [--sizes-kb 100,1000,5000] [--fuzz N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CHUNK = 64 * 1024
+
+FRAGMENTS = [
+    '<div class="row"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>',
+    '<ul><li><a href="/products">Products</a></li><li><a href="/about">About &amp; team</a></li></ul>',
+    '<script src="https://cdn.example.com/lib.js"></script>',
+    '<script src="//static.example.net/app.js" async></script>',
+    '<script src="/local/bundle.js"></script>',
+    '<script>window.dataLayer = window.dataLayer || [];</script>',
+    '<script>var s="' + 'x' * 520 + '"; eval(s);</script>',
+    '<script>var t="' + 'y' * 400 + '"; unescape(t);</script>',
+    '<iframe src="https://ads.example.com/frame"></iframe>',
+    '<form action="/subscribe"><input name="email"/><button>Go</button></form>',
+    '<img src="/logo.png"/><br/><hr/>',
+    '<p>Read our Privacy&nbsp;Policy or the TERMS OF SERVICE.</p>',
+    '<p>Data Protection officer: dpo@example.com</p>',
+    '<script async src="https://www.google-analytics.com/analytics.js"></script>',
+    '<img src="https://www.facebook.com/tr?id=1&ev=PageView"/>',
+    '<a href="/legal">Your <b>privacy</b> choices</a>',
+    '<a href="/privacy-notice">Notice</a>',
+    '<!-- comment with <script>eval(x)</script> inside -->',
+    '<p>5 &lt; 6 &#38; caf&eacute;</p>',
+]
+UNCLOSED_ANCHOR = '<a href="/item">Item with no closing tag '
+
+
+def make_page(size, rng, fragments=FRAGMENTS):
+    parts = ['<!DOCTYPE html><html><head><title>Bench</title></head><body>']
+    length = len(parts[0])
+    while length < size:
+        fragment = rng.choice(fragments)
+        parts.append(fragment)
+        length += len(fragment)
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def legacy_features(text, max_scripts):
+    """The original BeautifulSoup walk from WebsiteScanner, plus the linked-resource lookups."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(text, 'html.parser')
+    trackers = []
+    if 'google-analytics.com' in text:
+        trackers.append('Google Analytics')
+    if 'facebook.com/tr' in text:
+        trackers.append('Facebook Pixel')
+    external = [s['src'] for s in soup.find_all('script', src=True)
+                if s['src'].startswith('http') or s['src'].startswith('//')]
+    obfuscated = any(len(s.string) > 500 and ('eval(' in s.string or 'unescape(' in s.string)
+                     for s in soup.find_all('script', string=True))
+    privacy_link = None
+    for link in soup.find_all('a', href=True):
+        if 'privacy' in link['href'].lower() or 'privacy' in link.get_text().lower():
+            privacy_link = link['href']
+            break
+    return {
+        'trackers': trackers,
+        'external_scripts_count': len(external),
+        'external_script_urls': external[:max_scripts],
+        'iframe_count': len(soup.find_all('iframe')),
+        'form_count': len(soup.find_all('form')),
+        'potential_js_obfuscation': obfuscated,
+        'privacy_keywords_detected': any(k in text.lower() for k in
+                                         ['privacy policy', 'data protection', 'terms of service']),
+        'privacy_link': privacy_link,
+    }
+
+
+def extractor_features(html_features, data, max_scripts, ruleset):
+    page = html_features.HtmlFeatureExtractor(max_chars=len(data) + 1, max_script_urls=max_scripts, ruleset=ruleset)
+    for offset in range(0, len(data), CHUNK):
+        page.feed_bytes(data[offset:offset + CHUNK], 'utf-8')
+    page.close()
+    return {
+        'trackers': page.trackers,
+        'external_scripts_count': page.external_scripts_count,
+        'external_script_urls': page.external_script_urls,
+        'iframe_count': page.iframe_count,
+        'form_count': page.form_count,
+        'potential_js_obfuscation': page.potential_js_obfuscation,
+        'privacy_keywords_detected': page.privacy_keywords_detected,
+        'privacy_link': page.privacy_link,
+    }
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-kb', default='100,1000,5000')
+    parser.add_argument('--fuzz', type=int, default=300, help='small random pages checked for identical output')
+    parser.add_argument('--max-scripts', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app.utils import html_features
+    from app.utils.tracker_rules import TrackerRuleset
+    # The two substring checks the legacy scanner made
+    ruleset = TrackerRuleset([
+        {'id': 'google-analytics', 'name': 'Google Analytics', 'patterns': ['google-analytics.com']},
+        {'id': 'facebook-pixel', 'name': 'Facebook Pixel', 'patterns': ['facebook.com/tr']},
+    ])
+    rng = random.Random(args.seed)
+
+    mismatches = 0
+    for _ in range(args.fuzz):
+        # Few fragments per page so that presence/absence of each feature varies
+        text = make_page(rng.randint(50, 3000), rng, rng.sample(FRAGMENTS, rng.randint(1, 6)))
+        if legacy_features(text, args.max_scripts) != extractor_features(html_features, text.encode(), args.max_scripts, ruleset):
+            mismatches += 1
+    print(f"fuzz: {args.fuzz} random pages, {mismatches} mismatches\n")
+
+    print(f"{'page':>8}  {'legacy s':>9}  {'legacy MB':>9}  {'single-pass s':>13}  {'single-pass MB':>14}  "
+          f"{'speedup':>7}  identical")
+    for size_kb in (int(s) for s in args.sizes_kb.split(',')):
+        text = make_page(size_kb * 1024, rng)
+        data = text.encode('utf-8')
+        expected, legacy_s, legacy_peak = measure(lambda: legacy_features(text, args.max_scripts))
+        actual, new_s, new_peak = measure(lambda: extractor_features(html_features, data, args.max_scripts, ruleset))
+        print(f"{size_kb:>6}KB  {legacy_s:>9.2f}  {legacy_peak / 2**20:>9.1f}  {new_s:>13.2f}  "
+              f"{new_peak / 2**20:>14.2f}  {legacy_s / new_s:>6.1f}x  {expected == actual}")
+
+    print(f"\n{'unclosed':>8}  {'single-pass s':>13}  {'s per MB':>8}  {'single-pass MB':>14}  privacy link found")
+    for size_kb in (int(s) for s in args.sizes_kb.split(',')):
+        text = make_page(size_kb * 1024, rng, [UNCLOSED_ANCHOR]) + '<a href="/legal">Privacy</a>'
+        data = text.encode('utf-8')
+        actual, new_s, new_peak = measure(lambda: extractor_features(html_features, data, args.max_scripts, ruleset))
+        print(f"{size_kb:>6}KB  {new_s:>13.2f}  {new_s / (len(data) / 2**20):>8.2f}  {new_peak / 2**20:>14.2f}  "
+              f"{actual['privacy_link'] == '/legal'}")
+
+
+if __name__ == '__main__':
+    main()
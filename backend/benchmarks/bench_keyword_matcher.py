@@ -0,0 +1,75 @@
+"""
+PolicyAnalyzer._categorize_text on 1 MB and 10 MB policy corpora.
+
+Compares the compiled multi-pattern matcher against the previous
+per-keyword substring scan and checks that the categorized output is
+identical.
+
+Usage: python benchmarks/bench_keyword_matcher.py [--sizes-mb 1 10]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.ml.policy_analyzer import PolicyAnalyzer  # noqa: E402
+
+FILLER = ("the of and to in we you your our may with for this that is are be by on or as "
+          "information services app users account device content applicable law time "
+          "purposes such including where other").split()
+
+
+def legacy_categorize(categories, text):
+    """_categorize_text before the compiled matcher."""
+    categorized_points = {category: [] for category in categories}
+    for sentence in re.split(r'[.!?]+', text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for category, keywords in categories.items():
+            if any(keyword.lower() in sentence.lower() for keyword in keywords):
+                categorized_points[category].append(sentence)
+    return categorized_points
+
+
+def make_corpus(size_bytes, categories, rng):
+    keywords = [k for words in categories.values() for k in words]
+    sentences = []
+    total = 0
+    while total < size_bytes:
+        words = [rng.choice(FILLER) for _ in range(rng.randint(8, 30))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords).upper() if rng.random() < 0.1
+                         else rng.choice(keywords))
+        sentence = ' '.join(words).capitalize() + rng.choice('.!?')
+        sentences.append(sentence)
+        total += len(sentence) + 1
+    return ' '.join(sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 10])
+    args = parser.parse_args()
+
+    analyzer = PolicyAnalyzer()
+    rng = random.Random(7)
+    print(f"{'corpus':>8} {'legacy s':>10} {'compiled s':>11} {'speedup':>8}  identical")
+    for size_mb in args.sizes_mb:
+        corpus = make_corpus(int(size_mb * 1024 * 1024), analyzer.categories, rng)
+        start = time.perf_counter()
+        expected = legacy_categorize(analyzer.categories, corpus)
+        legacy_s = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = analyzer._categorize_text(corpus)
+        compiled_s = time.perf_counter() - start
+        print(f"{size_mb:>6g}MB {legacy_s:10.2f} {compiled_s:11.2f} {legacy_s / compiled_s:7.1f}x  {actual == expected}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare permission extraction paths on the APKs in backend/uploads.
+
+Each mode runs in a fresh spawned process so peak RSS reflects only that
+path (including the import cost of androguard for the deep mode).
+
+Usage: python benchmarks/bench_manifest.py [--repeat N] [apk ...]
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _extract(mode, apk_paths, repeat):
+    import logging
+    logging.disable(logging.CRITICAL)
+    start = time.perf_counter()
+    if mode == 'fast':
+        # Load the module on its own so the Flask app package is not imported.
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(
+            'manifest', os.path.join(BACKEND_DIR, 'app', 'utils', 'manifest.py'))
+        manifest = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(manifest)
+        extract = manifest.read_manifest_permissions
+    else:
+        from androguard.core.bytecodes.apk import APK
+
+        def extract(path):
+            return APK(path).get_permissions()
+    import_ms = (time.perf_counter() - start) * 1000
+
+    timings = {}
+    permissions = {}
+    for path in apk_paths:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            permissions[path] = sorted(set(extract(path)))
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[path] = sorted(samples)[len(samples) // 2]
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return import_ms, timings, permissions, peak_rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('apks', nargs='*')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    apk_paths = args.apks or sorted(glob.glob(os.path.join(BACKEND_DIR, 'uploads', '*.apk')))
+    if not apk_paths:
+        sys.exit('No APKs found')
+
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for mode in ('fast', 'deep'):
+        with ctx.Pool(1) as pool:
+            results[mode] = pool.apply(_extract, (mode, apk_paths, args.repeat))
+
+    print(f"{'apk':40} {'fast ms':>10} {'deep ms':>10} {'speedup':>8}  match")
+    for path in apk_paths:
+        fast_ms = results['fast'][1][path]
+        deep_ms = results['deep'][1][path]
+        match = results['fast'][2][path] == results['deep'][2][path]
+        print(f"{os.path.basename(path):40} {fast_ms:10.2f} {deep_ms:10.2f} {deep_ms / fast_ms:7.1f}x  {match}")
+    for mode in ('fast', 'deep'):
+        import_ms, _, _, peak_rss_mb = results[mode]
+        print(f"{mode}: import {import_ms:.1f} ms, peak RSS {peak_rss_mb:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare scan documents that embed permission detail with the compact schema.
+
+--scans legacy scan documents are generated from realistic permission
+lists (scored by the real RiskCalculator) and migrated with
+scripts/migrate_scan_permissions.py. Reported:
+
+  size     average and total BSON size of the scan documents before and after
+  decode   documents/s for decoding the stored BSON into a scan with its
+           permission list (legacy: decode; compact: decode + dictionary join),
+           the per-document cost on the Mongo -> app path
+  reads    get_scan_by_id throughput through AppScan against the mongomock
+           collection, before and after the migration
+
+Every migrated scan must read back with the same permission list.
+
+Usage: python benchmarks/bench_permission_schema.py [--scans N] [--reads N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'scripts'))
+
+VENDOR_PERMISSIONS = ['com.google.android.c2dm.permission.RECEIVE', 'com.android.vending.BILLING',
+                      'com.google.android.finsky.permission.BIND_GET_INSTALL_REFERRER_SERVICE',
+                      'android.permission.FOREGROUND_SERVICE', 'android.permission.POST_NOTIFICATIONS',
+                      'android.permission.BLUETOOTH_CONNECT', 'android.permission.USE_BIOMETRIC']
+
+
+def permission_list(rng, known):
+    count = rng.randint(5, 30)
+    pool = [f'android.permission.{p}' for p in known] + VENDOR_PERMISSIONS
+    return rng.sample(pool, min(count, len(pool)))
+
+
+def sequential_bulk_write(collection):
+    """mongomock 4.3 cannot run pymongo 4.9+ UpdateOne requests through bulk_write; apply them one by one"""
+    def bulk_write(requests, ordered=True):
+        for request in requests:
+            collection.update_one(request._filter, request._doc)
+    collection.bulk_write = bulk_write
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', type=int, default=5000)
+    parser.add_argument('--reads', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import bson
+    import mongomock
+    from app import permission_dictionary
+    from app.models.app_scan import AppScan
+    from app.services.risk_calculator import DANGEROUS_PERMISSIONS, RiskCalculator
+    from migrate_scan_permissions import migrate
+
+    rng = random.Random(args.seed)
+    calculator = RiskCalculator()
+    db = mongomock.MongoClient().consent_engine_bench
+    permission_dictionary.mongo = SimpleNamespace(db=db)
+    legacy = []
+    for i in range(args.scans):
+        result = calculator.calculate_risk(permission_list(rng, list(DANGEROUS_PERMISSIONS)))
+        legacy.append({
+            'user_id': f'user{i % 500}',
+            'app_name': f'com.example.app{i}.apk',
+            'risk_score': result['risk_score'],
+            'permissions': result['permissions'],
+            'categories': result['categories'],
+            'critical_items': result['critical_items'],
+            'timestamp': datetime.utcnow()
+        })
+    db.scans.insert_many(legacy)
+    sequential_bulk_write(db.scans)
+    expected = {scan['_id']: scan['permissions'] for scan in legacy}
+
+    legacy_bson = [bson.encode(doc) for doc in db.scans.find()]
+    start = time.perf_counter()
+    converted, skipped = migrate(db)
+    migrate_s = time.perf_counter() - start
+    compact_bson = [bson.encode(doc) for doc in db.scans.find()]
+    print(f"migrated {converted} scans in {migrate_s:.1f} s ({skipped} skipped)\n")
+
+    legacy_total = sum(map(len, legacy_bson))
+    compact_total = sum(map(len, compact_bson))
+    print(f"size     legacy {legacy_total / len(legacy_bson):7.0f} B/doc ({legacy_total / 2**20:6.1f} MB)  "
+          f"compact {compact_total / len(compact_bson):7.0f} B/doc ({compact_total / 2**20:6.1f} MB)  "
+          f"{legacy_total / compact_total:.1f}x smaller")
+
+    start = time.perf_counter()
+    for raw in legacy_bson:
+        bson.decode(raw)
+    legacy_rate = len(legacy_bson) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for raw in compact_bson:
+        AppScan.expand_permissions(bson.decode(raw))
+    compact_rate = len(compact_bson) / (time.perf_counter() - start)
+    print(f"decode   legacy {legacy_rate:9.0f} docs/s  compact + join {compact_rate:9.0f} docs/s")
+
+    scan_ids = list(expected)
+    ids = [str(rng.choice(scan_ids)) for _ in range(args.reads)]
+    model = AppScan(SimpleNamespace(db=db))
+    start = time.perf_counter()
+    read_back = [model.get_scan_by_id(scan_id) for scan_id in ids]
+    compact_reads = len(ids) / (time.perf_counter() - start)
+    identical = all(scan['permissions'] == expected[scan['_id']] for scan in read_back)
+
+    legacy_db = mongomock.MongoClient().consent_engine_legacy
+    legacy_db.scans.insert_many([bson.decode(raw) for raw in legacy_bson])
+    legacy_model = AppScan(SimpleNamespace(db=legacy_db))
+    start = time.perf_counter()
+    for scan_id in ids:
+        legacy_model.get_scan_by_id(scan_id)
+    legacy_reads = len(ids) / (time.perf_counter() - start)
+    print(f"reads    legacy {legacy_reads:9.0f} scans/s  compact {compact_reads:9.0f} scans/s  "
+          f"(mongomock; identical permissions: {identical})")
+
+
+if __name__ == '__main__':
+    main()
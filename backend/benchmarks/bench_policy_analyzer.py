@@ -0,0 +1,122 @@
+"""
+Latency and summary-quality deltas for PolicyAnalyzer inference modes.
+
+Runs the same policy through:
+  baseline   fp32, one chunk per generate() call, no cache
+  batched    fp32, padded batches
+  int8       dynamically quantized model, padded batches
+  cached     batched fp32 again with a warm summary cache
+and reports wall time plus ROUGE-1 / ROUGE-L F1 of each combined summary
+against the baseline summary.
+
+Usage: python benchmarks/bench_policy_analyzer.py [policy.txt] [--batch-size N] [--threads N]
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.ml.policy_analyzer import PolicyAnalyzer  # noqa: E402
+from app.ml.summary_cache import SummaryCache  # noqa: E402
+
+BOILERPLATE = [
+    "We collect personal information that you provide to us, such as your name, email address and "
+    "device identifiers, when you register for an account or contact customer support.",
+    "We may share your information with third party service providers, advertising partners and "
+    "analytics providers who process data on our behalf under confidentiality obligations.",
+    "We use the information we collect to operate, maintain and improve our services, to personalize "
+    "content and to send you marketing communications where permitted by law.",
+    "We implement security measures designed to protect your information, including encryption in "
+    "transit and access controls, but no system can be guaranteed to be completely secure.",
+    "You have the right to access, correct or delete your personal data and to withdraw consent at "
+    "any time by contacting us or using the privacy settings in the app.",
+]
+
+
+def synthetic_policy(paragraphs=40):
+    return "\n\n".join(BOILERPLATE[i % len(BOILERPLATE)] * 3 for i in range(paragraphs))
+
+
+def rouge_1(candidate, reference):
+    cand, ref = candidate.lower().split(), reference.lower().split()
+    if not cand or not ref:
+        return 0.0
+    ref_counts = {}
+    for token in ref:
+        ref_counts[token] = ref_counts.get(token, 0) + 1
+    overlap = 0
+    for token in cand:
+        if ref_counts.get(token, 0) > 0:
+            ref_counts[token] -= 1
+            overlap += 1
+    return _f1(overlap, len(cand), len(ref))
+
+
+def rouge_l(candidate, reference):
+    cand, ref = candidate.lower().split(), reference.lower().split()
+    if not cand or not ref:
+        return 0.0
+    previous = [0] * (len(ref) + 1)
+    for token in cand:
+        current = [0]
+        for j, ref_token in enumerate(ref):
+            current.append(previous[j] + 1 if token == ref_token else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(cand), len(ref))
+
+
+def _f1(overlap, cand_len, ref_len):
+    if overlap == 0:
+        return 0.0
+    precision, recall = overlap / cand_len, overlap / ref_len
+    return 2 * precision * recall / (precision + recall)
+
+
+def run(analyzer, text):
+    start = time.perf_counter()
+    result = analyzer.analyze_policy(text)
+    return time.perf_counter() - start, result['summary']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('policy', nargs='?')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.policy:
+        with open(args.policy, encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = synthetic_policy()
+
+    rows = []
+    fp32 = PolicyAnalyzer(batch_size=1, num_threads=args.threads, quantize=False)
+    fp32.summary_cache = SummaryCache(max_entries=0)
+    baseline_s, reference = run(fp32, text)
+    rows.append(('baseline', baseline_s, reference))
+
+    fp32.batch_size = args.batch_size
+    rows.append(('batched',) + run(fp32, text))
+
+    fp32.summary_cache = SummaryCache()
+    run(fp32, text)
+    rows.append(('cached',) + run(fp32, text))
+
+    int8 = PolicyAnalyzer(batch_size=args.batch_size, num_threads=args.threads, quantize=True)
+    int8.summary_cache = SummaryCache(max_entries=0)
+    rows.append(('int8',) + run(int8, text))
+
+    print(f"{len(fp32._chunk_text(text))} chunks, {len(text)} characters")
+    print(f"{'mode':10} {'seconds':>9} {'speedup':>8} {'rouge-1':>8} {'rouge-l':>8}")
+    for mode, seconds, summary in rows:
+        print(f"{mode:10} {seconds:9.2f} {baseline_s / seconds:7.1f}x "
+              f"{rouge_1(summary, reference):8.3f} {rouge_l(summary, reference):8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Measure PDF report generation with ReportStore against rendering per request.
+
+Three parts, all on synthetic scan documents:
+
+  download   --requests downloads of --scans reports: rendering into a
+             BytesIO on every request, as /download-report did, against
+             ReportStore (rendered once, then read from the cached file)
+  large      one scan with --large-permissions permissions; time, peak
+             Python memory (tracemalloc) and size, in memory uncompressed
+             as before against compressed straight to the cache file
+  export     --export reports zipped one after another in this process
+             against ReportStore.export with --workers processes; the
+             archive must be valid and hold every report, and the time
+             to its first chunk is reported
+
+Usage: python benchmarks/bench_reports.py [--scans N] [--requests N] [--export N] [--workers N]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def scan_doc(rng, permissions):
+    return {
+        '_id': ObjectId(),
+        'user_id': 'user0',
+        'app_name': f'com.example.app{rng.randint(0, 10 ** 6)}.apk',
+        'risk_score': round(rng.uniform(0, 10), 2),
+        'permissions': [{'name': f'android.permission.PERMISSION_{i}', 'risk': 5.0} for i in range(permissions)],
+        'categories': {'Location': 7.5, 'Media': 4.0, 'Contacts': 2.5},
+        'critical_items': ['android.permission.READ_SMS', 'android.permission.RECORD_AUDIO'],
+        'timestamp': datetime(2024, 1, 1)
+    }
+
+
+def render_in_memory(scan_data):
+    """The layout as /download-report drew it before: an uncompressed PDF built in a BytesIO."""
+    from app.services.reports import render_report
+    buffer = io.BytesIO()
+    original = canvas.Canvas
+
+    def uncompressed(out, **kwargs):
+        kwargs['pageCompression'] = 0
+        return original(out, **kwargs)
+
+    canvas.Canvas = uncompressed
+    try:
+        render_report(scan_data, buffer)
+    finally:
+        canvas.Canvas = original
+    return buffer.getvalue()
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--permissions', type=int, default=60, help='permissions per scan')
+    parser.add_argument('--large-permissions', type=int, default=20000)
+    parser.add_argument('--export', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.reports import ReportStore
+
+    rng = random.Random(args.seed)
+    print(f"{os.cpu_count()} CPUs, letter pages of {letter[0]:.0f}x{letter[1]:.0f} pt\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docs = [scan_doc(rng, args.permissions) for _ in range(args.scans)]
+        requests = [rng.choice(docs) for _ in range(args.requests)]
+
+        start = time.perf_counter()
+        for doc in requests:
+            render_in_memory(doc)
+        per_request = (time.perf_counter() - start) / len(requests) * 1000
+        print(f"download  render per request {per_request:7.2f} ms/download")
+
+        store = ReportStore(os.path.join(temp_dir, 'download'))
+        start = time.perf_counter()
+        for doc in requests:
+            with open(store.get(doc), 'rb') as f:
+                f.read()
+        cached = (time.perf_counter() - start) / len(requests) * 1000
+        stats = store.stats()
+        print(f"          ReportStore        {cached:7.2f} ms/download  "
+              f"({stats['renders']} renders, hit ratio {stats['hit_ratio']:.3f}, {per_request / cached:.0f}x)\n")
+
+        large = scan_doc(rng, args.large_permissions)
+        data, seconds, peak = measure(lambda: render_in_memory(large))
+        print(f"large     in memory   {seconds:6.2f} s  peak {peak / 2 ** 20:6.1f} MB  {len(data) / 2 ** 20:6.2f} MB PDF")
+        store = ReportStore(os.path.join(temp_dir, 'large'))
+        path, seconds, peak = measure(lambda: store.get(large))
+        print(f"          to file     {seconds:6.2f} s  peak {peak / 2 ** 20:6.1f} MB  "
+              f"{os.path.getsize(path) / 2 ** 20:6.2f} MB PDF\n")
+
+        docs = [scan_doc(rng, args.permissions * rng.randint(1, 10)) for _ in range(args.export)]
+        by_id = {str(doc['_id']): doc for doc in docs}
+        scan_ids = list(by_id)
+
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+            for scan_id in scan_ids:
+                archive.writestr(f"scan_report_{scan_id}.pdf", render_in_memory(by_id[scan_id]))
+        sequential = time.perf_counter() - start
+        print(f"export    sequential  {sequential:6.2f} s  {len(scan_ids) / sequential:6.1f} reports/s  "
+              f"first byte after {sequential:6.2f} s")
+
+        store = ReportStore(os.path.join(temp_dir, 'export'))
+        store.max_workers = args.workers
+        store.executor  # Start the pool before timing, as a warm worker would have it
+        start = time.perf_counter()
+        first = None
+        buffer = io.BytesIO()
+        for chunk in store.export(scan_ids + ['000000000000000000000000'], by_id.get):
+            if first is None:
+                first = time.perf_counter() - start
+            buffer.write(chunk)
+        streamed = time.perf_counter() - start
+        store.shutdown()
+        archive = zipfile.ZipFile(buffer)
+        names = archive.namelist()
+        valid = archive.testzip() is None and names[:-1] == [f"scan_report_{i}.pdf" for i in scan_ids]
+        print(f"          {args.workers} worker(s) {streamed:6.2f} s  {len(scan_ids) / streamed:6.1f} reports/s  "
+              f"first byte after {first:6.2f} s  valid: {valid}, missing listed: {names[-1] == 'missing.txt'}")
+
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        for chunk in store.export(scan_ids, by_id.get):
+            buffer.write(chunk)
+        print(f"          re-export   {time.perf_counter() - start:6.2f} s  (every report served from the cache)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Throughput of RiskCalculator.calculate_risk_batch against per-app calculate_risk.
+
+Generates a synthetic catalog (100k apps by default), checks that batch
+scores match the single-call scores, and reports apps/second for the
+single-call loop, the batch API returning per-app dicts, and the batch
+API in array mode. Then it does the same for what /api/scan/risk/batch
+does, scoring plus JSON encoding of the response body: per-app
+calculate_risk serialized as records, and the batch API with
+format=records and format=columns. The columnar body must decode to the
+same scores and critical items.
+
+The request's target is 50x the single-call throughput. Batch scoring is
+vectorized, so what remains is one dict lookup per permission string
+(encode). That alone costs more than 1/50 of a single call per app, so
+the target is out of reach in Python, and the last line says whether it
+was met.
+
+Usage: python benchmarks/bench_risk_batch.py [--apps N] [--max-permissions N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.risk_calculator import (  # noqa: E402
+    DANGEROUS_PERMISSIONS, PERMISSION_PREFIXES, RiskCalculator
+)
+
+
+def make_catalog(apps, max_permissions, rng):
+    names = list(DANGEROUS_PERMISSIONS) + ['SEND_SMS', 'WRITE_CONTACTS', 'BIND_JOB_SERVICE', 'C2D_MESSAGE']
+    prefixes = PERMISSION_PREFIXES + ['com.example.app.permission.']
+    return [[rng.choice(prefixes) + rng.choice(names) for _ in range(rng.randint(0, max_permissions))]
+            for _ in range(apps)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--apps', type=int, default=100000)
+    parser.add_argument('--max-permissions', type=int, default=40)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.apps, args.max_permissions, random.Random(42))
+    calculator = RiskCalculator()
+
+    single, single_s = timed(lambda: [calculator.calculate_risk(p) for p in catalog])
+    batch, batch_s = timed(lambda: calculator.calculate_risk_batch(catalog))
+    arrays, arrays_s = timed(lambda: calculator.calculate_risk_batch(catalog, as_arrays=True))
+
+    mismatches = sum(s['risk_score'] != b['risk_score'] or s['categories'] != b['categories']
+                     or sorted(s['critical_items']) != sorted(b['critical_items'])
+                     for s, b in zip(single, batch))
+    mismatches += sum(s['risk_score'] != a for s, a in zip(single, arrays['risk_scores'].tolist()))
+    print(f"{args.apps} apps, up to {args.max_permissions} permissions each, {mismatches} mismatches")
+    for label, seconds in (('calculate_risk loop', single_s),
+                           ('calculate_risk_batch', batch_s),
+                           ('calculate_risk_batch arrays', arrays_s)):
+        print(f"{label:28} {seconds:8.3f} s {args.apps / seconds:12.0f} apps/s {single_s / seconds:6.1f}x")
+
+    # What the endpoint does: score, then encode the response body (Flask's default provider uses json.dumps)
+    def single_records():
+        results = [calculator.calculate_risk(p) for p in catalog]
+        return json.dumps({'results': [{'risk_score': r['risk_score'], 'categories': r['categories'],
+                                        'critical_items': r['critical_items']} for r in results]})
+
+    def batch_records():
+        return json.dumps({'results': calculator.calculate_risk_batch(catalog)})
+
+    def batch_columns():
+        columns = calculator.calculate_risk_batch(catalog, as_arrays=True)
+        return json.dumps({'categories': columns['categories'], 'risk_scores': columns['risk_scores'].tolist(),
+                           'category_risks': columns['category_risks'].tolist(),
+                           'critical_item_sets': columns['critical_item_sets'],
+                           'critical_items': columns['critical_items'].tolist()})
+
+    _, endpoint_single_s = timed(single_records)
+    _, endpoint_records_s = timed(batch_records)
+    body, endpoint_columns_s = timed(batch_columns)
+    decoded = json.loads(body)
+    mismatches = sum(s['risk_score'] != r or sorted(s['critical_items']) != sorted(decoded['critical_item_sets'][c])
+                     for s, r, c in zip(single, decoded['risk_scores'], decoded['critical_items']))
+    print(f"\nendpoint work (score + JSON body), {mismatches} mismatches in the columnar body")
+    for label, seconds in (('calculate_risk loop, records', endpoint_single_s),
+                           ('batch, format=records', endpoint_records_s),
+                           ('batch, format=columns', endpoint_columns_s)):
+        print(f"{label:28} {seconds:8.3f} s {args.apps / seconds:12.0f} apps/s "
+              f"{endpoint_single_s / seconds:6.1f}x")
+    best = max(single_s / arrays_s, endpoint_single_s / endpoint_columns_s)
+    print(f"\n50x target: {'met' if best >= 50 else 'NOT met'} (best {best:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Per-call latency of RiskCalculator.calculate_risk for 10, 100 and 500 permissions.
+
+The legacy implementation (per-permission prefix loop, nested category
+scan and DEBUG prints, sent to /dev/null here) is reproduced below as
+the baseline, and every output is checked to be byte-identical.
+
+Usage: python benchmarks/bench_risk_calculator.py [--calls N]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import timeit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.risk_calculator import (  # noqa: E402
+    DANGEROUS_PERMISSIONS, PERMISSION_PREFIXES, RiskCalculator
+)
+
+
+class LegacyRiskCalculator(RiskCalculator):
+    """calculate_risk as it was before the compiled scoring tables."""
+
+    def calculate_risk(self, permissions, policy_text=None):
+        print("=== calculate_risk CALLED ===")
+        return {
+            'risk_score': round(self._legacy_permission_risk(permissions), 2),
+            'categories': self._legacy_category_risks(permissions),
+            'critical_items': self._legacy_critical_items(permissions),
+            'permissions': self._legacy_format_permissions(permissions)
+        }
+
+    def _legacy_normalize(self, perm):
+        for prefix in PERMISSION_PREFIXES:
+            if perm.startswith(prefix):
+                return perm[len(prefix):]
+        return perm
+
+    def _legacy_permission_risk(self, permissions):
+        total_weight = 0
+        max_possible_weight = sum(self.dangerous_permissions.values())
+        print(f"DEBUG: max_possible_weight = {max_possible_weight}")
+        print(f"DEBUG: dangerous_permissions keys = {list(self.dangerous_permissions.keys())}")
+        for perm in permissions:
+            norm_perm = self._legacy_normalize(perm)
+            print(f"DEBUG: {perm} -> {norm_perm}")
+            if norm_perm in self.dangerous_permissions:
+                weight = self.dangerous_permissions[norm_perm]
+                total_weight += weight
+                print(f"DEBUG: MATCHED! {norm_perm} has weight {weight}")
+            else:
+                print(f"DEBUG: NO MATCH for {norm_perm}")
+        print(f"DEBUG: total_weight = {total_weight}")
+        result = (total_weight / max_possible_weight) * 10 if max_possible_weight > 0 else 0
+        print(f"DEBUG: final risk score = {result}")
+        return result
+
+    def _legacy_category_risks(self, permissions):
+        category_risks = {}
+        for category, perms in self.permission_categories.items():
+            category_weight = 0
+            for perm in perms:
+                for p in permissions:
+                    norm_p = self._legacy_normalize(p)
+                    if norm_p == perm and norm_p in self.dangerous_permissions:
+                        category_weight += self.dangerous_permissions[norm_p]
+            max_category_weight = sum(self.dangerous_permissions.get(p, 0) for p in perms)
+            if max_category_weight > 0:
+                category_risks[category] = round((category_weight / max_category_weight) * 10, 2)
+            else:
+                category_risks[category] = 0
+        return category_risks
+
+    def _legacy_critical_items(self, permissions):
+        critical_items = []
+        perms_norm = set(self._legacy_normalize(p) for p in permissions)
+        if all(p in perms_norm for p in ['READ_SMS', 'RECEIVE_SMS']):
+            critical_items.append("App can read and receive SMS messages")
+        if all(p in perms_norm for p in ['ACCESS_FINE_LOCATION', 'ACCESS_COARSE_LOCATION']):
+            critical_items.append("App has access to precise location data")
+        if all(p in perms_norm for p in ['CAMERA', 'RECORD_AUDIO']):
+            critical_items.append("App can access camera and record audio")
+        for perm in perms_norm:
+            if perm in self.dangerous_permissions and self.dangerous_permissions[perm] >= 1.0:
+                critical_items.append(f"App requests {perm.replace('_', ' ').lower()} permission")
+        return critical_items
+
+    def _legacy_format_permissions(self, permissions):
+        formatted_permissions = []
+        for perm in permissions:
+            norm_perm = self._legacy_normalize(perm)
+            risk = self.dangerous_permissions.get(norm_perm, 0)
+            formatted_permissions.append({
+                'name': perm,
+                'description': self._get_permission_description(norm_perm),
+                'risk': risk * 10,
+                'enabled': True,
+                'remediation': self._get_remediation_suggestion(norm_perm)
+            })
+        return formatted_permissions
+
+
+def make_permissions(count, rng):
+    names = list(DANGEROUS_PERMISSIONS) + ['SEND_SMS', 'WRITE_CONTACTS', 'BIND_JOB_SERVICE', 'C2D_MESSAGE']
+    prefixes = PERMISSION_PREFIXES + ['com.example.app.permission.']
+    return [rng.choice(prefixes) + rng.choice(names) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    legacy, compiled = LegacyRiskCalculator(), RiskCalculator()
+    print(f"{'permissions':>12} {'legacy us':>12} {'compiled us':>12} {'speedup':>8}")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        rows = []
+        for count in (10, 100, 500):
+            permissions = make_permissions(count, rng)
+            assert json.dumps(legacy.calculate_risk(permissions)) == \
+                json.dumps(compiled.calculate_risk(permissions)), 'outputs differ'
+            legacy_s = min(timeit.repeat(lambda: legacy.calculate_risk(permissions), number=args.calls, repeat=3))
+            compiled_s = min(timeit.repeat(lambda: compiled.calculate_risk(permissions), number=args.calls, repeat=3))
+            rows.append((count, legacy_s / args.calls * 1e6, compiled_s / args.calls * 1e6))
+    for count, legacy_us, compiled_us in rows:
+        print(f"{count:>12} {legacy_us:12.1f} {compiled_us:12.1f} {legacy_us / compiled_us:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
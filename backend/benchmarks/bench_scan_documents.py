@@ -0,0 +1,128 @@
+"""
+Measure /results and /download-report document lookups with ScanDocumentCache.
+
+--scans compact scan documents are stored in mongomock behind a stand-in
+that adds --rtt-ms per Mongo call. --requests lookups then follow a
+polling pattern (80% of lookups poll the 50 newest scans, the rest
+re-download any scan) and are served three ways:
+
+  uncached   AppScan.get_scan_by_id on every request, as the routes did
+  memory     one ScanDocumentCache with a --cache-size entry LRU
+  worker 1/2 two caches sharing a SQLite disk tier, as two workers on one
+             host: the second one loads almost nothing from Mongo
+
+Reported: lookups/s, Mongo calls, hit ratio and cached bytes from
+stats(). Cached documents must equal the uncached ones.
+
+Usage: python benchmarks/bench_scan_documents.py [--scans N] [--requests N] [--cache-size N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+class SlowCollection:
+    """A collection whose every call costs one network round trip."""
+
+    def __init__(self, collection, rtt):
+        self.collection = collection
+        self.rtt = rtt
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def find_one(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.rtt)
+        return self.collection.find_one(*args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--cache-size', type=int, default=512)
+    parser.add_argument('--rtt-ms', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import mongomock
+    from app import permission_dictionary
+    from app.models.app_scan import AppScan
+    from app.services.risk_calculator import DANGEROUS_PERMISSIONS, RiskCalculator
+    from app.services.scan_documents import ScanDocumentCache
+    from app.utils.lru import LRUCache
+
+    rng = random.Random(args.seed)
+    calculator = RiskCalculator()
+    names = [f'android.permission.{p}' for p in DANGEROUS_PERMISSIONS]
+    db = mongomock.MongoClient().consent_engine_bench
+    docs = []
+    for i in range(args.scans):
+        result = calculator.calculate_risk(rng.sample(names, rng.randint(3, len(names))))
+        ids, risks = permission_dictionary.compact(result['permissions'])
+        docs.append({
+            'user_id': f'user{i % 100}', 'app_name': f'com.example.app{i}.apk',
+            'risk_score': result['risk_score'], 'permission_ids': ids, 'permission_risks': risks,
+            'dictionary_version': permission_dictionary.version, 'categories': result['categories'],
+            'critical_items': result['critical_items'], 'timestamp': datetime.utcnow()
+        })
+    db.scans.insert_many(docs)
+    scan_ids = [str(doc['_id']) for doc in docs]
+    # 80% polls of the 50 newest scans, 20% re-downloads from the whole history
+    recent = scan_ids[-50:]
+    requests = [rng.choice(recent) if rng.random() < 0.8 else rng.choice(scan_ids) for _ in range(args.requests)]
+    print(f"{args.scans} scans, {len(requests)} lookups ({len(set(requests))} distinct), "
+          f"{args.rtt_ms} ms per Mongo call\n")
+
+    def stand_in():
+        return SimpleNamespace(db=SimpleNamespace(scans=SlowCollection(db.scans, args.rtt_ms / 1000)))
+
+    def run(label, lookup, mongo):
+        start = time.perf_counter()
+        documents = [lookup(scan_id) for scan_id in requests]
+        seconds = time.perf_counter() - start
+        print(f"{label:10} {len(requests) / seconds:9.0f} lookups/s  {mongo.db.scans.calls:6d} Mongo calls", end='')
+        return documents
+
+    mongo = stand_in()
+    model = AppScan(mongo)
+    expected = run('uncached', model.get_scan_by_id, mongo)
+    print()
+
+    def cache(mongo, path=None):
+        scan_documents = ScanDocumentCache(mongo)
+        scan_documents.memory = LRUCache(args.cache_size)
+        scan_documents.path = path
+        return scan_documents
+
+    mongo = stand_in()
+    memory = cache(mongo)
+    actual = run('memory', lambda scan_id: memory.get(scan_id)[0], mongo)
+    stats = memory.stats()
+    print(f"  hit ratio {stats['hit_ratio']:.3f}, {stats['memory']['entries']} docs / "
+          f"{stats['memory']['bytes'] / 1024:.0f} KiB cached, identical: {actual == expected}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'scan_documents.sqlite3')
+        first_mongo, second_mongo = stand_in(), stand_in()
+        first, second = cache(first_mongo, path), cache(second_mongo, path)
+        run('worker 1', lambda scan_id: first.get(scan_id)[0], first_mongo)
+        print(f"  hit ratio {first.stats()['hit_ratio']:.3f}")
+        actual = run('worker 2', lambda scan_id: second.get(scan_id)[0], second_mongo)
+        stats = second.stats()
+        print(f"  hit ratio {stats['hit_ratio']:.3f} ({stats['disk']['hits']} from the shared disk tier), "
+              f"identical: {actual == expected}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Measure GET /api/user/scans paging for light and very heavy users.
+
+Seeds a scans collection shaped like AppScan.log_scan writes: one user
+with --scans scans and --users users with --light-scans each. Pages of
+--limit scans are then read at several depths of the heavy user's
+history, both with the keyset query behind the endpoint
+(AppScan.history) and with the skip/limit offset paging it replaces,
+and p50/p99 latency is reported per depth. Keyset pages must equal the
+offset pages.
+
+The default backend is mongomock, which has no query planner: it filters
+every document on each query, so absolute times there reflect collection
+size. With --mongo-uri pointing at a scratch database on a real mongod,
+explain() also reports keys and documents examined for the deepest page;
+a covered keyset page examines limit + 1 keys and no documents.
+
+Usage: python benchmarks/bench_scan_history.py [--scans N] [--mongo-uri URI]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PERMISSIONS = ['android.permission.INTERNET', 'android.permission.CAMERA', 'android.permission.READ_CONTACTS',
+               'android.permission.ACCESS_FINE_LOCATION', 'android.permission.RECORD_AUDIO',
+               'android.permission.READ_SMS', 'android.permission.WRITE_EXTERNAL_STORAGE']
+
+
+def scan_docs(user_id, count, rng, start):
+    when = start
+    for i in range(count):
+        when += timedelta(seconds=rng.choice([0, 1, 1, 2, 30]))  # Some scans share a timestamp
+        yield {
+            'user_id': user_id,
+            'app_name': f'com.example.app{rng.randrange(5000)}.apk',
+            'risk_score': round(rng.uniform(0, 10), 2),
+            'permissions': rng.sample(PERMISSIONS, rng.randint(1, len(PERMISSIONS))),
+            'categories': {'privacy': rng.randint(0, 5), 'security': rng.randint(0, 5)},
+            'critical_items': [],
+            'timestamp': when
+        }
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def timed(fn, samples):
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, percentile(times, 50), percentile(times, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scans', type=int, default=100000, help='scans of the heavy user')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--light-scans', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--mongo-uri', help='scratch database on a real mongod (dropped and reseeded)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app.models.app_scan import AppScan, HISTORY_FIELDS, encode_history_cursor
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+        db = client.get_default_database()
+    else:
+        import mongomock
+        db = mongomock.MongoClient().consent_engine_bench
+    db.scans.drop()
+    model = AppScan(SimpleNamespace(db=db))
+    model.ensure_indexes()
+
+    rng = random.Random(args.seed)
+    start = datetime(2025, 1, 1)
+    seed_start = time.perf_counter()
+    db.scans.insert_many(scan_docs('heavy', args.scans, rng, start))
+    for u in range(args.users):
+        db.scans.insert_many(scan_docs(f'light{u}', args.light_scans, rng, start))
+    print(f"seeded {db.scans.count_documents({})} scans in {time.perf_counter() - seed_start:.1f} s "
+          f"({'mongod' if args.mongo_uri else 'mongomock'})\n")
+
+    # Page boundaries of the heavy user's history, to start keyset pages at any depth
+    ordered = list(db.scans.find({'user_id': 'heavy'}, {'timestamp': 1}).sort([('timestamp', -1), ('_id', -1)]))
+
+    _, p50, p99 = timed(lambda: model.history('light0', args.limit), args.samples)
+    print(f"light user, first page: p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+    print(f"\nheavy user ({args.scans} scans), {args.limit} per page:")
+    print(f"{'depth':>8}  {'keyset p50':>10} {'p99':>8}  {'offset p50':>10} {'p99':>8}  same")
+    deepest_cursor = None
+    for fraction in (0, 0.25, 0.5, 0.75, 0.999):
+        offset = min(int(args.scans * fraction), max(args.scans - args.limit, 0))
+        cursor = encode_history_cursor(ordered[offset - 1]) if offset else None
+        deepest_cursor = cursor
+        (keyset, _), k50, k99 = timed(lambda: model.history('heavy', args.limit, cursor), args.samples)
+        offset_page, o50, o99 = timed(lambda: list(
+            db.scans.find({'user_id': 'heavy'}, HISTORY_FIELDS).sort([('timestamp', -1), ('_id', -1)])
+            .skip(offset).limit(args.limit)), args.samples)
+        print(f"{offset:>8}  {k50:>8.1f}ms {k99:>6.1f}ms  {o50:>8.1f}ms {o99:>6.1f}ms  {keyset == offset_page}")
+
+    if args.mongo_uri:
+        from app.models.app_scan import HISTORY_INDEX_NAME, decode_history_cursor
+        timestamp, scan_id = decode_history_cursor(deepest_cursor)
+        query = {'user_id': 'heavy', '$or': [{'timestamp': {'$lt': timestamp}},
+                                             {'timestamp': timestamp, '_id': {'$lt': scan_id}}]}
+        stats = (db.scans.find(query, HISTORY_FIELDS).sort([('timestamp', -1), ('_id', -1)])
+                 .hint(HISTORY_INDEX_NAME).limit(args.limit + 1).explain()['executionStats'])
+        print(f"\ndeepest keyset page: {stats['totalKeysExamined']} keys, "
+              f"{stats['totalDocsExamined']} documents examined")
+        db.scans.drop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Measure scan logging through ScanLogWriter against direct insert_one calls.
+
+--threads request threads each log --scans scan documents shaped like
+AppScan.log_scan writes, as during a burst of uploads. Each Mongo call
+costs --rtt-ms of round-trip time on top of mongomock (or runs against a
+real mongod with --mongo-uri). Reported per mode: time spent inside the
+logging call per scan (p50/p99), total throughput and Mongo calls made;
+every scan must be stored exactly once under the id returned to its
+caller.
+
+Three more checks:
+  namespaces    scans logged through separate AppScan(mongo) instances,
+                each holding its own Collection object as pymongo hands
+                out, still share one insert_many
+  backpressure  a queue of --queue-size with a slow store; callers block,
+                then fall back to direct writes, and no scan is lost
+  exit flush    a child process logs scans and exits without flushing;
+                the atexit hook still writes all of them
+
+Usage: python benchmarks/bench_scan_log_writer.py [--threads T] [--scans N] [--rtt-ms MS]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+class SlowCollection:
+    """A collection whose every call costs one network round trip."""
+
+    def __init__(self, collection, rtt):
+        self.collection = collection
+        self.rtt = rtt
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _round_trip(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.rtt)
+
+    def insert_one(self, doc):
+        self._round_trip()
+        return self.collection.insert_one(doc)
+
+    def insert_many(self, docs, ordered=True):
+        self._round_trip()
+        return self.collection.insert_many(docs, ordered=ordered)
+
+
+class FreshCollections:
+    """A ``mongo`` whose ``db.scans`` is a new Collection object on every access, as with pymongo."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.batches = []
+        self.db = self
+
+    @property
+    def scans(self):
+        owner = self
+
+        class Collection:
+            full_name = owner.collection.full_name
+
+            def insert_many(self, docs, ordered=True):
+                owner.batches.append(len(docs))
+                return owner.collection.insert_many(docs, ordered=ordered)
+
+            def find_one(self, *args, **kwargs):
+                return owner.collection.find_one(*args, **kwargs)
+
+        return Collection()
+
+
+def scan_doc(thread, i):
+    return {
+        'user_id': f'user{thread}',
+        'app_name': f'com.example.app{i}.apk',
+        'risk_score': 5.0,
+        'permission_ids': ['android.permission.INTERNET', 'android.permission.CAMERA'],
+        'permission_risks': [7.0, 10.0],
+        'dictionary_version': 'bench',
+        'categories': {'Media': 5.0},
+        'critical_items': [],
+        'timestamp': datetime.utcnow()
+    }
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def burst(log, threads, scans):
+    """Run ``threads`` callers logging ``scans`` each; returns (ids, call latencies, seconds)."""
+    ids = []
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(t):
+        mine, times = [], []
+        for i in range(scans):
+            doc = scan_doc(t, i)
+            start = time.perf_counter()
+            mine.append(log(doc))
+            times.append((time.perf_counter() - start) * 1000)
+        with lock:
+            ids.extend(mine)
+            latencies.extend(times)
+
+    workers = [threading.Thread(target=caller, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return ids, latencies, time.perf_counter() - start
+
+
+def new_collection(args, name):
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        collection = MongoClient(args.mongo_uri).get_default_database()[name]
+    else:
+        import mongomock
+        collection = mongomock.MongoClient().consent_engine_bench[name]
+    collection.drop()
+    return collection
+
+
+def check(collection, ids):
+    stored = [doc['_id'] for doc in collection.find({}, {'_id': 1})]
+    return len(stored) == len(ids) and set(stored) == set(ids)
+
+
+def exit_flush_child(path, scans):
+    """Child process: log scans into a file-backed store, then exit without flushing."""
+    from app.services.scan_log_writer import ScanLogWriter
+
+    class FileCollection:
+        def insert_many(self, docs, ordered=True):
+            with open(path, 'a') as f:
+                for doc in docs:
+                    f.write(str(doc['_id']) + '\n')
+
+    writer = ScanLogWriter()
+    writer.flush_interval = 5  # Longer than the child lives, so only the exit hook can write
+    collection = FileCollection()
+    print(json.dumps([str(writer.submit(collection, scan_doc(0, i))) for i in range(scans)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--scans', type=int, default=200, help='scans logged per thread')
+    parser.add_argument('--rtt-ms', type=float, default=2.0)
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--mongo-uri', help='scratch database on a real mongod (rtt is then not simulated)')
+    parser.add_argument('--exit-flush-child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.exit_flush_child:
+        exit_flush_child(args.exit_flush_child, args.scans)
+        return
+
+    from app.services.scan_log_writer import ScanLogWriter
+
+    rtt = 0 if args.mongo_uri else args.rtt_ms / 1000
+    total = args.threads * args.scans
+    print(f"{args.threads} threads x {args.scans} scans, "
+          f"{'real mongod' if args.mongo_uri else f'mongomock + {args.rtt_ms} ms round trip'}\n")
+
+    direct = SlowCollection(new_collection(args, 'scans_direct'), rtt)
+    ids, latencies, seconds = burst(lambda doc: direct.insert_one(doc).inserted_id, args.threads, args.scans)
+    print(f"insert_one  p50 {percentile(latencies, 50):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms  "
+          f"{total / seconds:7.0f} scans/s  {direct.calls} Mongo calls  stored once: {check(direct.collection, ids)}")
+
+    buffered = SlowCollection(new_collection(args, 'scans_buffered'), rtt)
+    writer = ScanLogWriter()
+    ids, latencies, seconds = burst(lambda doc: writer.submit(buffered, doc), args.threads, args.scans)
+    start = time.perf_counter()
+    writer.flush()
+    seconds_flushed = seconds + time.perf_counter() - start
+    stats = writer.stats()
+    print(f"writer      p50 {percentile(latencies, 50):6.2f} ms  p99 {percentile(latencies, 99):6.2f} ms  "
+          f"{total / seconds_flushed:7.0f} scans/s  {buffered.calls} Mongo calls  "
+          f"stored once: {check(buffered.collection, ids)} ({stats['batches']} batches)")
+    writer.close()
+
+    from app.models.app_scan import AppScan
+    from app.services.scan_log_writer import scan_log_writer
+    mongo = FreshCollections(new_collection(args, 'scans_namespaces'))
+    scan_log_writer.flush_interval = 5  # Only the explicit flush below ends the batch
+    ids = [AppScan(mongo).log_scan(f'user{i}', f'com.example.app{i}.apk', 5.0, [], {}, []) for i in range(args.scans)]
+    scan_log_writer.flush()
+    print(f"\nnamespaces    {len(ids)} scans through {len(ids)} AppScan instances: "
+          f"{len(mongo.batches)} insert_many call(s) of {mongo.batches}, "
+          f"stored once: {check(mongo.collection, ids)}")
+    scan_log_writer.close()
+
+    slow = SlowCollection(new_collection(args, 'scans_backpressure'), max(rtt, 0.005) * 20)
+    writer = ScanLogWriter()
+    writer.queue_size = args.queue_size
+    writer.batch_size = 16
+    writer.enqueue_timeout = 0.05
+    ids, latencies, seconds = burst(lambda doc: writer.submit(slow, doc), args.threads, args.scans // 4)
+    writer.flush()
+    stats = writer.stats()
+    print(f"backpressure  queue {args.queue_size}, {slow.rtt * 1000:.0f} ms per call: "
+          f"p99 {percentile(latencies, 99):.0f} ms per log call, {stats['direct_writes']} direct writes, "
+          f"stored once: {check(slow.collection, ids)}")
+    writer.close()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'written.txt')
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--exit-flush-child', path,
+                                 '--scans', str(args.scans)], capture_output=True, text=True, check=True).stdout
+        submitted = json.loads(output.strip().splitlines()[-1])
+        with open(path) as f:
+            written = f.read().split()
+        print(f"exit flush    child returned {len(submitted)} ids and exited; "
+              f"written by the exit hook: {len(written)}, ids match: {sorted(written) == sorted(submitted)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports the app package and every blueprint in a fresh interpreter under
+``python -X importtime`` and records wall time, peak RSS and the slowest
+imports. The run fails (exit status 1) if a heavy ML dependency is
+imported at startup or if import time / RSS regress past the checked-in
+baseline by more than the allowed tolerance.
+
+Usage:
+  python benchmarks/bench_startup.py                   # compare with baseline
+  python benchmarks/bench_startup.py --write-baseline  # record a new baseline
+  python benchmarks/bench_startup.py --with-app        # also time create_app() (needs MongoDB)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+# Modules that must only be imported when a model is first used
+HEAVY_MODULES = ('torch', 'transformers', 'androguard', 'sklearn', 'xgboost')
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app, app.routes.auth, app.routes.scan, app.routes.user, app.routes.health
+imported_ms = (time.perf_counter() - start) * 1000
+app_ms = None
+if {with_app}:
+    start = time.perf_counter()
+    app.create_app()
+    app_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    'import_ms': imported_ms,
+    'create_app_ms': app_ms,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': sorted(m for m in sys.modules if m.split('.')[0] in {heavy!r})
+}}))
+"""
+
+
+def probe(with_app):
+    code = PROBE.format(with_app=with_app, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND_DIR,
+                          capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        imports.append((int(cumulative_us), int(self_us), name.rstrip()))
+    result['slowest'] = [{'module': name.strip(), 'cumulative_ms': cum / 1000, 'self_ms': own / 1000}
+                         for cum, own, name in sorted(imports, reverse=True)[:15]]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative regression')
+    parser.add_argument('--with-app', action='store_true')
+    parser.add_argument('--write-baseline', action='store_true')
+    args = parser.parse_args()
+
+    runs = [probe(args.with_app) for _ in range(args.runs)]
+    summary = {
+        'import_ms': round(statistics.median(r['import_ms'] for r in runs), 1),
+        'peak_rss_mb': round(statistics.median(r['peak_rss_mb'] for r in runs), 1),
+    }
+    if args.with_app:
+        summary['create_app_ms'] = round(statistics.median(r['create_app_ms'] for r in runs), 1)
+
+    print(f"import: {summary['import_ms']} ms, peak RSS: {summary['peak_rss_mb']} MB")
+    if 'create_app_ms' in summary:
+        print(f"create_app: {summary['create_app_ms']} ms")
+    print("slowest imports (cumulative ms / self ms):")
+    for entry in runs[-1]['slowest']:
+        print(f"  {entry['cumulative_ms']:9.1f} {entry['self_ms']:9.1f}  {entry['module']}")
+
+    failures = []
+    if runs[-1]['heavy_modules']:
+        failures.append(f"heavy modules imported at startup: {', '.join(runs[-1]['heavy_modules'][:10])}")
+
+    if args.write_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(summary, f, indent=2)
+            f.write('\n')
+        print(f"baseline written to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        for key in ('import_ms', 'peak_rss_mb'):
+            limit = baseline[key] * (1 + args.tolerance)
+            if summary[key] > limit:
+                failures.append(f"{key} {summary[key]} exceeds baseline {baseline[key]} (+{args.tolerance:.0%})")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
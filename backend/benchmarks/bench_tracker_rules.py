@@ -0,0 +1,150 @@
+"""
+Measure tracker matching cost as the ruleset grows.
+
+Synthetic rulesets of increasing size each get one domain and one inline
+pattern per rule, plus the real rules from app/data/tracker_rules.json. A
+fixed page (HTML source fed in 64 KiB pieces, plus its script/iframe/image
+URLs) is matched two ways:
+
+  naive      every pattern tested with ``in`` and every domain compared with
+             each URL host, the way the two hard-coded checks would scale
+  compiled   TrackerRuleset: host suffixes looked up in a dict and all
+             patterns found by one MultiPatternMatcher pass
+
+Both must report the same rules. Finally a TrackerDatabase is pointed at a
+ruleset file that is edited on disk, to show a new rule being picked up
+without a restart.
+
+Usage: python benchmarks/bench_tracker_rules.py [--sizes 100,1000,10000] [--page-kb 500]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CHUNK = 64 * 1024
+
+
+def random_word(rng, low=5, high=12):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def synthetic_rules(count, rng):
+    return [{
+        'id': f'synthetic-{i}',
+        'name': f'Synthetic tracker {i}',
+        'domains': [f'{random_word(rng)}.{rng.choice(["com", "net", "io"])}'],
+        'patterns': [f'{random_word(rng)}.track(']
+    } for i in range(count)]
+
+
+def make_page(size_kb, rng, rules):
+    """HTML with ordinary markup, some real tracker tags and a few synthetic hits."""
+    urls = [f'https://cdn{i}.example.com/app.js' for i in range(20)]
+    urls += ['https://www.googletagmanager.com/gtag/js?id=G-1', 'https://connect.facebook.net/en_US/fbevents.js',
+             'https://static.hotjar.com/c/hotjar-1.js', 'https://px.ads.linkedin.com/collect']
+    hits = rng.sample(rules, min(10, len(rules)))
+    urls += [f"https://sub.{rule['domains'][0]}/t.js" for rule in hits[:5]]
+    inline = [rule['patterns'][0] + '"x")' for rule in hits[5:]] + ["fbq('init', '1');", "_paq.push(['trackPageView']);"]
+    filler = '<div class="row"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>'
+    parts = ['<html><head>'] + [f'<script src="{url}"></script>' for url in urls] + ['</head><body>']
+    length = sum(map(len, parts))
+    while length < size_kb * 1024:
+        parts.append(filler)
+        length += len(filler)
+    parts.insert(len(parts) // 2, '<script>' + ' '.join(inline) + '</script>')
+    parts.append('</body></html>')
+    return ''.join(parts), urls
+
+
+def naive_match(rules, text, urls):
+    hosts = [urlsplit(url).hostname for url in urls]
+    matched = set()
+    for index, rule in enumerate(rules):
+        if any(p in text for p in rule.get('patterns', ())):
+            matched.add(index)
+        elif any(host == d or host.endswith('.' + d) for d in rule.get('domains', ()) for host in hosts):
+            matched.add(index)
+    return matched
+
+
+def compiled_match(ruleset, text, urls):
+    scan = ruleset.scan()
+    for offset in range(0, len(text), CHUNK):
+        scan.feed(text[offset:offset + CHUNK])
+    for url in urls:
+        scan.add_url(url)
+    return scan.matched
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--page-kb', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app.utils.tracker_rules import DEFAULT_RULES_PATH, TrackerDatabase, TrackerRuleset
+
+    rng = random.Random(args.seed)
+    with open(DEFAULT_RULES_PATH, encoding='utf-8') as f:
+        real_rules = json.load(f)['rules']
+    sizes = [int(s) for s in args.sizes.split(',')]
+    all_synthetic = synthetic_rules(max(sizes), rng)
+    text, urls = make_page(args.page_kb, rng, all_synthetic[:min(sizes)])
+
+    print(f"page: {len(text) / 1024:.0f} KB source, {len(urls)} resource URLs\n")
+    print(f"{'rules':>7}  {'compile s':>9}  {'naive ms':>9}  {'compiled ms':>11}  {'speedup':>7}  {'matched':>7}  identical")
+    for size in sizes:
+        rules = real_rules + all_synthetic[:size]
+        start = time.perf_counter()
+        ruleset = TrackerRuleset(rules)
+        compile_s = time.perf_counter() - start
+        expected, naive_s = timed(lambda: naive_match(rules, text, urls))
+        actual, compiled_s = timed(lambda: compiled_match(ruleset, text, urls))
+        print(f"{len(rules):>7}  {compile_s:>9.2f}  {naive_s * 1000:>9.1f}  {compiled_s * 1000:>11.1f}  "
+              f"{naive_s / compiled_s:>6.1f}x  {len(actual):>7}  {actual == expected}")
+
+    temp_dir = tempfile.mkdtemp(prefix='bench_tracker_rules_')
+    try:
+        path = os.path.join(temp_dir, 'rules.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': '1', 'rules': real_rules}, f)
+        db = TrackerDatabase(path, check_interval=0)
+        scan = db.current().scan()
+        scan.feed('<script>acme.beacon("x")</script>')
+        before = [rule.name for rule in scan.rules]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': '2', 'rules': real_rules + [
+                {'id': 'acme', 'name': 'Acme Beacon', 'patterns': ['acme.beacon(']}]}, f)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        scan = db.current().scan()
+        scan.feed('<script>acme.beacon("x")</script>')
+        db.record(scan.rules)
+        print(f"\nhot reload: before edit {before}, after edit {[rule.name for rule in scan.rules]} "
+              f"(version {db.current().version}); hits {db.stats()['hits']}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Compare the original /analyze-url view logic with UrlRiskEngine.
+
+Synthetic log URLs mix hosts (ordinary sites, shorteners, blacklisted and
+suspicious-TLD domains, subdomain chains, userinfo tricks), paths, queries
+and file extensions. Both engines classify every URL; the output must be
+identical except where the legacy substring checks matched a shortener or
+blacklisted domain inside an unrelated host (``t.co`` in ``microsoft.com``)
+or ignored the host because of a port or userinfo, which the engine's
+host-suffix matching fixes. Those differences are counted separately.
+Finally the engine is rebuilt with a --blacklist-size domain blacklist to
+show that lookups do not slow down as the lists grow.
+
+Usage: python benchmarks/bench_url_risk.py [--urls N] [--blacklist-size N]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+HOSTS = ['example.com', 'www.google.com', 'microsoft.com', 'bit.ly', 'tinyurl.com', 'accounts.paypal.com',
+         'secure-login.tk', 'shop.example.xyz', 'malware.test', 'cdn.badsite.com', 'a.b.c.example.org',
+         'news.example.co.uk', 'xn--pypal-4ve.com', 'sub.t.co', 'bank.ru', 'docs.example.info', 'ebay.com']
+
+
+def legacy_analyze(url):
+    """The original analyze_url view body (parsing through result dict)."""
+    import re
+    from urllib.parse import urlparse
+    import math
+
+    SUSPICIOUS_KEYWORDS = [
+        'login', 'secure', 'update', 'verify', 'account', 'bank', 'confirm', 'signin', 'wp-admin', 'reset', 'pay', 'ebay', 'paypal', 'webscr', 'password', 'token', 'auth', 'shell', 'cmd', 'upload', 'admin'
+    ]
+    SUSPICIOUS_TLDS = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.work', '.support', '.info', '.ru', '.cn']
+    SHORTENERS = ['bit.ly', 'goo.gl', 'tinyurl.com', 't.co', 'ow.ly', 'is.gd', 'buff.ly', 'adf.ly', 'bit.do', 'cutt.ly']
+    BLACKLISTED_DOMAINS = ['malware.test', 'phishing.test', 'badsite.com', 'examplebad.com']
+    OBFUSCATION_PATTERNS = ['%2e', '%2f', '%5c', '@', 'xn--']
+    RISKY_EXTENSIONS = ['.exe', '.scr', '.zip', '.js', '.php', '.bat', '.cmd', '.jar', '.vbs', '.ps1']
+
+    def calculate_entropy(s):
+        prob = [float(s.count(c)) / len(s) for c in set(s)]
+        return - sum([p * math.log2(p) for p in prob])
+
+    try:
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        path = parsed.path.lower()
+        query = parsed.query.lower()
+    except Exception:
+        return {'url': url, 'error': 'Invalid URL'}
+
+    risk_score = 1.0
+    risk_level = 'low'
+    details = []
+    if not url.lower().startswith('https://'):
+        risk_score += 3
+        details.append('URL is not using HTTPS')
+    for keyword in SUSPICIOUS_KEYWORDS:
+        if keyword in url.lower():
+            risk_score += 2
+            details.append(f"Suspicious keyword detected: '{keyword}'")
+            break
+    if len(url) < 15:
+        risk_score += 1
+        details.append('URL is very short (suspicious)')
+    elif len(url) > 60:
+        risk_score += 1
+        details.append('URL is very long (possible obfuscation)')
+    for tld in SUSPICIOUS_TLDS:
+        if domain.endswith(tld):
+            risk_score += 2
+            details.append(f"Suspicious TLD detected: {tld}")
+            break
+    for shortener in SHORTENERS:
+        if shortener in domain:
+            risk_score += 2
+            details.append(f"URL uses shortening service: {shortener}")
+            break
+    for bad in BLACKLISTED_DOMAINS:
+        if bad in domain:
+            risk_score += 5
+            details.append("Domain is in blacklist")
+            break
+    if any(p in url.lower() for p in OBFUSCATION_PATTERNS):
+        risk_score += 2
+        details.append('URL appears obfuscated')
+    if re.search(r'\.\w+\.\w+\.', domain):
+        risk_score += 1
+        details.append('Domain may contain deceptive multiple subdomains')
+    if any(url.lower().endswith(ext) for ext in RISKY_EXTENSIONS):
+        risk_score += 3
+        details.append(f"URL ends with risky file type")
+    if 'password' in query or 'token' in query or 'auth' in query:
+        risk_score += 3
+        details.append('URL query contains possible credentials')
+    if any(x in path for x in ['admin', 'upload', 'shell', 'cmd']):
+        risk_score += 2
+        details.append('Suspicious path segment detected')
+    entropy = calculate_entropy(url)
+    if entropy > 4.5:
+        risk_score += 1
+        details.append(f"High URL entropy ({round(entropy, 2)}) indicates obfuscation")
+    if risk_score >= 8:
+        risk_level = 'high'
+    elif risk_score >= 4:
+        risk_level = 'medium'
+    return {
+        'url': url,
+        'domain': domain,
+        'risk_score': round(risk_score, 2),
+        'risk_level': risk_level,
+        'details': details or ['No major risks detected']
+    }
+
+
+def make_url(rng):
+    host = rng.choice(HOSTS)
+    if rng.random() < 0.05:
+        host = f'user@{host}'
+    if rng.random() < 0.05:
+        host = f'{host}:8080'
+    words = ['index', 'login', 'products', 'upload', 'api', 'v1', 'static', 'wp-admin', 'account', 'reset']
+    path = '/'.join(rng.choice(words) for _ in range(rng.randint(0, 4)))
+    if rng.random() < 0.2:
+        path += rng.choice(['.php', '.js', '.exe', '.html', '.zip'])
+    url = f"{rng.choice(['http', 'https', 'https'])}://{host}/{path}"
+    if rng.random() < 0.4:
+        url += '?' + '&'.join(f"{rng.choice(['id', 'q', 'token', 'session', 'ref'])}="
+                              f"{''.join(rng.choice(string.ascii_letters + string.digits + '%') for _ in range(rng.randint(2, 40)))}"
+                              for _ in range(rng.randint(1, 3)))
+    return url
+
+
+def explained(old, new):
+    """True if the outputs differ only in host-based checks that the engine now matches per label."""
+    host_checks = ('Suspicious TLD', 'URL uses shortening', 'Domain is in blacklist')
+    strip = lambda r: [d for d in r['details'] if not d.startswith(host_checks) and d != 'No major risks detected']
+    return strip(old) == strip(new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--urls', type=int, default=100000)
+    parser.add_argument('--blacklist-size', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.url_risk import UrlRiskEngine
+
+    rng = random.Random(args.seed)
+    urls = [make_url(rng) for _ in range(args.urls)]
+
+    start = time.perf_counter()
+    expected = [legacy_analyze(url) for url in urls]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = UrlRiskEngine()
+    compile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    actual = engine.score_many(urls)
+    engine_s = time.perf_counter() - start
+
+    identical = sum(old == new for old, new in zip(expected, actual))
+    host_fixes = [(old, new) for old, new in zip(expected, actual) if old != new and explained(old, new)]
+    other = len(urls) - identical - len(host_fixes)
+    print(f"{len(urls)} URLs")
+    print(f"legacy  {legacy_s:6.2f} s  ({len(urls) / legacy_s:9.0f} URLs/s)")
+    print(f"engine  {engine_s:6.2f} s  ({len(urls) / engine_s:9.0f} URLs/s, {legacy_s / engine_s:.1f}x; "
+          f"compiled once in {compile_ms:.1f} ms)")
+    print(f"identical: {identical}, host-suffix fixes: {len(host_fixes)}, other differences: {other}")
+    for old, new in host_fixes[:3]:
+        print(f"  {old['url'][:60]!r}: legacy {old['risk_score']} -> {new['risk_score']}")
+
+    from app.services.url_risk import BLACKLISTED_DOMAINS
+    blacklist = BLACKLISTED_DOMAINS + [f"{''.join(rng.choice(string.ascii_lowercase) for _ in range(10))}.com"
+                                       for _ in range(args.blacklist_size)]
+    large = UrlRiskEngine(blacklist=blacklist)
+    start = time.perf_counter()
+    large_results = large.score_many(urls)
+    large_s = time.perf_counter() - start
+    print(f"engine with {len(blacklist)} blacklisted domains: {large_s:.2f} s "
+          f"(same results: {large_results == actual})")
+
+
+if __name__ == '__main__':
+    main()
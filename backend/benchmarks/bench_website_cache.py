@@ -0,0 +1,161 @@
+"""
+Measure scheduled website rescans with and without the WebsiteCache.
+
+A local HTTP stand-in serves --sites sites (one 127.0.0.x host each). Every
+page carries an ETag and Last-Modified and answers conditional requests with
+304 Not Modified; the server counts requests and body bytes sent. Four
+monitoring rounds are run, each by an uncached scanner and by a cached one:
+
+  cold        first scan of every site
+  fresh       rescan within WEBSITE_CACHE_TTL: served with no request at all
+  revalidate  rescan after the TTL: conditional requests, pages unchanged
+  changed     rescan after the TTL with --changed percent of sites updated
+
+Cached results must equal the uncached scan of the same round (response
+times aside).
+
+Usage: python benchmarks/bench_website_cache.py [--sites N] [--page-kb K] [--changed PCT]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Every concurrent scan connects at once
+
+
+class StandIn:
+    def __init__(self, page_kb, latency):
+        self.page_kb = page_kb
+        self.latency = latency
+        self.versions = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.modified = formatdate(time.time() - 86400, usegmt=True)
+
+    def page(self, host, version):
+        filler = '<div><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>'
+        body = filler * (self.page_kb * 1024 // len(filler))
+        return (f'<html><head><script src="http://{host}/static/app.js"></script>'
+                f'<script>var gtm = "googletagmanager.com/gtm.js?id=GTM-{version}";</script></head><body>'
+                f'<a href="/privacy">Privacy Policy</a><form></form><p>Release {version}</p>{body}</body></html>')
+
+    def handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(stand_in.latency)
+                host = self.headers.get('Host', '')
+                version = stand_in.versions.get(host.split(':')[0], 1)
+                etag = f'"{host}-v{version}"'
+                headers = {}
+                if self.path == '/':
+                    if self.headers.get('If-None-Match') == etag:
+                        return self.reply(304, b'', {'ETag': etag})
+                    data = stand_in.page(host, version).encode()
+                    headers = {'ETag': etag, 'Last-Modified': stand_in.modified,
+                               'Content-Type': 'text/html; charset=utf-8'}
+                elif self.path == '/robots.txt':
+                    data = b'User-agent: *\nDisallow: /admin\n'
+                elif self.path == '/privacy':
+                    data = ('<html><body>Privacy policy. ' + 'We protect data. ' * 200 + '</body></html>').encode()
+                else:
+                    data = b'console.log("app");' * 100
+                self.reply(200, data, headers)
+
+            def reply(self, status, data, headers):
+                with stand_in.lock:
+                    stand_in.requests += 1
+                    stand_in.bytes_sent += len(data)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                if data:
+                    self.wfile.write(data)
+
+        return Handler
+
+    def counters(self):
+        with self.lock:
+            return self.requests, self.bytes_sent
+
+
+def comparable(results):
+    return [(r['risk_score'], {k: v for k, v in r['features'].items() if k != 'response_time_ms'})
+            for r in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=100)
+    parser.add_argument('--page-kb', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=20, help='ms added to every response')
+    parser.add_argument('--changed', type=float, default=10, help='percent of sites updated before the last round')
+    args = parser.parse_args()
+
+    from app.services.web_fetcher import WebFetcher
+    from app.services.website_cache import WebsiteCache
+    from app.services.website_scanner import WebsiteScanner
+
+    stand_in = StandIn(args.page_kb, args.latency / 1000)
+    server = StandInServer(('0.0.0.0', 0), stand_in.handler())
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sites = min(args.sites, 250)
+    urls = [f"http://127.0.0.{i + 2}:{port}/" for i in range(sites)]
+
+    fetcher = WebFetcher()
+    uncached = WebsiteScanner(None, fetcher=fetcher, max_scripts=2)
+    cache = WebsiteCache(None)
+    cached = WebsiteScanner(None, fetcher=fetcher, max_scripts=2, cache=cache)
+
+    def run(scanner):
+        requests_before, bytes_before = stand_in.counters()
+        wall, cpu = time.perf_counter(), time.process_time()
+        results = scanner.scan_websites(urls, 'bench')
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        requests_after, bytes_after = stand_in.counters()
+        return results, wall, cpu, requests_after - requests_before, bytes_after - bytes_before
+
+    print(f"{sites} sites, {args.page_kb} KB pages, {args.latency:.0f} ms latency\n")
+    print(f"{'round':<11} {'engine':<9} {'wall s':>7} {'cpu s':>6} {'requests':>9} {'MB sent':>8}  cache states")
+    try:
+        for name in ('cold', 'fresh', 'revalidate', 'changed'):
+            if name == 'revalidate':
+                cache.fresh_ttl = 0
+            if name == 'changed':
+                for i in range(int(sites * args.changed / 100)):
+                    stand_in.versions[f'127.0.0.{i + 2}'] = 2
+            expected, *plain = run(uncached)
+            results, *stats = run(cached)
+            states = {}
+            for result in results:
+                states[result['cache']] = states.get(result['cache'], 0) + 1
+            for engine, (wall, cpu, requests, sent) in (('uncached', plain), ('cached', stats)):
+                print(f"{name:<11} {engine:<9} {wall:>7.2f} {cpu:>6.2f} {requests:>9} {sent / 2**20:>8.1f}"
+                      + (f"  {states} identical: {comparable(results) == comparable(expected)}"
+                         if engine == 'cached' else ''))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
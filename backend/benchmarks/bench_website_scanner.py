@@ -0,0 +1,155 @@
+"""
+Scan many websites served by a local HTTP stand-in and compare engines.
+
+The stand-in answers for every 127.0.0.x address, so each site has its own
+host and its own per-host connection limit. Every response is delayed by
+--latency ms to mimic real sites. Each site serves a home page with a
+privacy-policy link and external scripts, plus robots.txt, the policy page
+and the scripts.
+
+  legacy   the original scan_website: one blocking requests.get per site,
+           sites scanned one after another, home page only
+  bulk     WebsiteScanner.scan_websites: pooled session, sites scanned
+           concurrently, and the policy page, robots.txt and the first
+           scripts fetched for each site
+
+Risk scores must match the legacy heuristics site by site. One site is
+made slower than the scan deadline to show that deadlines are enforced.
+Per-host connection slots must all be released once a batch is done, so
+fanning out over many domains does not grow the fetcher's state.
+
+Usage: python benchmarks/bench_website_scanner.py [--sites N] [--latency MS] [--scripts K]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def make_handler(latency, scripts, slow_host, slow_seconds):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            host = self.headers.get('Host', '')
+            time.sleep(slow_seconds if host.split(':')[0] == slow_host else latency)
+            if self.path == '/':
+                script_tags = ''.join(
+                    f'<script src="http://{host}/static/lib{i}.js"></script>' for i in range(scripts))
+                body = (f'<html><head>{script_tags}</head><body>'
+                        f'<a href="/privacy">Privacy Policy</a><form></form>'
+                        f'<script>var ga="google-analytics.com";</script></body></html>')
+                content_type = 'text/html; charset=utf-8'
+            elif self.path == '/robots.txt':
+                body, content_type = 'User-agent: *\nDisallow: /admin\nDisallow: /tmp\n', 'text/plain'
+            elif self.path == '/privacy':
+                body, content_type = '<html><body>Privacy policy. ' + 'We protect data. ' * 200 + '</body></html>', 'text/html'
+            else:
+                body, content_type = 'console.log("lib");' * 50, 'application/javascript'
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The scanner gave up on a site slower than its deadline
+
+    return StandInHandler
+
+
+def legacy_scan(url):
+    """The original blocking WebsiteScanner.scan_website heuristics (without Mongo logging)."""
+    import requests
+    from bs4 import BeautifulSoup
+    risk_score = 0.0
+    try:
+        response = requests.get(url, timeout=10)
+        if response.status_code >= 400 or not url.startswith('https://'):
+            risk_score += 5.0
+        soup = BeautifulSoup(response.text, 'html.parser')
+        if 'google-analytics.com' in response.text:
+            risk_score += 1.0
+        if 'facebook.com/tr' in response.text:
+            risk_score += 1.0
+        for script in soup.find_all('script', src=True):
+            if script['src'].startswith('http') or script['src'].startswith('//'):
+                risk_score += 0.2
+        if soup.find_all('iframe'):
+            risk_score += 1.0
+        if soup.find_all('form'):
+            risk_score += 0.5
+        for script in soup.find_all('script', string=True):
+            if len(script.string) > 500 and ('eval(' in script.string or 'unescape(' in script.string):
+                risk_score += 2.0
+                break
+        if not any(k in response.text.lower() for k in ['privacy policy', 'data protection', 'terms of service']):
+            risk_score += 2.0
+    except requests.exceptions.Timeout:
+        risk_score += 3.0
+    except requests.exceptions.RequestException:
+        risk_score += 4.0
+    return max(0, min(10, risk_score))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=100, help='ms added to every response')
+    parser.add_argument('--scripts', type=int, default=3)
+    parser.add_argument('--deadline', type=float, default=2.0, help='per-site scan deadline in seconds')
+    args = parser.parse_args()
+
+    from app.services.web_fetcher import WebFetcher
+    from app.services.website_scanner import WebsiteScanner
+
+    sites = min(args.sites, 250)  # One 127.0.0.x address per site, plus the slow one
+    slow_host = '127.0.0.2'
+    server = ThreadingHTTPServer(('0.0.0.0', 0), make_handler(args.latency / 1000, args.scripts,
+                                                              slow_host, args.deadline + 1))
+    server.daemon_threads = True
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.{i + 2}:{port}/" for i in range(sites + 1)]
+    fast_urls = urls[1:]
+
+    try:
+        start = time.perf_counter()
+        legacy_scores = [legacy_scan(url) for url in fast_urls]
+        legacy_s = time.perf_counter() - start
+
+        scanner = WebsiteScanner(None, fetcher=WebFetcher(), max_scripts=args.scripts)
+        start = time.perf_counter()
+        results = scanner.scan_websites(fast_urls, 'bench')
+        bulk_s = time.perf_counter() - start
+        slots_left = len(scanner.fetcher._host_slots)
+
+        identical = all(r['risk_score'] == score for r, score in zip(results, legacy_scores))
+        fetched = sum(2 + len(r['features']['external_scripts']) for r in results if 'error' not in r['features'])
+        start = time.perf_counter()
+        strict = WebsiteScanner(None, fetcher=scanner.fetcher, max_scripts=args.scripts, deadline=args.deadline)
+        slow = strict.scan_websites([urls[0]] + fast_urls[:10], 'bench')
+        slow_s = time.perf_counter() - start
+        print(f"{len(fast_urls)} sites, {args.latency:.0f} ms latency, {args.scripts} scripts per site\n")
+        print(f"legacy  sequential, home page only:       {legacy_s:7.2f} s")
+        print(f"bulk    concurrent, home + {fetched} linked fetches: {bulk_s:7.2f} s ({legacy_s / bulk_s:.1f}x)")
+        print(f"risk scores identical to legacy: {identical}")
+        print(f"per-host slots left after the batch: {slots_left} (of {len(fast_urls)} hosts fetched)")
+        print(f"batch with one site slower than the {args.deadline:.1f} s deadline: {slow_s:.2f} s, "
+              f"slow site error {slow[0]['features'].get('error')!r}, "
+              f"others ok: {all('error' not in r['features'] for r in slow[1:])}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Compile threat-intel domain feeds into the blocklist used by /analyze-url.
+
+Each feed is a text file with one domain per line (hosts-file lines,
+``*.domain`` wildcards and ``#`` comments are accepted). The output replaces
+the previous build atomically; running workers pick it up within
+DOMAIN_BLOCKLIST_CHECK_INTERVAL seconds.
+
+Usage: python scripts/build_blocklist.py OUT FEED [FEED ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.utils.domain_blocklist import compile_blocklist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out', help='blocklist file to write (DOMAIN_BLOCKLIST_PATH)')
+    parser.add_argument('feeds', nargs='+', help='domain feed files')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = compile_blocklist(args.feeds, args.out)
+    print(f"{args.out}: {count} domains from {len(args.feeds)} feed(s) "
+          f"in {time.perf_counter() - start:.1f} s ({os.path.getsize(args.out) / 2**20:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Rewrite scan documents that embed full permission detail to the compact schema.
+
+Older scans store every permission as {name, description, risk, enabled,
+remediation}. This moves them to permission_ids / permission_risks plus
+the dictionary_version the text now lives under (the version is
+published first). A document is only rewritten if joining the compact
+form back through the dictionary reproduces its permissions exactly;
+documents written with different wording are counted and left alone.
+Documents are processed in _id order in batches, so the script can be
+interrupted and re-run.
+
+Usage: python scripts/migrate_scan_permissions.py [--mongo-uri URI] [--batch-size N] [--dry-run]
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from pymongo import MongoClient, UpdateOne
+from app.services.permission_dictionary import PermissionDictionary
+
+LEGACY_QUERY = {'permissions': {'$exists': True}, 'dictionary_version': {'$exists': False}}
+
+
+def migrate(db, batch_size=1000, dry_run=False):
+    """Convert legacy scans in ``db``; returns (converted, skipped)."""
+    dictionary = PermissionDictionary(SimpleNamespace(db=db))
+    if not dry_run:
+        dictionary.publish()
+    converted = skipped = 0
+    last_id = None
+    while True:
+        query = dict(LEGACY_QUERY)
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(db.scans.find(query, {'permissions': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        updates = []
+        for scan in batch:
+            permissions = scan['permissions']
+            ids, risks = dictionary.compact(permissions) if isinstance(permissions, list) else (None, None)
+            if ids is None or dictionary.expand(ids, risks) != permissions:
+                skipped += 1
+                continue
+            updates.append(UpdateOne(
+                {'_id': scan['_id'], 'dictionary_version': {'$exists': False}},
+                {'$set': {'permission_ids': ids, 'permission_risks': risks,
+                          'dictionary_version': dictionary.version},
+                 '$unset': {'permissions': ''}}
+            ))
+        if updates and not dry_run:
+            db.scans.bulk_write(updates, ordered=False)
+        converted += len(updates)
+    return converted, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.getenv('MONGO_URI', 'mongodb://localhost:27017/consent_engine'))
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='count convertible documents without writing')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri).get_default_database()
+    start = time.perf_counter()
+    converted, skipped = migrate(db, args.batch_size, args.dry_run)
+    print(f"{'would convert' if args.dry_run else 'converted'} {converted} scans, "
+          f"left {skipped} with non-matching permission text, in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()